@@ -0,0 +1,60 @@
+-- Platform Overview Materialized View
+-- Precomputes per-university aggregates for the company admin dashboard so
+-- listings no longer re-run three grouped subqueries on every request.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS university_overview AS
+SELECT
+    t.id AS tenant_id,
+    COALESCE(student_count.count, 0) AS students,
+    COALESCE(attachment_count.count, 0) AS attachments,
+    COALESCE(faculty_count.count, 0) AS faculties,
+    COALESCE(student_user_count.count, 0) AS student_users,
+    COALESCE(active_faculty_count.count, 0) AS active_faculties
+FROM tenants t
+LEFT JOIN (
+    SELECT tenant_id, COUNT(*) as count
+    FROM students
+    GROUP BY tenant_id
+) student_count ON t.id = student_count.tenant_id
+LEFT JOIN (
+    SELECT tenant_id, COUNT(*) as count
+    FROM attachments
+    WHERE status = 'active'
+    GROUP BY tenant_id
+) attachment_count ON t.id = attachment_count.tenant_id
+LEFT JOIN (
+    SELECT tenant_id, COUNT(DISTINCT faculty) as count
+    FROM students
+    WHERE faculty IS NOT NULL
+    GROUP BY tenant_id
+) faculty_count ON t.id = faculty_count.tenant_id
+LEFT JOIN (
+    SELECT tenant_id, COUNT(*) as count
+    FROM users
+    WHERE role = 'student' AND is_active = true
+    GROUP BY tenant_id
+) student_user_count ON t.id = student_user_count.tenant_id
+LEFT JOIN (
+    SELECT tenant_id, COUNT(*) as count
+    FROM faculties
+    WHERE is_active = true
+    GROUP BY tenant_id
+) active_faculty_count ON t.id = active_faculty_count.tenant_id
+WITH DATA;
+
+-- A unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_university_overview_tenant_id ON university_overview(tenant_id);
+
+-- Freshness lives outside the view: a NOW() column would differ on every
+-- refresh and make CONCURRENTLY rewrite every row instead of only changed ones
+CREATE TABLE IF NOT EXISTS university_overview_refresh (
+    id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    refreshed_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+INSERT INTO university_overview_refresh (id, refreshed_at) VALUES (true, NOW())
+ON CONFLICT (id) DO NOTHING;
+
+-- Supporting indexes for the aggregate subqueries used during refresh
+CREATE INDEX IF NOT EXISTS idx_attachments_tenant_status ON attachments(tenant_id, status);
+CREATE INDEX IF NOT EXISTS idx_users_tenant_role_active ON users(tenant_id, role) WHERE is_active = true;
@@ -0,0 +1,29 @@
+-- Tenant Metric History
+-- Daily per-tenant counter snapshots for growth reporting. Daily rows are kept
+-- for a bounded retention window and then rolled up into month-end rows, so
+-- storage grows by at most twelve rows per tenant per year.
+
+CREATE TABLE IF NOT EXISTS tenant_daily_metrics (
+    tenant_id UUID REFERENCES tenants(id) ON DELETE CASCADE,
+    snapshot_date DATE NOT NULL,
+    students INTEGER NOT NULL DEFAULT 0,
+    active_attachments INTEGER NOT NULL DEFAULT 0,
+    faculties INTEGER NOT NULL DEFAULT 0,
+    monthly_fee DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+    is_active BOOLEAN NOT NULL DEFAULT true,
+    PRIMARY KEY (tenant_id, snapshot_date)
+);
+
+CREATE TABLE IF NOT EXISTS tenant_monthly_metrics (
+    tenant_id UUID REFERENCES tenants(id) ON DELETE CASCADE,
+    month DATE NOT NULL, -- First day of the month, values are the month-end snapshot
+    students INTEGER NOT NULL DEFAULT 0,
+    active_attachments INTEGER NOT NULL DEFAULT 0,
+    faculties INTEGER NOT NULL DEFAULT 0,
+    monthly_fee DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+    is_active BOOLEAN NOT NULL DEFAULT true,
+    PRIMARY KEY (tenant_id, month)
+);
+
+CREATE INDEX IF NOT EXISTS idx_tenant_daily_metrics_snapshot_date ON tenant_daily_metrics(snapshot_date);
+CREATE INDEX IF NOT EXISTS idx_tenant_monthly_metrics_month ON tenant_monthly_metrics(month);
@@ -0,0 +1,10 @@
+-- Student Roster Import
+-- Supports bulk roster merges: student profiles record their faculty directly
+-- (registration validation already filters on it) and the merge looks up
+-- existing accounts by case-insensitive email and student ID.
+
+ALTER TABLE student_profiles ADD COLUMN IF NOT EXISTS faculty_id UUID REFERENCES faculties(id);
+
+CREATE INDEX IF NOT EXISTS idx_student_profiles_faculty_id ON student_profiles(faculty_id);
+CREATE INDEX IF NOT EXISTS idx_student_profiles_student_id ON student_profiles(student_id);
+CREATE INDEX IF NOT EXISTS idx_users_tenant_lower_email ON users(tenant_id, lower(email));
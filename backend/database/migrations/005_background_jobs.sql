@@ -0,0 +1,35 @@
+-- Background Jobs
+-- Durable queue for long-running admin operations. Workers claim queued rows
+-- with FOR UPDATE SKIP LOCKED, so any number of API processes or standalone
+-- workers can share the queue without double-processing a job.
+
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    job_type VARCHAR(100) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    status VARCHAR(20) NOT NULL DEFAULT 'queued', -- 'queued', 'running', 'completed', 'failed'
+    idempotency_key VARCHAR(255) UNIQUE,
+    tenant_id UUID REFERENCES tenants(id) ON DELETE CASCADE,
+    created_by UUID, -- admin_users or users id of the requester
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    locked_by VARCHAR(255),
+    locked_at TIMESTAMP WITH TIME ZONE,
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    progress_current INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER,
+    progress_message TEXT,
+    checkpoint JSONB NOT NULL DEFAULT '{}', -- Handler state carried across retries
+    result JSONB,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Claim order for queued work and stale-lock scans for running work
+CREATE INDEX IF NOT EXISTS idx_background_jobs_queued ON background_jobs(run_at) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_background_jobs_running ON background_jobs(heartbeat_at) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS idx_background_jobs_tenant_id ON background_jobs(tenant_id);
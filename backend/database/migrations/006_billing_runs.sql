@@ -0,0 +1,8 @@
+-- Bulk Billing Runs
+-- Invoices created by a bulk billing job record the job that created them and
+-- when their email went out, so a crashed run resumes with only unsent invoices.
+
+ALTER TABLE invoices ADD COLUMN IF NOT EXISTS billing_run_id UUID REFERENCES background_jobs(id) ON DELETE SET NULL;
+ALTER TABLE invoices ADD COLUMN IF NOT EXISTS emailed_at TIMESTAMP WITH TIME ZONE;
+
+CREATE INDEX IF NOT EXISTS idx_invoices_billing_run_pending ON invoices(billing_run_id) WHERE emailed_at IS NULL;
@@ -0,0 +1,9 @@
+-- Overdue Invoice Reminders
+-- Reminders are driven by open invoices past their due date and throttled
+-- per tenant using the time each invoice was last included in a reminder.
+
+ALTER TABLE invoices ADD COLUMN IF NOT EXISTS last_reminded_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE invoices ADD COLUMN IF NOT EXISTS reminder_count INTEGER NOT NULL DEFAULT 0;
+
+-- Serves the overdue scan (status = ANY(...) AND due_date < CURRENT_DATE)
+CREATE INDEX IF NOT EXISTS idx_invoices_status_due_date ON invoices(status, due_date);
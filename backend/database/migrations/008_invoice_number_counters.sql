@@ -0,0 +1,24 @@
+-- Invoice Numbering
+-- Per-year counter rows hand out blocks of invoice numbers (INV-<year>-<n>).
+-- An allocation is a single upsert committed on its own, so concurrent
+-- requests and bulk billing runs never collide; numbers of invoices that fail
+-- to insert are skipped rather than reused.
+
+CREATE TABLE IF NOT EXISTS invoice_number_counters (
+    year INTEGER PRIMARY KEY,
+    last_value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Continue after numbers already issued in the INV-<year>-<n> format
+INSERT INTO invoice_number_counters (year, last_value)
+SELECT split_part(invoice_number, '-', 2)::INTEGER, MAX(split_part(invoice_number, '-', 3)::BIGINT)
+FROM invoices
+WHERE invoice_number ~ '^INV-[0-9]{4}-[0-9]+$'
+GROUP BY 1
+ON CONFLICT (year) DO UPDATE SET last_value = GREATEST(invoice_number_counters.last_value, EXCLUDED.last_value);
+
+-- One subscription invoice per tenant and billing month, so overlapping
+-- bulk billing runs cannot bill a tenant twice
+ALTER TABLE invoices ADD COLUMN IF NOT EXISTS billing_period DATE;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_invoices_tenant_billing_period ON invoices(tenant_id, billing_period) WHERE billing_period IS NOT NULL;
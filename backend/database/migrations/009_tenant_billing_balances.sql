@@ -0,0 +1,125 @@
+-- Tenant Billing Balances
+-- Per-tenant outstanding/paid totals and invoice counts, kept current by
+-- statement-level triggers on invoices so billing overviews never aggregate
+-- the invoices table. A nightly reconciliation recomputes them from scratch.
+
+CREATE TABLE IF NOT EXISTS tenant_billing_balances (
+    tenant_id UUID PRIMARY KEY REFERENCES tenants(id) ON DELETE CASCADE,
+    outstanding_amount DECIMAL(12,2) NOT NULL DEFAULT 0, -- 'pending' and 'overdue' invoices
+    paid_amount DECIMAL(12,2) NOT NULL DEFAULT 0,
+    invoice_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    reconciled_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Transition tables let one statement (e.g. a bulk billing run) apply a
+-- single grouped delta per tenant instead of one upsert per invoice row
+CREATE OR REPLACE FUNCTION apply_invoice_billing_deltas() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO tenant_billing_balances (tenant_id, outstanding_amount, paid_amount, invoice_count, updated_at)
+        SELECT tenant_id,
+               SUM(CASE WHEN status IN ('pending', 'overdue') THEN amount ELSE 0 END),
+               SUM(CASE WHEN status = 'paid' THEN amount ELSE 0 END),
+               COUNT(*),
+               NOW()
+        FROM new_rows
+        WHERE tenant_id IS NOT NULL
+        GROUP BY tenant_id
+        ON CONFLICT (tenant_id) DO UPDATE SET
+            outstanding_amount = tenant_billing_balances.outstanding_amount + EXCLUDED.outstanding_amount,
+            paid_amount = tenant_billing_balances.paid_amount + EXCLUDED.paid_amount,
+            invoice_count = tenant_billing_balances.invoice_count + EXCLUDED.invoice_count,
+            updated_at = NOW();
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO tenant_billing_balances (tenant_id, outstanding_amount, paid_amount, invoice_count, updated_at)
+        SELECT tenant_id, SUM(outstanding), SUM(paid), SUM(invoices), NOW()
+        FROM (
+            SELECT tenant_id,
+                   CASE WHEN status IN ('pending', 'overdue') THEN amount ELSE 0 END AS outstanding,
+                   CASE WHEN status = 'paid' THEN amount ELSE 0 END AS paid,
+                   1 AS invoices
+            FROM new_rows
+            UNION ALL
+            SELECT tenant_id,
+                   -CASE WHEN status IN ('pending', 'overdue') THEN amount ELSE 0 END,
+                   -CASE WHEN status = 'paid' THEN amount ELSE 0 END,
+                   -1
+            FROM old_rows
+        ) deltas
+        WHERE tenant_id IS NOT NULL
+        GROUP BY tenant_id
+        -- Updates that do not touch amount, status or tenant (e.g. emailed_at) net to zero
+        HAVING SUM(outstanding) <> 0 OR SUM(paid) <> 0 OR SUM(invoices) <> 0
+        ON CONFLICT (tenant_id) DO UPDATE SET
+            outstanding_amount = tenant_billing_balances.outstanding_amount + EXCLUDED.outstanding_amount,
+            paid_amount = tenant_billing_balances.paid_amount + EXCLUDED.paid_amount,
+            invoice_count = tenant_billing_balances.invoice_count + EXCLUDED.invoice_count,
+            updated_at = NOW();
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE tenant_billing_balances b
+        SET outstanding_amount = b.outstanding_amount - d.outstanding,
+            paid_amount = b.paid_amount - d.paid,
+            invoice_count = b.invoice_count - d.invoices,
+            updated_at = NOW()
+        FROM (
+            SELECT tenant_id,
+                   SUM(CASE WHEN status IN ('pending', 'overdue') THEN amount ELSE 0 END) AS outstanding,
+                   SUM(CASE WHEN status = 'paid' THEN amount ELSE 0 END) AS paid,
+                   COUNT(*) AS invoices
+            FROM old_rows
+            GROUP BY tenant_id
+        ) d
+        WHERE b.tenant_id = d.tenant_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS invoices_billing_balances_insert ON invoices;
+CREATE TRIGGER invoices_billing_balances_insert
+    AFTER INSERT ON invoices
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_invoice_billing_deltas();
+
+DROP TRIGGER IF EXISTS invoices_billing_balances_update ON invoices;
+CREATE TRIGGER invoices_billing_balances_update
+    AFTER UPDATE ON invoices
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_invoice_billing_deltas();
+
+DROP TRIGGER IF EXISTS invoices_billing_balances_delete ON invoices;
+CREATE TRIGGER invoices_billing_balances_delete
+    AFTER DELETE ON invoices
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_invoice_billing_deltas();
+
+-- New tenants start with a zero balance row, so listings can inner-join
+-- balances and sort on outstanding_amount without a COALESCE
+CREATE OR REPLACE FUNCTION create_tenant_billing_balances() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO tenant_billing_balances (tenant_id)
+    SELECT id FROM new_rows
+    ON CONFLICT (tenant_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tenants_billing_balances_insert ON tenants;
+CREATE TRIGGER tenants_billing_balances_insert
+    AFTER INSERT ON tenants
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION create_tenant_billing_balances();
+
+-- Backfill every tenant, including those without invoices
+INSERT INTO tenant_billing_balances (tenant_id, outstanding_amount, paid_amount, invoice_count, updated_at, reconciled_at)
+SELECT t.id,
+       COALESCE(SUM(CASE WHEN i.status IN ('pending', 'overdue') THEN i.amount ELSE 0 END), 0),
+       COALESCE(SUM(CASE WHEN i.status = 'paid' THEN i.amount ELSE 0 END), 0),
+       COUNT(i.id),
+       NOW(),
+       NOW()
+FROM tenants t
+LEFT JOIN invoices i ON i.tenant_id = t.id
+GROUP BY t.id
+ON CONFLICT (tenant_id) DO NOTHING;
@@ -0,0 +1,32 @@
+-- Tenant Listing Indexes
+-- Keyset pagination orders tenants by (sort column, id). The sort columns are
+-- made NOT NULL so row comparisons are total, and each sort key gets a
+-- matching composite index so a page is an index range scan.
+
+UPDATE tenants SET created_at = NOW() WHERE created_at IS NULL;
+UPDATE tenants SET health_score = 100.00 WHERE health_score IS NULL;
+UPDATE tenants SET monthly_fee = 0.00 WHERE monthly_fee IS NULL;
+
+ALTER TABLE tenants ALTER COLUMN created_at SET NOT NULL;
+ALTER TABLE tenants ALTER COLUMN health_score SET NOT NULL;
+ALTER TABLE tenants ALTER COLUMN monthly_fee SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_tenants_created_at_id ON tenants(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tenants_name_id ON tenants(name, id);
+CREATE INDEX IF NOT EXISTS idx_tenants_health_score_id ON tenants(health_score, id);
+CREATE INDEX IF NOT EXISTS idx_tenants_monthly_fee_id ON tenants(monthly_fee, id);
+
+-- Filtered listings: status and plan are equality filters ahead of the default sort
+CREATE INDEX IF NOT EXISTS idx_tenants_status_created_at_id ON tenants(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tenants_plan_created_at_id ON tenants(plan_id, created_at, id);
+
+-- Outstanding balance filter and sort (every tenant has a balance row, so
+-- listings inner-join balances and compare the bare column)
+CREATE INDEX IF NOT EXISTS idx_tenant_billing_balances_outstanding ON tenant_billing_balances(outstanding_amount, tenant_id);
+
+-- First active admin per tenant for the university listing
+CREATE INDEX IF NOT EXISTS idx_users_tenant_admin ON users(tenant_id, created_at) WHERE role = 'university_admin' AND is_active = true;
+
+-- Refresh planner statistics so listing count estimates start out accurate
+ANALYZE tenants;
+ANALYZE tenant_billing_balances;
@@ -0,0 +1,28 @@
+-- Notification Events
+-- Every inserted notification is announced on the 'notifications' channel so
+-- connected clients are pushed new rows instead of polling. The payload only
+-- names the row; listeners load it themselves (NOTIFY payloads are capped at
+-- 8000 bytes and are delivered when the inserting transaction commits).
+
+-- Monotonic per-row sequence used as the SSE event id / resume cursor
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS seq BIGINT GENERATED ALWAYS AS IDENTITY;
+
+CREATE INDEX IF NOT EXISTS idx_notifications_user_seq ON notifications(user_id, seq);
+
+CREATE OR REPLACE FUNCTION announce_notifications() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify(
+        'notifications',
+        json_build_object('id', id, 'user_id', user_id, 'seq', seq)::text
+    )
+    FROM new_rows
+    WHERE user_id IS NOT NULL;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notifications_announce ON notifications;
+CREATE TRIGGER notifications_announce
+    AFTER INSERT ON notifications
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION announce_notifications();
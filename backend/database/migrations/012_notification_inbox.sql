@@ -0,0 +1,89 @@
+-- Notification Inbox
+-- Per-user unread counters kept current by statement-level triggers so badge
+-- counts are a primary key lookup, plus indexes for the paginated inbox.
+
+CREATE TABLE IF NOT EXISTS notification_counters (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION apply_notification_unread_deltas() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO notification_counters (user_id, unread_count, updated_at)
+        SELECT user_id, COUNT(*), NOW()
+        FROM new_rows
+        WHERE user_id IS NOT NULL AND NOT COALESCE(is_read, false)
+        GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE SET
+            unread_count = notification_counters.unread_count + EXCLUDED.unread_count,
+            updated_at = NOW();
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO notification_counters (user_id, unread_count, updated_at)
+        SELECT user_id, SUM(delta), NOW()
+        FROM (
+            SELECT user_id, CASE WHEN COALESCE(is_read, false) THEN 0 ELSE 1 END AS delta FROM new_rows
+            UNION ALL
+            SELECT user_id, CASE WHEN COALESCE(is_read, false) THEN 0 ELSE -1 END FROM old_rows
+        ) deltas
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+        HAVING SUM(delta) <> 0
+        ON CONFLICT (user_id) DO UPDATE SET
+            unread_count = GREATEST(notification_counters.unread_count + EXCLUDED.unread_count, 0),
+            updated_at = NOW();
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE notification_counters c
+        SET unread_count = GREATEST(c.unread_count - d.unread, 0),
+            updated_at = NOW()
+        FROM (
+            SELECT user_id, COUNT(*) AS unread
+            FROM old_rows
+            WHERE NOT COALESCE(is_read, false)
+            GROUP BY user_id
+        ) d
+        WHERE c.user_id = d.user_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notifications_unread_insert ON notifications;
+CREATE TRIGGER notifications_unread_insert
+    AFTER INSERT ON notifications
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_notification_unread_deltas();
+
+DROP TRIGGER IF EXISTS notifications_unread_update ON notifications;
+CREATE TRIGGER notifications_unread_update
+    AFTER UPDATE ON notifications
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_notification_unread_deltas();
+
+DROP TRIGGER IF EXISTS notifications_unread_delete ON notifications;
+CREATE TRIGGER notifications_unread_delete
+    AFTER DELETE ON notifications
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_notification_unread_deltas();
+
+-- Backfill
+INSERT INTO notification_counters (user_id, unread_count, updated_at)
+SELECT user_id, COUNT(*) FILTER (WHERE NOT COALESCE(is_read, false)), NOW()
+FROM notifications
+WHERE user_id IS NOT NULL
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET unread_count = EXCLUDED.unread_count, updated_at = NOW();
+
+-- Inbox pages are keyset scans on (user_id, created_at, id); unread-only
+-- pages and mark-read use the partial index. The boolean-only index never
+-- helped a per-user query.
+UPDATE notifications SET created_at = NOW() WHERE created_at IS NULL;
+ALTER TABLE notifications ALTER COLUMN created_at SET NOT NULL;
+UPDATE notifications SET is_read = false WHERE is_read IS NULL;
+ALTER TABLE notifications ALTER COLUMN is_read SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_notifications_user_created ON notifications(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_notifications_user_unread ON notifications(user_id, created_at DESC, id DESC) WHERE is_read = false;
+DROP INDEX IF EXISTS idx_notifications_is_read;
+DROP INDEX IF EXISTS idx_notifications_user_id;
@@ -0,0 +1,56 @@
+-- Notification Broadcasts
+-- Notifications for large audiences (a faculty, a role, a year of study) are
+-- stored once; recipients get a read-state row only when they read one.
+-- Broadcasts draw their seq from the notifications sequence so streams and
+-- inboxes can resume across both with a single cursor.
+
+CREATE TABLE IF NOT EXISTS notification_broadcasts (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    seq BIGINT NOT NULL DEFAULT nextval('notifications_seq_seq'),
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    -- Audience; NULL columns do not narrow it
+    faculty_id UUID REFERENCES faculties(id) ON DELETE CASCADE,
+    role VARCHAR(50),
+    year_of_study INTEGER,
+    type VARCHAR(100) NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    message TEXT NOT NULL,
+    data JSONB DEFAULT '{}',
+    created_by UUID,
+    recipient_count INTEGER NOT NULL DEFAULT 0, -- Audience size when sent
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_broadcasts_tenant_created ON notification_broadcasts(tenant_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_notification_broadcasts_tenant_seq ON notification_broadcasts(tenant_id, seq);
+
+CREATE TABLE IF NOT EXISTS notification_broadcast_reads (
+    broadcast_id UUID NOT NULL REFERENCES notification_broadcasts(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    read_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (broadcast_id, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_broadcast_reads_user ON notification_broadcast_reads(user_id);
+
+-- Audience matching for students by year of study
+CREATE INDEX IF NOT EXISTS idx_student_profiles_year_of_study ON student_profiles(year_of_study);
+
+-- Announced on the same channel as notifications; listeners match the audience themselves
+CREATE OR REPLACE FUNCTION announce_notification_broadcasts() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify(
+        'notifications',
+        json_build_object('broadcast_id', id, 'tenant_id', tenant_id, 'seq', seq)::text
+    )
+    FROM new_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notification_broadcasts_announce ON notification_broadcasts;
+CREATE TRIGGER notification_broadcasts_announce
+    AFTER INSERT ON notification_broadcasts
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION announce_notification_broadcasts();
@@ -0,0 +1,23 @@
+-- Placement Coordinates
+-- Visit planning needs coordinates for each student's placement. Students'
+-- devices can record them on logbook entries; otherwise faculty admins map
+-- placement location names to coordinates once per tenant.
+
+ALTER TABLE logbook_entries ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE logbook_entries ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+
+CREATE TABLE IF NOT EXISTS placement_locations (
+    tenant_id UUID NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    location_key VARCHAR(255) NOT NULL, -- lower(trim(logbook_entries.location))
+    location VARCHAR(255) NOT NULL,
+    latitude DOUBLE PRECISION NOT NULL CHECK (latitude BETWEEN -90 AND 90),
+    longitude DOUBLE PRECISION NOT NULL CHECK (longitude BETWEEN -180 AND 180),
+    updated_by UUID REFERENCES users(id),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (tenant_id, location_key)
+);
+
+-- Latest located entry per student: a non-blank location name or a full
+-- coordinate pair (the visit planner's LATERAL repeats this predicate)
+CREATE INDEX IF NOT EXISTS idx_logbook_entries_student_located ON logbook_entries(student_id, entry_date DESC)
+    WHERE NULLIF(trim(location), '') IS NOT NULL OR (latitude IS NOT NULL AND longitude IS NOT NULL);
@@ -0,0 +1,24 @@
+-- Lecturer Workload Counters
+-- lecturer_profiles.current_students counts the distinct students a lecturer
+-- has an active assignment for. Assignments now adjust it by one under the
+-- profile's row lock instead of recounting, so it is resynchronised once here
+-- and kept from going negative. Capacity is enforced by the increment itself.
+
+UPDATE lecturer_profiles lp
+SET current_students = COALESCE((
+    SELECT COUNT(DISTINCT sla.student_id)
+    FROM student_lecturer_assignments sla
+    WHERE sla.lecturer_id = lp.user_id AND sla.status = 'active'
+), 0);
+
+UPDATE lecturer_profiles SET max_students = 20 WHERE max_students IS NULL;
+
+ALTER TABLE lecturer_profiles ALTER COLUMN current_students SET NOT NULL;
+ALTER TABLE lecturer_profiles ALTER COLUMN max_students SET NOT NULL;
+
+ALTER TABLE lecturer_profiles DROP CONSTRAINT IF EXISTS lecturer_profiles_current_students_check;
+ALTER TABLE lecturer_profiles ADD CONSTRAINT lecturer_profiles_current_students_check CHECK (current_students >= 0);
+
+-- Whether a lecturer is already assessing a student, checked on every assignment
+CREATE INDEX IF NOT EXISTS idx_student_lecturer_assignments_active_pair
+    ON student_lecturer_assignments(lecturer_id, student_id) WHERE status = 'active';
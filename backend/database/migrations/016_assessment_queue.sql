@@ -0,0 +1,27 @@
+-- Assessment Queue
+-- The faculty assessment queue is read most urgent first, oldest first within
+-- a priority. The rank is stored so the order is an index range scan, and the
+-- index only covers open requests so its size follows the queue, not history.
+
+UPDATE assessment_requests SET requested_at = COALESCE(created_at, NOW()) WHERE requested_at IS NULL;
+ALTER TABLE assessment_requests ALTER COLUMN requested_at SET NOT NULL;
+
+-- Matches PRIORITY_RANK in the faculty admin assignment engine; unknown priorities rank as normal
+ALTER TABLE assessment_requests ADD COLUMN IF NOT EXISTS priority_rank SMALLINT GENERATED ALWAYS AS (
+    CASE priority
+        WHEN 'urgent' THEN 0
+        WHEN 'high' THEN 1
+        WHEN 'low' THEN 3
+        ELSE 2
+    END
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_assessment_requests_queue
+    ON assessment_requests(tenant_id, faculty_id, priority_rank, requested_at, id)
+    WHERE status IN ('pending', 'assigned');
+
+-- Closed requests, filtered by status
+CREATE INDEX IF NOT EXISTS idx_assessment_requests_faculty_status
+    ON assessment_requests(tenant_id, faculty_id, status, priority_rank, requested_at, id);
+
+ANALYZE assessment_requests;
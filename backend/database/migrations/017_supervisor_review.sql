@@ -0,0 +1,26 @@
+-- Supervisor Review
+-- Industry supervisors are linked to logbook entries only by the email the
+-- student enters. Entries now carry the supervisor's review state, and the
+-- email is indexed case-insensitively so a supervisor's pending queue and
+-- student set are index scans.
+
+ALTER TABLE logbook_entries ADD COLUMN IF NOT EXISTS supervisor_status VARCHAR(20) NOT NULL DEFAULT 'pending'; -- 'pending', 'approved'
+ALTER TABLE logbook_entries ADD COLUMN IF NOT EXISTS supervisor_reviewed_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE logbook_entries ADD COLUMN IF NOT EXISTS supervisor_reviewed_by UUID REFERENCES users(id);
+
+-- Pending entries per supervisor, oldest first
+CREATE INDEX IF NOT EXISTS idx_logbook_entries_supervisor_pending
+    ON logbook_entries(lower(supervisor_email), entry_date, id)
+    WHERE supervisor_status = 'pending' AND supervisor_email IS NOT NULL;
+
+-- A supervisor's students; replaces the case-sensitive email index
+CREATE INDEX IF NOT EXISTS idx_logbook_entries_supervisor_student
+    ON logbook_entries(lower(supervisor_email), student_id)
+    WHERE supervisor_email IS NOT NULL;
+DROP INDEX IF EXISTS idx_logbook_entries_supervisor_email;
+
+-- Deleting a user checks the reviewer foreign key, which would otherwise
+-- scan every logbook entry
+CREATE INDEX IF NOT EXISTS idx_logbook_entries_supervisor_reviewed_by
+    ON logbook_entries(supervisor_reviewed_by)
+    WHERE supervisor_reviewed_by IS NOT NULL;
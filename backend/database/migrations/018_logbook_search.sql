@@ -0,0 +1,26 @@
+-- Logbook Search
+-- Weighted full-text vectors over the searchable logbook fields (title,
+-- then skills, then description and challenges), plus trigram matching on
+-- titles for misspelt queries. btree_gin puts tenant_id in the same GIN
+-- indexes, so a search only reads the postings of one tenant.
+--
+-- Adding a stored generated column rewrites logbook_entries; on a large
+-- table run this in a maintenance window.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+ALTER TABLE logbook_entries ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(skills_learned, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'C') ||
+    setweight(to_tsvector('english', coalesce(challenges_faced, '')), 'C')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_logbook_entries_search
+    ON logbook_entries USING GIN (tenant_id, search_vector);
+
+CREATE INDEX IF NOT EXISTS idx_logbook_entries_title_trgm
+    ON logbook_entries USING GIN (tenant_id, title gin_trgm_ops);
+
+ANALYZE logbook_entries;
@@ -0,0 +1,55 @@
+-- Notification Commit Order
+-- seq was drawn when a row was inserted, but rows become visible when their
+-- transaction commits, so a long transaction could publish a row below a
+-- cursor that streams, replays and broadcast counters had already passed.
+-- seq now carries the id of the writing transaction in its high bits and a
+-- per-transaction counter in the low 20. Every transaction below the oldest
+-- one still running has finished, so notification_seq_watermark() is a seq
+-- at or below which nothing can still be committed; cursors only pass it up
+-- to that point. Writers take no lock and rows are written once.
+
+CREATE OR REPLACE FUNCTION next_notification_seq() RETURNS BIGINT AS $$
+DECLARE
+    drawn INTEGER := COALESCE(NULLIF(current_setting('practicheck.notification_seqs_drawn', true), ''), '0')::INTEGER;
+BEGIN
+    IF drawn >= 1048576 THEN
+        RAISE EXCEPTION 'A transaction may write at most 1048576 notifications and broadcasts';
+    END IF;
+    PERFORM set_config('practicheck.notification_seqs_drawn', (drawn + 1)::text, true);
+    RETURN (pg_current_xact_id()::text::BIGINT << 20) + drawn;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notification_seq_watermark() RETURNS BIGINT AS $$
+    SELECT (pg_snapshot_xmin(pg_current_snapshot())::text::BIGINT << 20) - 1
+$$ LANGUAGE sql STABLE;
+
+-- Identity values already issued are far below any transaction-based seq
+ALTER TABLE notification_broadcasts ALTER COLUMN seq SET DEFAULT next_notification_seq();
+ALTER TABLE notifications ALTER COLUMN seq DROP IDENTITY IF EXISTS;
+ALTER TABLE notifications ALTER COLUMN seq SET DEFAULT next_notification_seq();
+
+-- Announcements carry the watermark as of the insert: every row at or below it
+-- was committed, and announced, before this one
+CREATE OR REPLACE FUNCTION announce_notifications() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify(
+        'notifications',
+        json_build_object('id', id, 'user_id', user_id, 'seq', seq, 'watermark', notification_seq_watermark())::text
+    )
+    FROM new_rows
+    WHERE user_id IS NOT NULL;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION announce_notification_broadcasts() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify(
+        'notifications',
+        json_build_object('broadcast_id', id, 'tenant_id', tenant_id, 'seq', seq, 'watermark', notification_seq_watermark())::text
+    )
+    FROM new_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,57 @@
+-- Broadcast Unread Watermark
+-- Unread broadcasts were counted on every badge request across all live
+-- broadcasts of the tenant. Each user's counter row now caches that count
+-- with the highest broadcast seq and the time it covers, so a count only
+-- folds in broadcasts sent or expired since, and reading a broadcast below
+-- the watermark decrements it. Counts only fold in broadcasts below the
+-- commit watermark (019), so nothing is committed below a counter's watermark
+-- once it has been passed.
+
+ALTER TABLE notification_counters
+    ADD COLUMN IF NOT EXISTS broadcast_unread INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS broadcast_seq BIGINT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS broadcasts_counted_at TIMESTAMP WITH TIME ZONE;
+
+-- Broadcasts that expired since a user's last count
+CREATE INDEX IF NOT EXISTS idx_notification_broadcasts_tenant_expires
+    ON notification_broadcasts(tenant_id, expires_at)
+    WHERE expires_at IS NOT NULL;
+
+-- A user whose audience changes is recounted from scratch on the next read
+CREATE OR REPLACE FUNCTION reset_broadcast_unread() RETURNS TRIGGER AS $$
+DECLARE
+    affected UUID[];
+BEGIN
+    IF TG_TABLE_NAME = 'users' THEN
+        affected := ARRAY[NEW.id];
+    ELSIF TG_OP = 'INSERT' THEN
+        affected := ARRAY[NEW.user_id];
+    ELSIF TG_OP = 'DELETE' THEN
+        affected := ARRAY[OLD.user_id];
+    ELSE
+        affected := ARRAY[OLD.user_id, NEW.user_id];
+    END IF;
+
+    UPDATE notification_counters
+    SET broadcast_unread = 0, broadcast_seq = 0, broadcasts_counted_at = NULL, updated_at = NOW()
+    WHERE user_id = ANY(affected);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS users_reset_broadcast_unread ON users;
+CREATE TRIGGER users_reset_broadcast_unread
+    AFTER UPDATE OF tenant_id, faculty_id, role, is_active ON users
+    FOR EACH ROW
+    WHEN (
+        OLD.tenant_id IS DISTINCT FROM NEW.tenant_id
+        OR OLD.faculty_id IS DISTINCT FROM NEW.faculty_id
+        OR OLD.role IS DISTINCT FROM NEW.role
+        OR OLD.is_active IS DISTINCT FROM NEW.is_active
+    )
+    EXECUTE FUNCTION reset_broadcast_unread();
+
+DROP TRIGGER IF EXISTS student_profiles_reset_broadcast_unread ON student_profiles;
+CREATE TRIGGER student_profiles_reset_broadcast_unread
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, faculty_id, year_of_study ON student_profiles
+    FOR EACH ROW EXECUTE FUNCTION reset_broadcast_unread();
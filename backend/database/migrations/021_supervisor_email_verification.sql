@@ -0,0 +1,20 @@
+-- Supervisor Email Verification
+-- Supervisors see and review logbooks because students name their email, so
+-- an account only gets those rights once its owner has proved they receive
+-- mail at that address. Supervisor emails are unique regardless of case;
+-- users' UNIQUE(tenant_id, email) never applied to tenant-less supervisors.
+
+ALTER TABLE supervisor_profiles ADD COLUMN IF NOT EXISTS email_verified_at TIMESTAMP WITH TIME ZONE;
+
+CREATE TABLE IF NOT EXISTS supervisor_email_verifications (
+    token_hash VARCHAR(64) PRIMARY KEY, -- sha256 of the emailed token
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    email VARCHAR(255) NOT NULL, -- Address the token was sent to
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    used_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_supervisor_email_verifications_user ON supervisor_email_verifications(user_id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_supervisor_email_lower ON users(lower(email)) WHERE role = 'supervisor';
@@ -11,9 +11,15 @@ import time
 import logging
 from typing import Optional
 import os
+import posixpath
 from dotenv import load_dotenv
 import httpx
-import httpx
+import sys
+from pathlib import Path
+
+# Shared backend utilities live alongside the services directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from shared.metrics import MetricsMiddleware, metrics_response, start_runtime_sampler, stop_runtime_sampler
 
 # Load environment variables from .env file
 load_dotenv("../../../.env")
@@ -48,16 +54,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["*"],
+    # Listings page by cursor and report totals in headers
+    expose_headers=["X-Total-Count", "X-Total-Count-Estimated", "X-Next-Cursor"],
 )
 
-# Request timing middleware
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
+# Request metrics middleware (route latency, Server-Timing and X-Process-Time headers)
+app.add_middleware(MetricsMiddleware, service="api-gateway")
 
 # Health check endpoint
 @app.get("/health")
@@ -70,6 +72,12 @@ async def health_check():
         "timestamp": time.time()
     }
 
+# Prometheus metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return metrics_response()
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -106,6 +114,11 @@ COMPANY_ADMIN_URL = "http://localhost:8001"
 UNIVERSITY_ADMIN_URL = "http://localhost:8003"
 FACULTY_ADMIN_URL = "http://localhost:8004"
 
+def is_internal_path(path: str) -> bool:
+    """Metrics and slow query logs are scraped from the services directly, never through the gateway"""
+    path = posixpath.normpath("/" + path).lstrip("/").lower()
+    return path == "metrics" or path.startswith("metrics/")
+
 # Auth Service Proxy Routes
 @app.get("/api/auth/universities")
 async def get_universities():
@@ -121,6 +134,8 @@ async def get_universities():
 @app.api_route("/api/auth/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def proxy_auth_service(request: Request, path: str):
     """Proxy requests to Auth Service"""
+    if is_internal_path(path):
+        raise HTTPException(status_code=404, detail="Not found")
     try:
         # Get request body
         body = await request.body()
@@ -157,6 +172,8 @@ async def proxy_auth_service(request: Request, path: str):
 @app.api_route("/api/admin/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def proxy_company_admin(request: Request, path: str):
     """Proxy requests to Company Admin Service"""
+    if is_internal_path(path):
+        raise HTTPException(status_code=404, detail="Not found")
     try:
         # Get request body
         body = await request.body()
@@ -193,6 +210,8 @@ async def proxy_company_admin(request: Request, path: str):
 @app.api_route("/api/university/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def proxy_university_admin(request: Request, path: str):
     """Proxy requests to University Admin Service"""
+    if is_internal_path(path):
+        raise HTTPException(status_code=404, detail="Not found")
     try:
         # Get request body
         body = await request.body()
@@ -229,6 +248,8 @@ async def proxy_university_admin(request: Request, path: str):
 @app.api_route("/api/faculty/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def proxy_faculty_admin(request: Request, path: str):
     """Proxy requests to Faculty Admin Service"""
+    if is_internal_path(path):
+        raise HTTPException(status_code=404, detail="Not found")
     try:
         # Get request body
         body = await request.body()
@@ -265,6 +286,8 @@ async def proxy_faculty_admin(request: Request, path: str):
 @app.api_route("/api/faculty/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def proxy_faculty_admin(request: Request, path: str):
     """Proxy requests to Faculty Admin Service"""
+    if is_internal_path(path):
+        raise HTTPException(status_code=404, detail="Not found")
     try:
         # Get request body
         body = await request.body()
@@ -366,6 +389,7 @@ async def general_exception_handler(request: Request, exc: Exception):
 async def startup_event():
     """Initialize services on startup"""
     logger.info("🚀 PractiCheck API Gateway starting up...")
+    app.state.metrics_sampler = start_runtime_sampler("api-gateway")
     logger.info("✅ API Gateway ready to serve requests")
 
 # Shutdown event
@@ -373,6 +397,7 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("🛑 PractiCheck API Gateway shutting down...")
+    await stop_runtime_sampler(app.state.metrics_sampler)
 
 if __name__ == "__main__":
     import uvicorn
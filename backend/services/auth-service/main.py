@@ -3,20 +3,24 @@ PractiCheck Multi-Role Authentication Service
 FastAPI backend for handling authentication across all user roles with tenant isolation
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr, Field, validator
 from typing import Optional, List, Dict, Any
-import asyncpg
 import bcrypt
 import jwt
 from jwt.exceptions import ExpiredSignatureError, InvalidTokenError
 import os
 from datetime import datetime, timedelta, timezone
 import logging
+import math
 import uuid
+import asyncio
+import time
 from contextlib import asynccontextmanager
+import hashlib
 import json
 import secrets
 import string
@@ -24,6 +28,24 @@ from dotenv import load_dotenv
 import sys
 from pathlib import Path
 
+# Shared backend utilities live alongside the services directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from shared.metrics import MetricsMiddleware, metrics_response, start_runtime_sampler, stop_runtime_sampler
+from shared.db import create_pool
+from shared.slow_queries import is_slow_query_reader, slow_queries_response
+from shared.mailer import Mailer
+from shared.templating import preload_templates, render_email
+from shared.notifications import (
+    NOTIFICATION_COLUMNS,
+    NotificationHub,
+    parse_last_event_id,
+    serialize_notification,
+    sse_event,
+)
+from shared.pagination import SortKey, Sort, clamp_limit, decode_cursor, encode_cursor, order_by
+from shared.broadcasts import BROADCAST_COLUMNS, UNREAD_BY_USER, USER_BROADCASTS, Audience, count_unread_broadcasts, notify_audience
+from shared.logbook_search import SearchScope, search_logbook_entries
+
 # Load environment variables from root .env file
 root_dir = Path(__file__).parent.parent.parent.parent
 env_path = root_dir / '.env'
@@ -34,6 +56,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration
+SERVICE_NAME = "auth-service"
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     logger.error("DATABASE_URL environment variable is not set!")
@@ -52,6 +75,11 @@ logger.info(f"Successfully loaded DATABASE_URL: {DATABASE_URL[:50]}...")
 logger.info(f"Environment file loaded from: {env_path}")
 logger.info(f"JWT_SECRET_KEY loaded: {'Yes' if JWT_SECRET_KEY != 'your-secret-key-change-in-production' else 'Using default'}")
 
+# Supervisor review configuration
+SUPERVISOR_STUDENTS_CACHE_SECONDS = float(os.getenv("SUPERVISOR_STUDENTS_CACHE_SECONDS", "300"))
+SUPERVISOR_REVIEW_MAX_BATCH = int(os.getenv("SUPERVISOR_REVIEW_MAX_BATCH", "200"))
+SUPERVISOR_VERIFICATION_HOURS = int(os.getenv("SUPERVISOR_VERIFICATION_HOURS", "48"))
+
 # Email configuration
 EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
 EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
@@ -66,14 +94,26 @@ security = HTTPBearer()
 # Database connection pool
 db_pool = None
 
+# Async SMTP sender
+mailer = Mailer(EMAIL_HOST, EMAIL_PORT, EMAIL_HOST_USER, EMAIL_HOST_PASSWORD, EMAIL_USE_TLS, DEFAULT_FROM_EMAIL)
+
+# Pushes new notifications to open SSE/WebSocket streams (one LISTEN connection per process)
+notification_hub = None
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global db_pool
-    db_pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=10, statement_cache_size=0)
+    global db_pool, notification_hub
+    db_pool = await create_pool(SERVICE_NAME, DATABASE_URL, min_size=1, max_size=10, statement_cache_size=0)
     logger.info("Database connection pool created")
+    metrics_sampler = start_runtime_sampler(SERVICE_NAME, lambda: db_pool)
+    logger.info(f"Compiled {preload_templates()} templates")
+    notification_hub = NotificationHub(SERVICE_NAME, DATABASE_URL, db_pool)
+    await notification_hub.start()
     yield
     # Shutdown
+    await notification_hub.stop()
+    await stop_runtime_sampler(metrics_sampler)
     await db_pool.close()
     logger.info("Database connection pool closed")
 
@@ -98,6 +138,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request metrics middleware
+app.add_middleware(MetricsMiddleware, service=SERVICE_NAME)
+
 # Pydantic Models
 class LoginRequest(BaseModel):
     email: Optional[EmailStr] = None
@@ -131,6 +174,9 @@ class SupervisorRegisterRequest(BaseModel):
 
     model_config = {"populate_by_name": True}
 
+class SupervisorVerifyEmailRequest(BaseModel):
+    token: str
+
 class LoginResponse(BaseModel):
     access_token: str
     token_type: str
@@ -156,6 +202,20 @@ class CourseInfo(BaseModel):
     faculty_name: str
     university_id: str
 
+class MarkNotificationsReadRequest(BaseModel):
+    ids: Optional[List[str]] = None
+    up_to_seq: Optional[int] = None  # Everything up to and including this seq or stream cursor; rows that commit below it later stay unread
+
+class LogbookReview(BaseModel):
+    entry_id: str
+    action: str = Field(..., pattern="^(approve|comment)$")
+    comment: Optional[str] = None
+    rating: Optional[int] = Field(None, ge=1, le=5)
+    is_private: bool = False  # Private comments are only visible to faculty
+
+class ReviewLogbookEntriesRequest(BaseModel):
+    reviews: List[LogbookReview] = Field(..., min_length=1)
+
 # Utility Functions
 def hash_password(password: str) -> str:
     """Hash password using bcrypt"""
@@ -182,40 +242,35 @@ def generate_token(length: int = 32) -> str:
     """Generate a secure random token"""
     return secrets.token_urlsafe(length)
 
+def hash_token(token: str) -> str:
+    """Digest stored in place of an emailed token"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def parse_coordinates(latitude, longitude) -> tuple:
+    """Validate optional placement coordinates; both or neither must be given"""
+    if latitude is None and longitude is None:
+        return None, None
+    if latitude is None or longitude is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Latitude and longitude must be given together"
+        )
+    # bool is an int subclass, and NaN/infinity compare false with every bound
+    if any(isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) for value in (latitude, longitude)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Latitude and longitude must be numbers"
+        )
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Latitude must be between -90 and 90 and longitude between -180 and 180"
+        )
+    return float(latitude), float(longitude)
+
 async def send_email(to_email: str, subject: str, body: str, html_body: str = None) -> bool:
     """Send email using SMTP"""
-    try:
-        import smtplib
-        from email.mime.text import MimeText
-        from email.mime.multipart import MimeMultipart
-        
-        msg = MimeMultipart('alternative')
-        msg['From'] = DEFAULT_FROM_EMAIL
-        msg['To'] = to_email
-        msg['Subject'] = subject
-
-        # Add text part
-        text_part = MimeText(body, 'plain')
-        msg.attach(text_part)
-
-        # Add HTML part if provided
-        if html_body:
-            html_part = MimeText(html_body, 'html')
-            msg.attach(html_part)
-
-        # Send email
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        if EMAIL_USE_TLS:
-            server.starttls()
-        server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        
-        logger.info(f"Email sent successfully to {to_email}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to send email to {to_email}: {e}")
-        return False
+    return await mailer.send(to_email, subject, body, html_body)
 
 async def get_tenant_by_id(tenant_id: str) -> Optional[dict]:
     """Get tenant information by ID"""
@@ -282,6 +337,23 @@ async def health_check():
         logger.error(f"Health check failed: {e}")
         return {"status": "unhealthy", "database": "disconnected"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return metrics_response()
+
+async def get_slow_query_reader(token_data: dict = Depends(verify_token)) -> dict:
+    """Require a company-admin super admin token for slow query logs"""
+    async with db_pool.acquire() as conn:
+        if not await is_slow_query_reader(conn, token_data):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Super admin access required")
+    return token_data
+
+@app.get("/metrics/slow-queries", include_in_schema=False)
+async def slow_queries(limit: int = 50, token_data: dict = Depends(get_slow_query_reader)):
+    """Recent statements slower than SLOW_QUERY_LOG_MS with sampled plans"""
+    return slow_queries_response(min(max(limit, 1), 200))
+
 @app.get("/universities", response_model=List[UniversityInfo])
 async def get_universities():
     """Get list of active universities for selection"""
@@ -391,38 +463,13 @@ async def student_check_email(request: dict):
             # Send password setup email
             setup_link = f"http://localhost:3000/auth/student/setup-password?token={setup_token}&email={email}"
             
-            email_subject = "Set up your PractiCheck student password"
-            email_body = f"""
-Hello {student['name']},
-
-Welcome to PractiCheck! Your student account has been created for {student['university_name']}.
-
-To complete your account setup, please click the link below to create your password:
-
-{setup_link}
-
-Your Student ID: {student['student_id']}
-
-If you didn't request this account, please ignore this email.
-
-Best regards,
-PractiCheck Team
-            """
-            
-            email_html = f"""
-            <html>
-            <body>
-                <h2>Welcome to PractiCheck!</h2>
-                <p>Hello {student['name']},</p>
-                <p>Your student account has been created for <strong>{student['university_name']}</strong>.</p>
-                <p>To complete your account setup, please click the button below to create your password:</p>
-                <p><a href="{setup_link}" style="background-color: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">Set Up Password</a></p>
-                <p><strong>Your Student ID:</strong> {student['student_id']}</p>
-                <p>If you didn't request this account, please ignore this email.</p>
-                <p>Best regards,<br>PractiCheck Team</p>
-            </body>
-            </html>
-            """
+            email_subject, email_body, email_html = render_email(
+                "student_password_setup",
+                name=student['name'],
+                university_name=student['university_name'],
+                setup_link=setup_link,
+                student_id=student['student_id']
+            )
             
             try:
                 email_sent = await send_email(email, email_subject, email_body, email_html)
@@ -763,7 +810,7 @@ async def create_assessment_request(request: dict, current_user: dict = Depends(
             FROM users u
             JOIN student_profiles sp ON u.id = sp.user_id
             WHERE u.id = $1
-        """, current_user['user_id'])
+        """, current_user['id'])
         
         if not student_info:
             raise HTTPException(
@@ -781,7 +828,7 @@ async def create_assessment_request(request: dict, current_user: dict = Depends(
             RETURNING id
         """, 
         current_user['tenant_id'],
-        current_user['user_id'],
+        current_user['id'],
         student_info['faculty_id'],
         assessment_type,
         description,
@@ -789,23 +836,21 @@ async def create_assessment_request(request: dict, current_user: dict = Depends(
         due_date
         )
         
-        # Create notification for faculty admin
-        await conn.execute("""
-            INSERT INTO notifications (tenant_id, user_id, type, title, message, data)
-            SELECT $1, u.id, 'assessment_request', 'New Assessment Request', $2, $3
-            FROM users u
-            WHERE u.tenant_id = $1 AND u.faculty_id = $4 AND u.role = 'faculty_admin' AND u.is_active = true
-        """, 
-        current_user['tenant_id'],
-        f"New {assessment_type} assessment request from student",
-        json.dumps({
-            "request_id": str(request_id),
-            "student_id": current_user['user_id'],
-            "assessment_type": assessment_type,
-            "priority": priority
-        }),
-        student_info['faculty_id']
-        )
+        # Notify the faculty's admins
+        if student_info['faculty_id']:
+            await notify_audience(
+                conn,
+                Audience(current_user['tenant_id'], faculty_id=student_info['faculty_id'], role='faculty_admin'),
+                'assessment_request',
+                'New Assessment Request',
+                f"New {assessment_type} assessment request from student",
+                {
+                    "request_id": str(request_id),
+                    "student_id": current_user['id'],
+                    "assessment_type": assessment_type,
+                    "priority": priority
+                }
+            )
         
         # Log activity
         await conn.execute("""
@@ -813,7 +858,7 @@ async def create_assessment_request(request: dict, current_user: dict = Depends(
             VALUES ($1, $2, 'user', 'Assessment Request Created', 'assessment_request', $3, $4)
         """, 
         current_user['tenant_id'],
-        current_user['user_id'],
+        current_user['id'],
         request_id,
         json.dumps({
             "assessment_type": assessment_type,
@@ -853,7 +898,7 @@ async def get_student_assessment_requests(current_user: dict = Depends(get_curre
             LEFT JOIN users u_lecturer ON ar.assigned_lecturer_id = u_lecturer.id
             WHERE ar.tenant_id = $1 AND ar.student_id = $2
             ORDER BY ar.requested_at DESC
-        """, current_user['tenant_id'], current_user['user_id'])
+        """, current_user['tenant_id'], current_user['id'])
         
         result = []
         for req in requests:
@@ -890,6 +935,8 @@ async def create_logbook_entry(request: dict, current_user: dict = Depends(get_c
     supervisor_email = request.get('supervisor_email')
     hours_worked = request.get('hours_worked', 8.0)
     location = request.get('location', '')
+    # Optional device coordinates of the placement, used for visit planning
+    latitude, longitude = parse_coordinates(request.get('latitude'), request.get('longitude'))
     
     if not all([entry_date, title, description]):
         raise HTTPException(
@@ -912,7 +959,7 @@ async def create_logbook_entry(request: dict, current_user: dict = Depends(get_c
         existing = await conn.fetchval("""
             SELECT id FROM logbook_entries 
             WHERE student_id = $1 AND entry_date = $2
-        """, current_user['user_id'], entry_date_obj)
+        """, current_user['id'], entry_date_obj)
         
         if existing:
             raise HTTPException(
@@ -928,20 +975,20 @@ async def create_logbook_entry(request: dict, current_user: dict = Depends(get_c
             WHERE u.id = $1 AND a.status = 'active'
             ORDER BY a.created_at DESC
             LIMIT 1
-        """, current_user['user_id'])
+        """, current_user['id'])
         
         # Create logbook entry
         entry_id = await conn.fetchval("""
             INSERT INTO logbook_entries (
                 tenant_id, student_id, attachment_id, entry_date, title, description,
                 activities, skills_learned, challenges_faced, supervisor_email,
-                hours_worked, location, is_edited
+                hours_worked, location, latitude, longitude, is_edited
             )
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, false)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, false)
             RETURNING id
         """, 
         current_user['tenant_id'],
-        current_user['user_id'],
+        current_user['id'],
         attachment_info['attachment_id'] if attachment_info else None,
         entry_date_obj,
         title,
@@ -951,8 +998,11 @@ async def create_logbook_entry(request: dict, current_user: dict = Depends(get_c
         challenges_faced,
         supervisor_email,
         hours_worked,
-        location
+        location,
+        latitude,
+        longitude
         )
+        supervisor_students.invalidate(supervisor_email)
         
         # Log activity
         await conn.execute("""
@@ -960,7 +1010,7 @@ async def create_logbook_entry(request: dict, current_user: dict = Depends(get_c
             VALUES ($1, $2, 'user', 'Logbook Entry Created', 'logbook_entry', $3, $4)
         """, 
         current_user['tenant_id'],
-        current_user['user_id'],
+        current_user['id'],
         entry_id,
         json.dumps({
             "entry_date": entry_date,
@@ -989,7 +1039,7 @@ async def update_logbook_entry(entry_id: str, request: dict, current_user: dict
             SELECT id, is_edited, entry_date, title
             FROM logbook_entries 
             WHERE id = $1 AND student_id = $2 AND tenant_id = $3
-        """, entry_id, current_user['user_id'], current_user['tenant_id'])
+        """, entry_id, current_user['id'], current_user['tenant_id'])
         
         if not entry:
             raise HTTPException(
@@ -1012,17 +1062,20 @@ async def update_logbook_entry(entry_id: str, request: dict, current_user: dict
         supervisor_email = request.get('supervisor_email')
         hours_worked = request.get('hours_worked', 8.0)
         location = request.get('location', '')
+        latitude, longitude = parse_coordinates(request.get('latitude'), request.get('longitude'))
         
         await conn.execute("""
             UPDATE logbook_entries 
             SET title = $1, description = $2, activities = $3, skills_learned = $4,
                 challenges_faced = $5, supervisor_email = $6, hours_worked = $7,
-                location = $8, is_edited = true, edited_at = NOW()
-            WHERE id = $9
+                location = $8, latitude = $9, longitude = $10, is_edited = true, edited_at = NOW(),
+                supervisor_status = 'pending', supervisor_reviewed_at = NULL, supervisor_reviewed_by = NULL
+            WHERE id = $11
         """, 
         title, description, json.dumps(activities), skills_learned,
-        challenges_faced, supervisor_email, hours_worked, location, entry_id
+        challenges_faced, supervisor_email, hours_worked, location, latitude, longitude, entry_id
         )
+        supervisor_students.invalidate(supervisor_email)
         
         # Log activity
         await conn.execute("""
@@ -1030,7 +1083,7 @@ async def update_logbook_entry(entry_id: str, request: dict, current_user: dict
             VALUES ($1, $2, 'user', 'Logbook Entry Updated', 'logbook_entry', $3, $4)
         """, 
         current_user['tenant_id'],
-        current_user['user_id'],
+        current_user['id'],
         entry_id,
         json.dumps({
             "entry_date": entry['entry_date'].isoformat(),
@@ -1068,13 +1121,14 @@ async def get_student_logbook_entries(current_user: dict = Depends(get_current_u
                 le.is_edited,
                 le.edited_at,
                 le.created_at,
+                le.supervisor_status,
                 COUNT(lc.id) as comment_count
             FROM logbook_entries le
             LEFT JOIN logbook_comments lc ON le.id = lc.entry_id
             WHERE le.student_id = $1 AND le.tenant_id = $2
             GROUP BY le.id
             ORDER BY le.entry_date DESC
-        """, current_user['user_id'], current_user['tenant_id'])
+        """, current_user['id'], current_user['tenant_id'])
         
         result = []
         for entry in entries:
@@ -1094,76 +1148,161 @@ async def get_student_logbook_entries(current_user: dict = Depends(get_current_u
                 "is_edited": entry['is_edited'],
                 "edited_at": entry['edited_at'].isoformat() if entry['edited_at'] else None,
                 "created_at": entry['created_at'].isoformat(),
+                "supervisor_status": entry['supervisor_status'],
                 "comment_count": entry['comment_count']
             })
         
         return result
 
-# Supervisor Authentication Endpoints
-@app.post("/auth/supervisor/register", response_model=LoginResponse)
-async def supervisor_register(register_data: SupervisorRegisterRequest):
-    """Supervisor self-registration"""
-    async with db_pool.acquire() as conn:
-        # Check if email already exists
-        existing_user = await conn.fetchrow(
-            "SELECT id FROM users WHERE email = $1 AND role = 'supervisor'",
-            register_data.email
+@app.get("/lecturer/logbook/search")
+async def search_lecturer_logbooks(
+    q: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    sort: Optional[str] = Query(None, description="'-relevance' (default), 'relevance', '-entry_date' or 'entry_date'"),
+    student_id: Optional[str] = None,
+    fuzzy: bool = True,
+    current_user: dict = Depends(get_current_user)
+):
+    """Search the logbook entries of the lecturer's assigned students"""
+    if current_user.get('role') != 'lecturer':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only lecturers can search their students' logbooks"
         )
-        
-        if existing_user:
+    if student_id:
+        try:
+            student_id = str(uuid.UUID(student_id))
+        except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
+                detail="Invalid student id"
             )
-        
-        # Create supervisor user (no tenant_id for supervisors)
-        password_hash = hash_password(register_data.password)
-        user_id = await conn.fetchval("""
-            INSERT INTO users (email, password_hash, name, role, is_active)
-            VALUES ($1, $2, $3, 'supervisor', true)
-            RETURNING id
-        """, register_data.email, password_hash, register_data.name)
-        
-        # Create supervisor profile
-        await conn.execute("""
-            INSERT INTO supervisor_profiles 
-            (user_id, company_name, industry, position, phone, company_address, years_experience)
-            VALUES ($1, $2, $3, $4, $5, $6, $7)
-        """, user_id, register_data.company_name, register_data.industry, 
-            register_data.position, register_data.phone, 
-            register_data.company_address, register_data.years_experience)
-        
-        # Create access token
-        token_data = {
-            "user_id": str(user_id),
+    
+    async with db_pool.acquire() as conn:
+        try:
+            results, next_cursor = await search_logbook_entries(
+                conn,
+                SearchScope(current_user['tenant_id'], lecturer_id=current_user['id']),
+                q, limit=limit, cursor=cursor, sort=sort, student_id=student_id, fuzzy=fuzzy
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return {"results": results, "next_cursor": next_cursor}
+
+# Supervisor Authentication Endpoints
+async def issue_supervisor_verification(conn, user_id, email: str) -> str:
+    """Store a verification token for a supervisor's current email and return it"""
+    token = generate_token()
+    await conn.execute("""
+        INSERT INTO supervisor_email_verifications (token_hash, user_id, email, expires_at)
+        VALUES ($1, $2, $3, NOW() + make_interval(hours => $4))
+    """, hash_token(token), user_id, email, SUPERVISOR_VERIFICATION_HOURS)
+    return token
+
+async def send_supervisor_verification(email: str, name: str, token: str) -> bool:
+    """Email a supervisor the link that proves they own their address"""
+    verification_link = f"http://localhost:3000/auth/supervisor/verify-email?token={token}"
+    email_subject, email_body, email_html = render_email(
+        "supervisor_email_verification",
+        name=name,
+        verification_link=verification_link,
+        expires_hours=SUPERVISOR_VERIFICATION_HOURS
+    )
+    try:
+        return await send_email(email, email_subject, email_body, email_html)
+    except Exception as e:
+        logger.error(f"Error sending supervisor verification email to {email}: {e}")
+        return False
+
+@app.post("/auth/supervisor/register", response_model=LoginResponse)
+async def supervisor_register(register_data: SupervisorRegisterRequest):
+    """Supervisor self-registration; logbook access waits until the email is verified"""
+    async with db_pool.acquire() as conn:
+        async with conn.transaction():
+            # Supervisor emails are unique regardless of case (idx_users_supervisor_email_lower)
+            password_hash = hash_password(register_data.password)
+            user_id = await conn.fetchval("""
+                INSERT INTO users (email, password_hash, name, role, is_active)
+                VALUES ($1, $2, $3, 'supervisor', true)
+                ON CONFLICT (lower(email)) WHERE role = 'supervisor' DO NOTHING
+                RETURNING id
+            """, register_data.email, password_hash, register_data.name)
+            
+            if not user_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Email already registered"
+                )
+            
+            # Create supervisor profile
+            await conn.execute("""
+                INSERT INTO supervisor_profiles 
+                (user_id, company_name, industry, position, phone, company_address, years_experience)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
+            """, user_id, register_data.company_name, register_data.industry, 
+                register_data.position, register_data.phone, 
+                register_data.company_address, register_data.years_experience)
+            
+            verification_token = await issue_supervisor_verification(conn, user_id, register_data.email)
+    
+    # Create access token
+    token_data = {
+        "user_id": str(user_id),
+        "email": register_data.email,
+        "role": "supervisor"
+    }
+    access_token = create_access_token(token_data)
+    
+    await send_supervisor_verification(register_data.email, register_data.name, verification_token)
+    
+    return LoginResponse(
+        access_token=access_token,
+        token_type="bearer",
+        user={
+            "id": str(user_id),
             "email": register_data.email,
-            "role": "supervisor"
-        }
-        access_token = create_access_token(token_data)
-        
-        # Send welcome email
-        await send_email(
-            register_data.email,
-            "Welcome to PractiCheck - Supervisor Account Created",
-            f"Welcome {register_data.name}! Your supervisor account has been created successfully."
-        )
-        
-        return LoginResponse(
-            access_token=access_token,
-            token_type="bearer",
-            user={
-                "id": str(user_id),
-                "email": register_data.email,
-                "name": register_data.name,
-                "role": "supervisor",
-                "profile": {
-                    "company_name": register_data.company_name,
-                    "industry": register_data.industry,
-                    "position": register_data.position,
-                    "years_experience": register_data.years_experience
-                }
+            "name": register_data.name,
+            "role": "supervisor",
+            "email_verified": False,
+            "profile": {
+                "company_name": register_data.company_name,
+                "industry": register_data.industry,
+                "position": register_data.position,
+                "years_experience": register_data.years_experience
             }
-        )
+        }
+    )
+
+@app.post("/auth/supervisor/verify-email")
+async def supervisor_verify_email(verify_data: SupervisorVerifyEmailRequest):
+    """Confirm a supervisor's email from the emailed link"""
+    async with db_pool.acquire() as conn:
+        async with conn.transaction():
+            # Tokens only count for the address they were sent to
+            user_id = await conn.fetchval("""
+                UPDATE supervisor_email_verifications v
+                SET used_at = NOW()
+                FROM users u
+                WHERE v.token_hash = $1 AND v.used_at IS NULL AND v.expires_at > NOW()
+                  AND u.id = v.user_id AND u.role = 'supervisor' AND lower(u.email) = lower(v.email)
+                RETURNING v.user_id
+            """, hash_token(verify_data.token))
+            
+            if not user_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid or expired verification link"
+                )
+            
+            await conn.execute("""
+                UPDATE supervisor_profiles
+                SET email_verified_at = COALESCE(email_verified_at, NOW()), updated_at = NOW()
+                WHERE user_id = $1
+            """, user_id)
+    
+    return {"message": "Email verified"}
 
 @app.post("/auth/supervisor/login", response_model=LoginResponse)
 async def supervisor_login(login_data: LoginRequest):
@@ -1179,10 +1318,10 @@ async def supervisor_login(login_data: LoginRequest):
         supervisor = await conn.fetchrow("""
             SELECT u.id, u.email, u.password_hash, u.name, u.role, u.is_active,
                    sp.company_name, sp.industry, sp.position, sp.phone, 
-                   sp.company_address, sp.years_experience
+                   sp.company_address, sp.years_experience, sp.email_verified_at
             FROM users u
             JOIN supervisor_profiles sp ON u.id = sp.user_id
-            WHERE u.email = $1 AND u.role = 'supervisor' AND u.is_active = true
+            WHERE lower(u.email) = lower($1) AND u.role = 'supervisor' AND u.is_active = true
         """, login_data.email)
         
         if not supervisor or not verify_password(login_data.password, supervisor['password_hash']):
@@ -1213,6 +1352,7 @@ async def supervisor_login(login_data: LoginRequest):
                 "email": supervisor['email'],
                 "name": supervisor['name'],
                 "role": supervisor['role'],
+                "email_verified": supervisor['email_verified_at'] is not None,
                 "profile": {
                     "company_name": supervisor['company_name'],
                     "industry": supervisor['industry'],
@@ -1224,6 +1364,338 @@ async def supervisor_login(login_data: LoginRequest):
             }
         )
 
+# Supervisor Review
+
+class SupervisorStudents:
+    """Per-supervisor cache of the students whose logbooks name them
+
+    Entries link to supervisors only by email, so the set is derived from
+    logbook_entries. A student naming a supervisor in this process
+    invalidates it at once; other processes pick it up after the TTL.
+    """
+
+    def __init__(self, ttl_seconds: float = SUPERVISOR_STUDENTS_CACHE_SECONDS, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._cache: Dict[str, tuple] = {}
+
+    def invalidate(self, email: Optional[str]):
+        if email:
+            self._cache.pop(email.strip().lower(), None)
+
+    async def get(self, conn, email: str) -> List[dict]:
+        key = email.strip().lower()
+        cached = self._cache.get(key)
+        now = time.monotonic()
+        if cached and now - cached[0] < self.ttl_seconds:
+            return cached[1]
+        
+        rows = await conn.fetch("""
+            SELECT le.student_id, u.name, u.email, t.name as university_name,
+                   COUNT(*) as entry_count, MAX(le.entry_date) as last_entry_date
+            FROM logbook_entries le
+            JOIN users u ON le.student_id = u.id
+            JOIN tenants t ON le.tenant_id = t.id
+            WHERE lower(le.supervisor_email) = $1 AND le.supervisor_email IS NOT NULL
+            GROUP BY le.student_id, u.name, u.email, t.name
+            ORDER BY u.name
+        """, key)
+        students = [
+            {
+                "id": str(row['student_id']),
+                "name": row['name'],
+                "email": row['email'],
+                "university_name": row['university_name'],
+                "entry_count": row['entry_count'],
+                "last_entry_date": row['last_entry_date'].isoformat() if row['last_entry_date'] else None
+            }
+            for row in rows
+        ]
+        
+        if len(self._cache) >= self.max_entries:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = (now, students)
+        return students
+
+supervisor_students = SupervisorStudents()
+
+# Oldest first, ties broken by id
+PENDING_REVIEW_SORT = Sort("entry_date", SortKey("le.entry_date", "date"), False)
+
+async def get_current_supervisor(token_data: dict = Depends(verify_token)) -> dict:
+    """Get current industry supervisor (supervisors belong to no tenant)"""
+    async with db_pool.acquire() as conn:
+        supervisor = await conn.fetchrow("""
+            SELECT u.id, u.email, u.name, u.role, sp.email_verified_at
+            FROM users u
+            JOIN supervisor_profiles sp ON u.id = sp.user_id
+            WHERE u.id = $1 AND u.role = 'supervisor' AND u.is_active = true
+        """, token_data.get("user_id"))
+        
+        if not supervisor:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Supervisor not found"
+            )
+        return dict(supervisor)
+
+async def get_verified_supervisor(current_user: dict = Depends(get_current_supervisor)) -> dict:
+    """Supervisor whose email is verified; logbooks are shared by naming that email"""
+    if current_user['email_verified_at'] is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Verify your email address to access student logbooks"
+        )
+    return current_user
+
+@app.post("/auth/supervisor/verify-email/resend")
+async def resend_supervisor_verification(current_user: dict = Depends(get_current_supervisor)):
+    """Send a fresh verification link to the current supervisor"""
+    if current_user['email_verified_at'] is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already verified"
+        )
+    
+    async with db_pool.acquire() as conn:
+        recently_sent = await conn.fetchval("""
+            SELECT EXISTS (
+                SELECT 1 FROM supervisor_email_verifications
+                WHERE user_id = $1 AND created_at > NOW() - INTERVAL '1 minute'
+            )
+        """, current_user['id'])
+        if recently_sent:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="A verification email was just sent; please wait a minute before requesting another"
+            )
+        verification_token = await issue_supervisor_verification(conn, current_user['id'], current_user['email'])
+    
+    email_sent = await send_supervisor_verification(current_user['email'], current_user['name'], verification_token)
+    return {"email_sent": email_sent}
+
+@app.get("/supervisor/students")
+async def get_supervisor_students(current_user: dict = Depends(get_verified_supervisor)):
+    """Get the students whose logbooks name the current supervisor"""
+    async with db_pool.acquire() as conn:
+        return await supervisor_students.get(conn, current_user['email'])
+
+@app.get("/supervisor/logbook/pending")
+async def get_pending_logbook_entries(
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    student_id: Optional[str] = None,
+    current_user: dict = Depends(get_verified_supervisor)
+):
+    """Get a page of logbook entries awaiting the supervisor's review across all their students, oldest first"""
+    args = [current_user['email'].strip().lower()]
+    filters = ""
+    if student_id:
+        try:
+            args.append(str(uuid.UUID(student_id)))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid student id"
+            )
+        filters += f" AND le.student_id = ${len(args)}::uuid"
+    if cursor:
+        try:
+            args.extend(decode_cursor(cursor, PENDING_REVIEW_SORT))
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        filters += f" AND (le.entry_date, le.id) > (${len(args) - 1}::text::date, ${len(args)}::text::uuid)"
+    
+    limit = clamp_limit(limit)
+    async with db_pool.acquire() as conn:
+        rows = await conn.fetch(f"""
+            SELECT 
+                le.id,
+                le.student_id,
+                le.entry_date,
+                le.title,
+                le.description,
+                le.activities,
+                le.skills_learned,
+                le.challenges_faced,
+                le.hours_worked,
+                le.location,
+                le.is_edited,
+                le.created_at,
+                u.name as student_name
+            FROM logbook_entries le
+            JOIN users u ON le.student_id = u.id
+            WHERE lower(le.supervisor_email) = $1 AND le.supervisor_email IS NOT NULL
+              AND le.supervisor_status = 'pending' {filters}
+            {order_by(PENDING_REVIEW_SORT, "le.id")}
+            LIMIT {limit + 1}
+        """, *args)
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(PENDING_REVIEW_SORT, rows[-1]['entry_date'], rows[-1]['id'])
+    
+    return {
+        "entries": [
+            {
+                "id": str(entry['id']),
+                "student_id": str(entry['student_id']),
+                "student_name": entry['student_name'],
+                "entry_date": entry['entry_date'].isoformat(),
+                "title": entry['title'],
+                "description": entry['description'],
+                "activities": json.loads(entry['activities']) if entry['activities'] else [],
+                "skills_learned": entry['skills_learned'],
+                "challenges_faced": entry['challenges_faced'],
+                "hours_worked": float(entry['hours_worked']) if entry['hours_worked'] else 0.0,
+                "location": entry['location'],
+                "is_edited": entry['is_edited'],
+                "created_at": entry['created_at'].isoformat()
+            }
+            for entry in rows
+        ],
+        "next_cursor": next_cursor
+    }
+
+@app.post("/supervisor/logbook/review")
+async def review_logbook_entries(
+    review_data: ReviewLogbookEntriesRequest,
+    current_user: dict = Depends(get_verified_supervisor)
+):
+    """Approve, comment on and rate many logbook entries in one transaction"""
+    if len(review_data.reviews) > SUPERVISOR_REVIEW_MAX_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch may contain at most {SUPERVISOR_REVIEW_MAX_BATCH} reviews"
+        )
+    
+    # Outcome per review, in the order they were given
+    outcomes: List[Optional[tuple]] = [None] * len(review_data.reviews)
+    reviews = {}
+    for index, review in enumerate(review_data.reviews):
+        try:
+            entry_id = str(uuid.UUID(review.entry_id))
+        except ValueError:
+            outcomes[index] = ("invalid_id", "Not a valid entry id")
+            continue
+        if entry_id in reviews:
+            outcomes[index] = ("duplicate", "Entry already reviewed earlier in this batch")
+        elif review.action == "comment" and not (review.comment and review.comment.strip()) and review.rating is None:
+            outcomes[index] = ("invalid", "A comment or rating is required")
+        else:
+            reviews[entry_id] = (index, review)
+    
+    async with db_pool.acquire() as conn:
+        async with conn.transaction():
+            entries = await conn.fetch("""
+                SELECT le.id, le.tenant_id, le.student_id, le.entry_date, le.title, le.supervisor_status
+                FROM logbook_entries le
+                WHERE le.id = ANY($1::uuid[]) AND lower(le.supervisor_email) = $2 AND le.supervisor_email IS NOT NULL
+                ORDER BY le.id
+                FOR UPDATE
+            """, list(reviews), current_user['email'].strip().lower())
+            found = {str(entry['id']): entry for entry in entries}
+            
+            reviewed = []
+            for entry_id, (index, review) in reviews.items():
+                if entry_id in found:
+                    reviewed.append((found[entry_id], review))
+                else:
+                    outcomes[index] = ("not_found", "Logbook entry not found")
+            
+            approve_ids = [entry['id'] for entry, review in reviewed if review.action == "approve" and entry['supervisor_status'] != 'approved']
+            if approve_ids:
+                await conn.execute("""
+                    UPDATE logbook_entries
+                    SET supervisor_status = 'approved', supervisor_reviewed_at = NOW(), supervisor_reviewed_by = $2
+                    WHERE id = ANY($1::uuid[])
+                """, approve_ids, current_user['id'])
+            
+            # One comment row per review that carries a comment or rating
+            commented = [
+                (entry, review) for entry, review in reviewed
+                if (review.comment and review.comment.strip()) or review.rating is not None
+            ]
+            if commented:
+                await conn.execute("""
+                    INSERT INTO logbook_comments (tenant_id, entry_id, commenter_id, commenter_type, comment, rating, is_private)
+                    SELECT x.tenant_id, x.entry_id, $1, 'supervisor', x.comment, x.rating, x.is_private
+                    FROM unnest($2::uuid[], $3::uuid[], $4::text[], $5::int[], $6::boolean[])
+                        AS x(tenant_id, entry_id, comment, rating, is_private)
+                """, current_user['id'],
+                [entry['tenant_id'] for entry, review in commented],
+                [entry['id'] for entry, review in commented],
+                [(review.comment or "").strip() for entry, review in commented],
+                [review.rating for entry, review in commented],
+                [review.is_private for entry, review in commented])
+            
+            # One notification per student summarising the batch, not one per entry
+            per_student = {}
+            for entry, review in reviewed:
+                summary = per_student.setdefault(entry['student_id'], {"tenant_id": entry['tenant_id'], "approved": 0, "commented": 0})
+                if review.action == "approve":
+                    summary["approved"] += 1
+                if not review.is_private and ((review.comment and review.comment.strip()) or review.rating is not None):
+                    summary["commented"] += 1
+            
+            if per_student:
+                messages = []
+                for summary in per_student.values():
+                    parts = []
+                    if summary["approved"]:
+                        parts.append(f"approved {summary['approved']} logbook {'entry' if summary['approved'] == 1 else 'entries'}")
+                    if summary["commented"]:
+                        parts.append(f"left feedback on {summary['commented']}")
+                    messages.append(f"{current_user['name']} {' and '.join(parts) or 'reviewed your logbook'}")
+                await conn.execute("""
+                    INSERT INTO notifications (tenant_id, user_id, type, title, message, data)
+                    SELECT x.tenant_id, x.student_id, 'logbook_review', 'Logbook Reviewed', x.message, x.data::jsonb
+                    FROM unnest($1::uuid[], $2::uuid[], $3::text[], $4::text[]) AS x(tenant_id, student_id, message, data)
+                """,
+                [summary["tenant_id"] for summary in per_student.values()],
+                list(per_student),
+                messages,
+                [
+                    json.dumps({"supervisor_id": str(current_user['id']), "approved": summary["approved"], "commented": summary["commented"]})
+                    for summary in per_student.values()
+                ])
+            
+            # Log activity, one entry per reviewed logbook entry
+            if reviewed:
+                await conn.execute("""
+                    INSERT INTO activity_logs (tenant_id, user_id, user_type, action, target_type, target_id, details)
+                    SELECT x.tenant_id, $1, 'user', 'Logbook Entry Reviewed', 'logbook_entry', x.entry_id, x.details::jsonb
+                    FROM unnest($2::uuid[], $3::uuid[], $4::text[]) AS x(tenant_id, entry_id, details)
+                """, current_user['id'],
+                [entry['tenant_id'] for entry, review in reviewed],
+                [entry['id'] for entry, review in reviewed],
+                [
+                    json.dumps({
+                        "action": review.action,
+                        "entry_date": entry['entry_date'].isoformat(),
+                        "title": entry['title'],
+                        "rating": review.rating,
+                        "supervisor_email": current_user['email']
+                    })
+                    for entry, review in reviewed
+                ])
+    
+    for entry, review in reviewed:
+        outcomes[reviews[str(entry['id'])][0]] = ("ok", None)
+    
+    results = [
+        {"entry_id": review.entry_id, "outcome": outcome, "detail": detail}
+        for review, (outcome, detail) in zip(review_data.reviews, outcomes)
+    ]
+    return {
+        "message": "Logbook review completed",
+        "approved": len(approve_ids),
+        "commented": len(commented),
+        "failed": sum(1 for result in results if result['outcome'] != "ok"),
+        "results": results
+    }
+
 # Faculty Admin Authentication Endpoints
 @app.post("/auth/faculty-admin/login", response_model=LoginResponse)
 async def faculty_admin_login(login_data: LoginRequest):
@@ -1347,6 +1819,233 @@ async def university_admin_login(login_data: LoginRequest):
             }
         )
 
+# Notification Inbox
+
+# Newest first, ties broken by id
+INBOX_SORT = Sort("created_at", SortKey("created_at", "timestamptz"), True)
+
+async def get_unread_count(conn, user_id) -> int:
+    """Maintained counters for notification rows and broadcasts addressed to the user"""
+    broadcasts = await count_unread_broadcasts(conn, user_id)
+    return broadcasts + await conn.fetchval("""
+        SELECT unread_count FROM notification_counters WHERE user_id = $1
+    """, user_id)
+
+@app.get("/notifications")
+async def get_notifications(
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    unread_only: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of the current user's notifications and broadcasts, newest first"""
+    args = [current_user['id']]
+    notification_filters = ""
+    broadcast_filters = ""
+    if unread_only:
+        notification_filters += " AND is_read = false"
+        broadcast_filters += UNREAD_BY_USER
+    if cursor:
+        try:
+            args.extend(decode_cursor(cursor, INBOX_SORT))
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        notification_filters += " AND (created_at, id) < ($2::text::timestamptz, $3::text::uuid)"
+        broadcast_filters += " AND (b.created_at, b.id) < ($2::text::timestamptz, $3::text::uuid)"
+    
+    limit = clamp_limit(limit)
+    async with db_pool.acquire() as conn:
+        # Each branch is a keyset scan of its own index; the merge only sees 2 * (limit + 1) rows
+        rows = await conn.fetch(f"""
+            SELECT * FROM (
+                (
+                    SELECT {NOTIFICATION_COLUMNS}
+                    FROM notifications
+                    WHERE user_id = $1 {notification_filters}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT {limit + 1}
+                )
+                UNION ALL
+                (
+                    SELECT {BROADCAST_COLUMNS}
+                    {USER_BROADCASTS} {broadcast_filters}
+                    ORDER BY b.created_at DESC, b.id DESC
+                    LIMIT {limit + 1}
+                )
+            ) items
+            {order_by(INBOX_SORT, "id")}
+            LIMIT {limit + 1}
+        """, *args)
+        unread_count = await get_unread_count(conn, current_user['id'])
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(INBOX_SORT, rows[-1]['created_at'], rows[-1]['id'])
+    
+    return {
+        "notifications": [serialize_notification(row) for row in rows],
+        "next_cursor": next_cursor,
+        "unread_count": unread_count
+    }
+
+@app.get("/notifications/unread-count")
+async def get_notifications_unread_count(current_user: dict = Depends(get_current_user)):
+    """Get the current user's unread notification count"""
+    async with db_pool.acquire() as conn:
+        return {"unread_count": await get_unread_count(conn, current_user['id'])}
+
+@app.post("/notifications/read")
+async def mark_notifications_read(
+    request: MarkNotificationsReadRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Mark notifications and broadcasts read by id list or everything up to a stream cursor"""
+    if not request.ids and request.up_to_seq is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide ids or up_to_seq"
+        )
+    
+    ids = None
+    if request.ids:
+        try:
+            ids = [str(uuid.UUID(notification_id)) for notification_id in request.ids]
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid notification id"
+            )
+    
+    async with db_pool.acquire() as conn:
+        async with conn.transaction():
+            result = await conn.execute("""
+                UPDATE notifications
+                SET is_read = true, read_at = NOW()
+                WHERE user_id = $1 AND is_read = false
+                  AND ($2::uuid[] IS NULL OR id = ANY($2::uuid[]))
+                  AND ($3::bigint IS NULL OR seq <= $3::bigint)
+            """, current_user['id'], ids, request.up_to_seq)
+            # Broadcast read state is written only now, when the recipient reads it;
+            # reads below the counter's watermark come off its cached broadcast count
+            broadcasts = await conn.fetchval(f"""
+                WITH marked AS (
+                    INSERT INTO notification_broadcast_reads (broadcast_id, user_id)
+                    SELECT b.id, $1
+                    {USER_BROADCASTS}
+                      AND ($2::uuid[] IS NULL OR b.id = ANY($2::uuid[]))
+                      AND ($3::bigint IS NULL OR b.seq <= $3::bigint)
+                    ON CONFLICT (broadcast_id, user_id) DO NOTHING
+                    RETURNING broadcast_id
+                ), counted AS (
+                    UPDATE notification_counters c
+                    SET broadcast_unread = GREATEST(c.broadcast_unread - (
+                            SELECT COUNT(*) FROM marked
+                            JOIN notification_broadcasts b ON b.id = marked.broadcast_id
+                            WHERE b.seq <= c.broadcast_seq
+                        ), 0),
+                        updated_at = NOW()
+                    WHERE c.user_id = $1 AND EXISTS (SELECT 1 FROM marked)
+                )
+                SELECT COUNT(*) FROM marked
+            """, current_user['id'], ids, request.up_to_seq)
+            unread_count = await get_unread_count(conn, current_user['id'])
+    
+    return {
+        "marked_read": int(result.split()[-1]) + broadcasts,
+        "unread_count": unread_count
+    }
+
+# Notification Push
+
+async def authenticate_stream(token: Optional[str], authorization: Optional[str]) -> Optional[dict]:
+    """Resolve the user of a stream from a bearer header or, for EventSource/WebSocket clients, a token query parameter"""
+    if not token and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except (ExpiredSignatureError, InvalidTokenError):
+        return None
+    async with db_pool.acquire() as conn:
+        user = await conn.fetchrow(
+            "SELECT id, tenant_id FROM users WHERE id = $1 AND is_active = true",
+            payload.get("user_id")
+        )
+    return dict(user) if user else None
+
+@app.get("/notifications/stream")
+async def stream_notifications(
+    request: Request,
+    token: Optional[str] = None,
+    after: Optional[str] = Query(None, description="Resume after this stream cursor"),
+    authorization: Optional[str] = Header(None),
+    last_event_id: Optional[str] = Header(None)
+):
+    """Server-sent event stream of the current user's new notifications"""
+    user = await authenticate_stream(token, authorization)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token"
+        )
+    
+    # EventSource sends Last-Event-ID by itself when it reconnects
+    subscription = notification_hub.subscribe(user['id'], parse_last_event_id(last_event_id or after))
+    
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                batch = await subscription.next_batch()
+                if not batch:
+                    yield ": keepalive\n\n"
+                for notification in batch:
+                    yield sse_event(notification)
+        finally:
+            notification_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/notifications/ws")
+async def notifications_websocket(websocket: WebSocket, token: Optional[str] = None, after: Optional[str] = None):
+    """WebSocket stream of the current user's new notifications"""
+    user = await authenticate_stream(token, websocket.headers.get("authorization"))
+    if not user:
+        await websocket.close(code=4401)
+        return
+    
+    await websocket.accept()
+    subscription = notification_hub.subscribe(user['id'], parse_last_event_id(after))
+    
+    async def drain_client():
+        # The client only ever closes; reading is how the disconnect is noticed
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+    
+    reader = asyncio.create_task(drain_client())
+    try:
+        while not reader.done():
+            batch = await subscription.next_batch()
+            if not batch:
+                await websocket.send_json({"type": "keepalive"})
+            for notification in batch:
+                await websocket.send_json({"type": "notification", "notification": notification})
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: sending on a socket the client already closed
+        pass
+    finally:
+        reader.cancel()
+        notification_hub.unsubscribe(subscription)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002)
\ No newline at end of file
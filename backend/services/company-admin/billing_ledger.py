@@ -0,0 +1,49 @@
+"""
+PractiCheck Billing Ledger
+Reconciliation of the trigger-maintained per-tenant billing balances
+"""
+
+async def has_reconciled_today(conn) -> bool:
+    """Check whether balances were reconciled today"""
+    return bool(await conn.fetchval(
+        "SELECT COALESCE(MAX(reconciled_at)::date = CURRENT_DATE, false) FROM tenant_billing_balances"
+    ))
+
+async def reconcile_billing_balances(conn) -> int:
+    """Recompute every tenant's balance from invoices, returning how many had drifted
+
+    Invoice writes are blocked (reads are not) for the duration, so no trigger
+    delta can land between the recount and the overwrite.
+    """
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE invoices IN SHARE MODE")
+        drifted = await conn.fetchval("""
+            WITH actual AS (
+                SELECT t.id as tenant_id,
+                       COALESCE(SUM(CASE WHEN i.status IN ('pending', 'overdue') THEN i.amount ELSE 0 END), 0) as outstanding_amount,
+                       COALESCE(SUM(CASE WHEN i.status = 'paid' THEN i.amount ELSE 0 END), 0) as paid_amount,
+                       COUNT(i.id) as invoice_count
+                FROM tenants t
+                LEFT JOIN invoices i ON i.tenant_id = t.id
+                GROUP BY t.id
+            ),
+            reconciled AS (
+                INSERT INTO tenant_billing_balances (tenant_id, outstanding_amount, paid_amount, invoice_count, updated_at, reconciled_at)
+                SELECT tenant_id, outstanding_amount, paid_amount, invoice_count, NOW(), NOW()
+                FROM actual
+                ON CONFLICT (tenant_id) DO UPDATE SET
+                    outstanding_amount = EXCLUDED.outstanding_amount,
+                    paid_amount = EXCLUDED.paid_amount,
+                    invoice_count = EXCLUDED.invoice_count,
+                    reconciled_at = NOW()
+                RETURNING tenant_id
+            )
+            SELECT COUNT(*)
+            FROM actual a
+            LEFT JOIN tenant_billing_balances b ON a.tenant_id = b.tenant_id
+            WHERE b.tenant_id IS NULL
+               OR b.outstanding_amount <> a.outstanding_amount
+               OR b.paid_amount <> a.paid_amount
+               OR b.invoice_count <> a.invoice_count
+        """)
+    return drifted
@@ -0,0 +1,273 @@
+"""
+PractiCheck Invoice Documents
+Invoice PDF rendering in a process pool, a content-addressed disk cache and
+conditional/ranged file responses
+"""
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+import aiofiles
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from fpdf import FPDF
+
+logger = logging.getLogger(__name__)
+
+# Bump when the rendered layout changes so cached documents are rebuilt
+TEMPLATE_VERSION = "1"
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def document_key(invoice) -> str:
+    """Content address of an invoice document: changes whenever the invoice or its university changes"""
+    source = ":".join([
+        str(invoice['id']),
+        invoice['updated_at'].isoformat() if invoice['updated_at'] else "",
+        invoice['tenant_updated_at'].isoformat() if invoice['tenant_updated_at'] else "",
+        TEMPLATE_VERSION
+    ])
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+def invoice_document_data(invoice) -> dict:
+    """Plain, picklable fields used by the renderers"""
+    return {
+        "invoice_number": invoice['invoice_number'],
+        "university_name": invoice['university_name'],
+        "location": invoice['location'] or "",
+        "invoice_date": invoice['invoice_date'].strftime('%Y-%m-%d'),
+        "due_date": invoice['due_date'].strftime('%Y-%m-%d'),
+        "status": invoice['status'].title(),
+        "description": invoice['description'] or "PractiCheck Subscription",
+        "amount": float(invoice['amount'] or 0.0)
+    }
+
+def _latin1(text: str) -> str:
+    """Core PDF fonts only cover Latin-1"""
+    return text.encode("latin-1", "replace").decode("latin-1")
+
+def render_invoice_pdf(data: dict) -> bytes:
+    """Render an invoice PDF (runs in a worker process)"""
+    pdf = FPDF(format="A4")
+    pdf.set_auto_page_break(auto=True, margin=20)
+    pdf.add_page()
+
+    pdf.set_font("Helvetica", "B", 24)
+    pdf.cell(0, 12, "INVOICE", align="C", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", "", 14)
+    pdf.cell(0, 8, _latin1(f"#{data['invoice_number']}"), align="C", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(10)
+
+    top = pdf.get_y()
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(90, 7, "From:", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", "", 11)
+    pdf.multi_cell(90, 6, "PractiCheck Ltd.\n123 Business Street\nNairobi, Kenya\ninfo@practicheck.com")
+    bottom = pdf.get_y()
+
+    pdf.set_xy(110, top)
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(90, 7, "To:", new_x="LEFT", new_y="NEXT")
+    pdf.set_font("Helvetica", "", 11)
+    pdf.multi_cell(90, 6, _latin1(f"{data['university_name']}\n{data['location']}"))
+    pdf.set_y(max(bottom, pdf.get_y()) + 8)
+
+    pdf.set_font("Helvetica", "", 11)
+    for label, value in (("Invoice Date", data['invoice_date']), ("Due Date", data['due_date']), ("Status", data['status'])):
+        pdf.set_font("Helvetica", "B", 11)
+        pdf.cell(35, 7, f"{label}:")
+        pdf.set_font("Helvetica", "", 11)
+        pdf.cell(0, 7, _latin1(value), new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(8)
+
+    pdf.set_fill_color(242, 242, 242)
+    pdf.set_font("Helvetica", "B", 11)
+    pdf.cell(140, 9, "Description", border=1, fill=True)
+    pdf.cell(0, 9, "Amount", border=1, fill=True, align="R", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", "", 11)
+    pdf.cell(140, 9, _latin1(data['description']), border=1)
+    pdf.cell(0, 9, f"${data['amount']:,.2f}", border=1, align="R", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(140, 10, "Total:", border=1, align="R")
+    pdf.cell(0, 10, f"${data['amount']:,.2f}", border=1, align="R", new_x="LMARGIN", new_y="NEXT")
+
+    pdf.ln(16)
+    pdf.set_font("Helvetica", "", 10)
+    pdf.set_text_color(102, 102, 102)
+    pdf.cell(0, 6, "Thank you for your business!", align="C")
+
+    return bytes(pdf.output())
+
+class InvoiceDocumentCache:
+    """Disk cache of rendered invoice PDFs, addressed by document_key"""
+
+    def __init__(self, directory: str, workers: int, max_bytes: int):
+        self.directory = Path(directory)
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._rendering: Dict[str, asyncio.Future] = {}
+        self._writes_since_prune = 0
+
+    def start(self):
+        """Create the cache directory and the rendering process pool"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # spawn avoids forking a process that is already running an event loop and threads
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pdf"
+
+    async def open_pdf(self, invoice):
+        """Open the invoice's PDF for reading, rendering it once if it is not cached
+
+        The file is opened before anything is streamed, so a concurrent prune
+        cannot remove it mid-response; a file pruned before the open is a miss
+        """
+        key = document_key(invoice)
+        path = self.path_for(key)
+        try:
+            file = await aiofiles.open(path, "rb")
+        except FileNotFoundError:
+            await self._render_once(key, invoice, path)
+            return await aiofiles.open(path, "rb")
+
+        # Pruning goes by mtime, which is kept as the last use; atime is not
+        # updated on noatime/relatime mounts
+        try:
+            os.utime(file.fileno())
+        except OSError:
+            pass
+        return file
+
+    async def _render_once(self, key: str, invoice, path: Path) -> Path:
+        # Concurrent downloads of the same uncached invoice share one render
+        pending = self._rendering.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._render(invoice_document_data(invoice), path))
+            self._rendering[key] = pending
+            pending.add_done_callback(lambda _: self._rendering.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _render(self, data: dict, path: Path) -> Path:
+        loop = asyncio.get_running_loop()
+        content = await loop.run_in_executor(self.executor, render_invoice_pdf, data)
+        await asyncio.to_thread(self._write, path, content)
+        return path
+
+    def _write(self, path: Path, content: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(f".{os.getpid()}.tmp")
+        temporary.write_bytes(content)
+        os.replace(temporary, path)
+
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= 100:
+            self._writes_since_prune = 0
+            self._prune()
+
+    def _prune(self):
+        """Drop the least recently used documents once the cache exceeds its size limit"""
+        files = []
+        for entry in self.directory.glob("*/*.pdf"):
+            try:
+                files.append((entry.stat(), entry))
+            except FileNotFoundError:
+                continue
+        total = sum(stat.st_size for stat, _ in files)
+        if total <= self.max_bytes:
+            return
+        for stat, entry in sorted(files, key=lambda item: item[0].st_mtime):
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                continue
+            total -= stat.st_size
+            if total <= self.max_bytes:
+                break
+        logger.info(f"Pruned invoice document cache to {total} bytes")
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the client's If-None-Match already names this entity"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [value.strip() for value in header.split(",")]
+
+def parse_range(header: Optional[str], size: int):
+    """First byte range of a Range header as (start, end), None for the whole file, or ValueError if unsatisfiable"""
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if start:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(end), 0)
+        end = size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+async def _stream_file(file, start: int, length: int):
+    try:
+        await file.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await file.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await file.close()
+
+async def file_response(request: Request, file, etag: str, media_type: str, filename: str) -> Response:
+    """Stream an open cached document with ETag revalidation and single byte-range support"""
+    quoted_etag = f'"{etag}"'
+    headers = {
+        "ETag": quoted_etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=0, must-revalidate",
+        "Content-Disposition": f"attachment; filename={filename}"
+    }
+    if etag_matches(request, quoted_etag):
+        await file.close()
+        return Response(status_code=304, headers={"ETag": quoted_etag})
+
+    size = os.fstat(file.fileno()).st_size
+    byte_range = None
+    if request.headers.get("if-range") in (None, quoted_etag):
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except ValueError:
+            await file.close()
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(_stream_file(file, 0, size), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(_stream_file(file, start, length), status_code=206, media_type=media_type, headers=headers)
@@ -3,22 +3,69 @@ PractiCheck Company Admin API
 FastAPI backend for company dashboard management
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
-import asyncpg
 import bcrypt
 import jwt
 from jwt.exceptions import ExpiredSignatureError, InvalidTokenError
 import os
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 import logging
 import uuid
+import asyncio
+from decimal import Decimal
+import time
 from contextlib import asynccontextmanager
 import json
 from dotenv import load_dotenv
+import sys
+from pathlib import Path
+from billing_ledger import has_reconciled_today, reconcile_billing_balances
+from invoice_documents import (
+    InvoiceDocumentCache,
+    document_key,
+    etag_matches,
+    file_response,
+    invoice_document_data
+)
+from metrics_history import (
+    HISTORY_BUCKETS,
+    HISTORY_METRICS,
+    get_metric_history,
+    get_monthly_growth,
+    has_snapshot_for_today,
+    rollup_and_prune_metrics,
+    snapshot_tenant_metrics,
+)
+
+# Shared backend utilities live alongside the services directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from shared.metrics import (
+    MetricsMiddleware,
+    ServiceMetricsAggregator,
+    metrics_response,
+    start_runtime_sampler,
+    stop_runtime_sampler,
+)
+from shared.db import create_pool
+from shared.slow_queries import collect_slow_queries, is_slow_query_reader, slow_queries_response
+from shared.jobs import JobContext, JobWorker, enqueue_job, get_job
+from shared.mailer import Mailer, OutgoingEmail
+from shared.pagination import (
+    CountEstimator,
+    QueryFilters,
+    SortKey,
+    add_keyset_condition,
+    clamp_limit,
+    encode_cursor,
+    order_by,
+    parse_sort,
+    set_page_headers,
+)
+from shared.templating import preload_templates, render_email, render_emails, render_template
 
 # Load environment variables from .env file
 load_dotenv("../../../.env")
@@ -28,6 +75,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration
+SERVICE_NAME = "company-admin"
 DATABASE_URL = os.getenv("DATABASE_URL")
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 JWT_ALGORITHM = "HS256"
@@ -40,6 +88,54 @@ EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "True").lower() == "true"
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER)
+MAIL_CONCURRENCY = int(os.getenv("MAIL_CONCURRENCY", "10"))
+
+# Platform overview refresh configuration
+OVERVIEW_REFRESH_SECONDS = int(os.getenv("OVERVIEW_REFRESH_SECONDS", "300"))
+OVERVIEW_REFRESH_DEBOUNCE_SECONDS = float(os.getenv("OVERVIEW_REFRESH_DEBOUNCE_SECONDS", "2"))
+
+# Metrics history configuration
+METRICS_SNAPSHOT_CHECK_SECONDS = int(os.getenv("METRICS_SNAPSHOT_CHECK_SECONDS", "3600"))
+METRICS_DAILY_RETENTION_DAYS = int(os.getenv("METRICS_DAILY_RETENTION_DAYS", "90"))
+
+# System metrics configuration
+METRICS_TARGETS = [
+    target.strip()
+    for target in os.getenv(
+        "METRICS_TARGETS",
+        "http://localhost:8000,http://localhost:8001,http://localhost:8002,http://localhost:8003,http://localhost:8004"
+    ).split(",")
+    if target.strip()
+]
+METRICS_SCRAPE_TIMEOUT_SECONDS = float(os.getenv("METRICS_SCRAPE_TIMEOUT_SECONDS", "2"))
+
+# Other services whose slow query logs are merged into the dashboard
+SLOW_QUERY_TARGETS = [
+    target.strip()
+    for target in os.getenv(
+        "SLOW_QUERY_TARGETS",
+        "http://localhost:8002,http://localhost:8003,http://localhost:8004"
+    ).split(",")
+    if target.strip()
+]
+
+# Background job configuration (set JOB_WORKERS=0 to run jobs only in worker.py processes)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Nightly reconciliation of the per-tenant billing balances
+BILLING_RECONCILE_CHECK_SECONDS = int(os.getenv("BILLING_RECONCILE_CHECK_SECONDS", "3600"))
+
+# Bulk billing runs render and send invoices in chunks of this many tenants
+BILLING_RUN_CHUNK_SIZE = int(os.getenv("BILLING_RUN_CHUNK_SIZE", "500"))
+BILLING_RUN_FLUSH_SIZE = 50
+
+# Rendered invoice PDFs are cached on disk, keyed by invoice and university versions
+INVOICE_PDF_CACHE_DIR = os.getenv("INVOICE_PDF_CACHE_DIR", "/tmp/practicheck/invoices")
+INVOICE_PDF_CACHE_MAX_MB = int(os.getenv("INVOICE_PDF_CACHE_MAX_MB", "512"))
+INVOICE_PDF_WORKERS = int(os.getenv("INVOICE_PDF_WORKERS", "2"))
+
+# A tenant is reminded about overdue invoices at most once per interval
+PAYMENT_REMINDER_INTERVAL_DAYS = int(os.getenv("PAYMENT_REMINDER_INTERVAL_DAYS", "7"))
 
 # Security
 security = HTTPBearer()
@@ -47,14 +143,56 @@ security = HTTPBearer()
 # Database connection pool
 db_pool = None
 
+# Async SMTP sender shared by single and bulk emails
+mailer = Mailer(
+    EMAIL_HOST, EMAIL_PORT, EMAIL_HOST_USER, EMAIL_HOST_PASSWORD, EMAIL_USE_TLS, DEFAULT_FROM_EMAIL,
+    concurrency=MAIL_CONCURRENCY
+)
+
+# Invoice PDF renderer (process pool) and disk cache
+invoice_documents = InvoiceDocumentCache(INVOICE_PDF_CACHE_DIR, INVOICE_PDF_WORKERS, INVOICE_PDF_CACHE_MAX_MB * 1024 * 1024)
+
+# Scrapes /metrics from every service for the system metrics dashboard
+service_metrics = ServiceMetricsAggregator(METRICS_TARGETS, timeout=METRICS_SCRAPE_TIMEOUT_SECONDS)
+
+# Cached totals for the paginated tenant listings
+tenant_counts = CountEstimator()
+
+# Platform overview refresh state
+overview_refresh_requested = None
+overview_refresh_lock = None
+
+# In-process background job worker
+job_worker = None
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global db_pool
-    db_pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=10, statement_cache_size=0)
+    global db_pool, overview_refresh_requested, overview_refresh_lock, job_worker
+    db_pool = await create_pool(SERVICE_NAME, DATABASE_URL, min_size=1, max_size=10, statement_cache_size=0)
     logger.info("Database connection pool created")
+    metrics_sampler = start_runtime_sampler(SERVICE_NAME, lambda: db_pool)
+    invoice_documents.start()
+    logger.info(f"Compiled {preload_templates()} templates")
+    overview_refresh_requested = asyncio.Event()
+    overview_refresh_lock = asyncio.Lock()
+    background_tasks = [
+        asyncio.create_task(overview_refresh_loop()),
+        asyncio.create_task(metrics_snapshot_loop()),
+        asyncio.create_task(billing_reconciliation_loop())
+    ]
+    if JOB_WORKERS > 0:
+        job_worker = JobWorker(db_pool, JOB_HANDLERS, concurrency=JOB_WORKERS)
+        job_worker.start()
     yield
     # Shutdown
+    await stop_runtime_sampler(metrics_sampler)
+    if job_worker:
+        await job_worker.stop()
+    invoice_documents.shutdown()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
     await db_pool.close()
     logger.info("Database connection pool closed")
 
@@ -77,8 +215,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Total-Count-Estimated", "X-Next-Cursor", "X-Overview-Refreshed-At"],
 )
 
+# Request metrics middleware
+app.add_middleware(MetricsMiddleware, service=SERVICE_NAME)
+
 # Pydantic Models
 class LoginRequest(BaseModel):
     email: EmailStr
@@ -167,6 +309,11 @@ class UniversityBilling(BaseModel):
         populate_by_name = True
         
 
+class RecordPaymentRequest(BaseModel):
+    payment_method: Optional[str] = None
+    payment_reference: Optional[str] = None
+    paid_date: Optional[date] = None
+
 class BillingUniversitySummary(BaseModel):
     id: str
     name: str
@@ -215,7 +362,7 @@ class UniversityResponse(BaseModel):
 
 class UniversityAdminCredentials(BaseModel):
     email: str
-    temporary_password: str
+    temporary_password: Optional[str] = None  # None when the admin's password was chosen at creation
     dashboard_url: str
     university_name: str
 
@@ -257,70 +404,8 @@ def generate_dashboard_url(slug: str) -> str:
 async def send_university_admin_email(admin_email: str, credentials: UniversityAdminCredentials) -> bool:
     """Send welcome email to university admin with credentials"""
     try:
-        import smtplib
-        import email.mime.text
-        import email.mime.multipart
-        
-        subject = f"Welcome to PractiCheck - {credentials.university_name} Admin Access"
-        
-        # Email body
-        body = f"""
-Dear Administrator,
-
-Welcome to PractiCheck! Your university admin account has been created for {credentials.university_name}.
-
-Login Details:
-- Email: {credentials.email}
-- Temporary Password: {credentials.temporary_password}
-- Dashboard URL: {credentials.dashboard_url}
-
-Please log in and change your password immediately for security.
-
-Best regards,
-PractiCheck Team
-        """
-        
-        # HTML version
-        html_body = f"""
-        <html>
-        <body>
-            <h2>Welcome to PractiCheck!</h2>
-            <p>Dear Administrator,</p>
-            <p>Your university admin account has been created for <strong>{credentials.university_name}</strong>.</p>
-            
-            <h3>Login Details:</h3>
-            <ul>
-                <li><strong>Email:</strong> {credentials.email}</li>
-                <li><strong>Temporary Password:</strong> <code>{credentials.temporary_password}</code></li>
-                <li><strong>Dashboard URL:</strong> <a href="{credentials.dashboard_url}">{credentials.dashboard_url}</a></li>
-            </ul>
-            
-            <p><strong>Important:</strong> Please log in and change your password immediately for security.</p>
-            
-            <p>Best regards,<br>PractiCheck Team</p>
-        </body>
-        </html>
-        """
-        
-        msg = email.mime.multipart.MimeMultipart('alternative')
-        msg['From'] = DEFAULT_FROM_EMAIL
-        msg['To'] = admin_email
-        msg['Subject'] = subject
-
-        text_part = email.mime.text.MimeText(body, 'plain')
-        html_part = email.mime.text.MimeText(html_body, 'html')
-        msg.attach(text_part)
-        msg.attach(html_part)
-
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        if EMAIL_USE_TLS:
-            server.starttls()
-        server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        
-        logger.info(f"University admin welcome email sent to {admin_email}")
-        return True
+        subject, body, html_body = render_email("university_admin_welcome", **credentials.model_dump())
+        return await mailer.send(admin_email, subject, body, html_body)
     except Exception as e:
         logger.error(f"Failed to send university admin email to {admin_email}: {e}")
         return False
@@ -349,105 +434,39 @@ def validate_uuid(uuid_string: str) -> str:
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid UUID format")
 
-def send_email(to_email: str, subject: str, body: str, html_body: str = None) -> bool:
-    """Send email using SMTP - simplified version"""
-    try:
-        import smtplib
-        from email.mime.text import MimeText
-        from email.mime.multipart import MimeMultipart
-        
-        msg = MimeMultipart('alternative')
-        msg['From'] = DEFAULT_FROM_EMAIL
-        msg['To'] = to_email
-        msg['Subject'] = subject
-
-        # Add text part
-        text_part = MimeText(body, 'plain')
-        msg.attach(text_part)
-
-        # Add HTML part if provided
-        if html_body:
-            html_part = MimeText(html_body, 'html')
-            msg.attach(html_part)
-
-        # Send email
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        if EMAIL_USE_TLS:
-            server.starttls()
-        server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        
-        logger.info(f"Email sent successfully to {to_email}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to send email to {to_email}: {e}")
-        return False
+async def send_email(to_email: str, subject: str, body: str, html_body: str = None) -> bool:
+    """Send email using SMTP"""
+    return await mailer.send(to_email, subject, body, html_body)
 
-def generate_invoice_html(university: dict, invoice_data: dict) -> str:
-    """Generate HTML invoice"""
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 20px; }}
-            .header {{ text-align: center; margin-bottom: 30px; }}
-            .invoice-details {{ margin-bottom: 20px; }}
-            .table {{ width: 100%; border-collapse: collapse; }}
-            .table th, .table td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-            .table th {{ background-color: #f2f2f2; }}
-            .total {{ font-weight: bold; font-size: 18px; }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>PractiCheck Invoice</h1>
-            <p>University Attachment Platform</p>
-        </div>
-        
-        <div class="invoice-details">
-            <p><strong>Invoice #:</strong> {invoice_data['invoice_number']}</p>
-            <p><strong>Date:</strong> {invoice_data['date']}</p>
-            <p><strong>Due Date:</strong> {invoice_data['due_date']}</p>
-        </div>
-        
-        <div class="invoice-details">
-            <h3>Bill To:</h3>
-            <p><strong>{university['name']}</strong></p>
-            <p>{university['location']}</p>
-        </div>
-        
-        <table class="table">
-            <thead>
-                <tr>
-                    <th>Description</th>
-                    <th>Quantity</th>
-                    <th>Rate</th>
-                    <th>Amount</th>
-                </tr>
-            </thead>
-            <tbody>
-                <tr>
-                    <td>Monthly Subscription - {university['plan']} Plan</td>
-                    <td>1</td>
-                    <td>${university['monthly_fee']:.2f}</td>
-                    <td>${university['monthly_fee']:.2f}</td>
-                </tr>
-            </tbody>
-        </table>
-        
-        <div style="text-align: right; margin-top: 20px;">
-            <p class="total">Total: ${university['monthly_fee']:.2f}</p>
-        </div>
-        
-        <div style="margin-top: 30px;">
-            <p>Thank you for using PractiCheck!</p>
-            <p>For questions about this invoice, please contact support@practicheck.com</p>
-        </div>
-    </body>
-    </html>
+async def allocate_invoice_numbers(count: int, year: Optional[int] = None) -> List[str]:
+    """Reserve a block of invoice numbers for the year
+
+    Runs as its own statement on a separate connection so the counter row is
+    locked only for the upsert, never for the caller's transaction.
     """
+    year = year or datetime.now().year
+    async with db_pool.acquire() as conn:
+        last_value = await conn.fetchval("""
+            INSERT INTO invoice_number_counters (year, last_value)
+            VALUES ($1, $2)
+            ON CONFLICT (year) DO UPDATE
+            SET last_value = invoice_number_counters.last_value + EXCLUDED.last_value, updated_at = NOW()
+            RETURNING last_value
+        """, year, count)
+    return [f"INV-{year}-{str(value).zfill(3)}" for value in range(last_value - count + 1, last_value + 1)]
+
+def invoice_email_context(university_name: str, location: Optional[str], invoice_number: str, invoice_date, due_date, amount, plan_name: Optional[str]) -> dict:
+    """Variables of the invoice email template"""
+    return {
+        "university_name": university_name,
+        "location": location or "Not specified",
+        "invoice_number": invoice_number,
+        "invoice_date": invoice_date.strftime('%Y-%m-%d'),
+        "due_date": due_date.strftime('%Y-%m-%d'),
+        "amount": float(amount or 0.0),
+        "description": f"Monthly Subscription - {plan_name or 'Standard'} Plan"
+    }
+
 async def get_current_user(token_data: dict = Depends(verify_token)) -> dict:
     async with db_pool.acquire() as conn:
         user = await conn.fetchrow(
@@ -461,6 +480,543 @@ async def get_current_user(token_data: dict = Depends(verify_token)) -> dict:
             )
         return dict(user)
 
+async def refresh_university_overview() -> Optional[datetime]:
+    """Refresh the university overview materialized view without blocking readers"""
+    async with overview_refresh_lock:
+        async with db_pool.acquire() as conn:
+            # Skip if another service instance is already refreshing the view
+            acquired = await conn.fetchval("SELECT pg_try_advisory_lock(hashtext('university_overview'))")
+            if not acquired:
+                logger.info("University overview refresh already running elsewhere, skipping")
+                return await get_overview_refreshed_at(conn)
+            try:
+                # NOW() is the transaction start, i.e. the snapshot the refresh reads
+                async with conn.transaction():
+                    await conn.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY university_overview")
+                    await conn.execute("UPDATE university_overview_refresh SET refreshed_at = NOW()")
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock(hashtext('university_overview'))")
+            return await get_overview_refreshed_at(conn)
+
+async def get_overview_refreshed_at(conn) -> Optional[datetime]:
+    """Get the time the university overview was last refreshed"""
+    return await conn.fetchval("SELECT refreshed_at FROM university_overview_refresh")
+
+def request_overview_refresh():
+    """Ask the background refresher to update the overview after a tenant mutation"""
+    if overview_refresh_requested is not None:
+        overview_refresh_requested.set()
+
+# Tenant listings
+
+# Every sort expression is non-null so (value, id) keyset comparisons are total
+TENANT_SORT_KEYS = {
+    "created_at": SortKey("t.created_at", "timestamptz"),
+    "name": SortKey("t.name", "text"),
+    "health": SortKey("t.health_score", "numeric"),
+    "monthly_fee": SortKey("t.monthly_fee", "numeric"),
+    "outstanding": SortKey("b.outstanding_amount", "numeric"),
+}
+
+# Counts only need the joins that filters can reference; every tenant has a
+# balance row (created by trigger), so the join is inner and sorts can use its index
+TENANT_COUNT_FROM = "FROM tenants t JOIN tenant_billing_balances b ON t.id = b.tenant_id"
+
+def tenant_listing_params(
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    sort: Optional[str] = Query(None, description="Sort key, prefixed with '-' for descending: " + ", ".join(TENANT_SORT_KEYS)),
+    status_filter: Optional[str] = Query(None, alias="status", description="Comma-separated statuses"),
+    plan_id: Optional[str] = None,
+    health_min: Optional[float] = None,
+    health_max: Optional[float] = None,
+    outstanding_min: Optional[float] = None,
+    outstanding_max: Optional[float] = None
+) -> dict:
+    """Pagination, sort and filter query parameters shared by the tenant listings"""
+    return {
+        "limit": limit,
+        "cursor": cursor,
+        "sort": sort,
+        "status": status_filter,
+        "plan_id": plan_id,
+        "health_min": health_min,
+        "health_max": health_max,
+        "outstanding_min": outstanding_min,
+        "outstanding_max": outstanding_max
+    }
+
+def tenant_listing_filters(listing: dict) -> QueryFilters:
+    """WHERE conditions for the tenant listing filters"""
+    filters = QueryFilters()
+    if listing['status']:
+        statuses = [value.strip() for value in listing['status'].split(",") if value.strip()]
+        filters.add("t.status = ANY({}::text[])", statuses)
+    if listing['plan_id']:
+        filters.add("t.plan_id = {}::uuid", validate_uuid(listing['plan_id']))
+    # Decimal keeps the comparisons on numeric columns index-friendly
+    if listing['health_min'] is not None:
+        filters.add("t.health_score >= {}", Decimal(str(listing['health_min'])))
+    if listing['health_max'] is not None:
+        filters.add("t.health_score <= {}", Decimal(str(listing['health_max'])))
+    if listing['outstanding_min'] is not None:
+        filters.add("b.outstanding_amount >= {}", Decimal(str(listing['outstanding_min'])))
+    if listing['outstanding_max'] is not None:
+        filters.add("b.outstanding_amount <= {}", Decimal(str(listing['outstanding_max'])))
+    return filters
+
+async def fetch_tenant_page(conn, response: Response, columns: str, joins: str, listing: dict) -> list:
+    """Fetch one keyset page of tenants and set the pagination headers
+
+    `joins` must include the inner tenant_billing_balances join aliased as `b`.
+    """
+    try:
+        sort = parse_sort(listing['sort'], TENANT_SORT_KEYS, "-created_at")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filters = tenant_listing_filters(listing)
+    total, is_estimate = await tenant_counts.count(conn, TENANT_COUNT_FROM, filters)
+    
+    if listing['cursor']:
+        try:
+            add_keyset_condition(filters, sort, listing['cursor'], "t.id")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    limit = clamp_limit(listing['limit'])
+    rows = await conn.fetch(f"""
+        SELECT {columns}, {sort.key.expression} as sort_value
+        FROM tenants t
+        {joins}
+        {filters.where}
+        {order_by(sort, "t.id")}
+        LIMIT {limit + 1}
+    """, *filters.args)
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, rows[-1]['sort_value'], rows[-1]['id'])
+    set_page_headers(response, total, is_estimate, next_cursor)
+    return rows
+
+async def overview_refresh_loop():
+    """Refresh the university overview on a schedule or when a refresh is requested"""
+    while True:
+        try:
+            await asyncio.wait_for(overview_refresh_requested.wait(), timeout=OVERVIEW_REFRESH_SECONDS)
+            # Coalesce bursts of tenant mutations into a single refresh
+            await asyncio.sleep(OVERVIEW_REFRESH_DEBOUNCE_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        overview_refresh_requested.clear()
+
+        try:
+            refreshed_at = await refresh_university_overview()
+            logger.info(f"University overview refreshed at {refreshed_at}")
+        except Exception as e:
+            logger.error(f"University overview refresh failed: {e}")
+
+async def take_daily_metrics_snapshot() -> bool:
+    """Snapshot tenant counters once per day and apply the history retention policy"""
+    async with db_pool.acquire() as conn:
+        if await has_snapshot_for_today(conn):
+            return False
+        # Only one service instance snapshots per day
+        acquired = await conn.fetchval("SELECT pg_try_advisory_lock(hashtext('tenant_daily_metrics'))")
+        if not acquired:
+            return False
+        try:
+            if await has_snapshot_for_today(conn):
+                return False
+            await refresh_university_overview()
+            snapshot_count = await snapshot_tenant_metrics(conn)
+            pruned_count = await rollup_and_prune_metrics(conn, METRICS_DAILY_RETENTION_DAYS)
+            logger.info(f"Tenant metrics snapshot taken for {snapshot_count} tenants, {pruned_count} daily rows rolled up")
+            return True
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock(hashtext('tenant_daily_metrics'))")
+
+async def metrics_snapshot_loop():
+    """Periodically ensure today's tenant metrics snapshot exists"""
+    while True:
+        try:
+            await take_daily_metrics_snapshot()
+        except Exception as e:
+            logger.error(f"Tenant metrics snapshot failed: {e}")
+        await asyncio.sleep(METRICS_SNAPSHOT_CHECK_SECONDS)
+
+async def reconcile_billing_ledger() -> bool:
+    """Reconcile tenant billing balances once per day"""
+    async with db_pool.acquire() as conn:
+        if await has_reconciled_today(conn):
+            return False
+        # Only one service instance reconciles per day
+        acquired = await conn.fetchval("SELECT pg_try_advisory_lock(hashtext('tenant_billing_balances'))")
+        if not acquired:
+            return False
+        try:
+            if await has_reconciled_today(conn):
+                return False
+            drifted = await reconcile_billing_balances(conn)
+            if drifted:
+                logger.warning(f"Billing reconciliation corrected {drifted} tenant balances")
+            else:
+                logger.info("Billing reconciliation found no drift")
+            return True
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock(hashtext('tenant_billing_balances'))")
+
+async def billing_reconciliation_loop():
+    """Periodically ensure today's billing reconciliation has run"""
+    while True:
+        try:
+            await reconcile_billing_ledger()
+        except Exception as e:
+            logger.error(f"Billing reconciliation failed: {e}")
+        await asyncio.sleep(BILLING_RECONCILE_CHECK_SECONDS)
+
+# Background Jobs
+
+def billing_contact_email(university_name: str) -> str:
+    """Billing address of a university (for now, derived from its name)"""
+    return f"billing@{university_name.lower().replace(' ', '')}.edu"
+
+def render_bulk_invoice_emails(invoices: list) -> List[OutgoingEmail]:
+    """Render monthly invoice emails for invoice rows joined with their universities"""
+    rendered = render_emails("invoice", [
+        invoice_email_context(
+            invoice['name'], invoice['location'], invoice['invoice_number'],
+            invoice['invoice_date'], invoice['due_date'], invoice['amount'], invoice['plan_name']
+        )
+        for invoice in invoices
+    ])
+    return [
+        OutgoingEmail(str(invoice['id']), billing_contact_email(invoice['name']), *email)
+        for invoice, email in zip(invoices, rendered)
+    ]
+
+def render_payment_reminder_emails(tenants: list) -> List[OutgoingEmail]:
+    """Render one reminder per university listing all of its overdue invoices"""
+    rendered = render_emails("payment_reminder", [
+        {
+            "university_name": tenant['name'],
+            "invoices": [
+                {"invoice_number": number, "amount": float(amount), "due_date": due_date.strftime('%Y-%m-%d')}
+                for number, amount, due_date in zip(tenant['invoice_numbers'], tenant['amounts'], tenant['due_dates'])
+            ],
+            "total_due": float(tenant['total_due'] or 0.0)
+        }
+        for tenant in tenants
+    ])
+    return [
+        OutgoingEmail(str(tenant['tenant_id']), billing_contact_email(tenant['name']), *email)
+        for tenant, email in zip(tenants, rendered)
+    ]
+
+async def deliver_in_chunks(ctx: JobContext, rows: list, render, on_delivered, completed: int, total: int) -> dict:
+    """Batch-render emails off the event loop and send them chunk by chunk over the mailer's connection pool
+
+    Keys of delivered emails are passed to on_delivered in small batches, so a
+    crashed run resumes with at most a batch of duplicate sends.
+    """
+    sent = failed = 0
+    render_seconds = 0.0
+    started = time.perf_counter()
+    delivered = []
+    
+    async def collect(key: str, ok: bool, error: Optional[str]):
+        if not ok:
+            return
+        delivered.append(key)
+        if len(delivered) >= BILLING_RUN_FLUSH_SIZE:
+            batch = delivered[:]
+            delivered.clear()
+            await on_delivered(batch)
+    
+    for offset in range(0, len(rows), BILLING_RUN_CHUNK_SIZE):
+        chunk = rows[offset:offset + BILLING_RUN_CHUNK_SIZE]
+        render_started = time.perf_counter()
+        emails = await asyncio.to_thread(render, chunk)
+        render_seconds += time.perf_counter() - render_started
+        
+        stats = await mailer.send_bulk(emails, collect)
+        sent += stats.sent
+        failed += stats.failed
+        if delivered:
+            batch = delivered[:]
+            delivered.clear()
+            await on_delivered(batch)
+        
+        elapsed = time.perf_counter() - started
+        await ctx.progress(
+            completed + offset + len(chunk), total,
+            f"Sent: {sent}, Failed: {failed} ({(sent + failed) / elapsed:.1f}/s)",
+            force=True
+        )
+    
+    elapsed = time.perf_counter() - started
+    return {
+        "sent": sent,
+        "failed": failed,
+        "duration_seconds": round(elapsed, 2),
+        "render_seconds": round(render_seconds, 2),
+        "render_ms_per_message": round(render_seconds * 1000 / len(rows), 3) if rows else 0.0,
+        "emails_per_second": round((sent + failed) / elapsed, 2) if elapsed and rows else 0.0
+    }
+
+async def bulk_invoices_job(ctx: JobContext) -> dict:
+    """Create this month's invoices for all active universities and email them"""
+    if 'invoices_created' not in ctx.checkpoint:
+        await ctx.progress(0, None, "Creating invoices", force=True)
+        async with ctx.pool.acquire() as conn:
+            async with conn.transaction():
+                tenants = await conn.fetch("""
+                    SELECT t.id, COALESCE(t.monthly_fee, 0) as monthly_fee, COALESCE(sp.name, 'Standard') as plan_name
+                    FROM tenants t
+                    LEFT JOIN subscription_plans sp ON t.plan_id = sp.id
+                    WHERE t.status = 'active'
+                      AND NOT EXISTS (
+                          SELECT 1 FROM invoices i
+                          WHERE i.tenant_id = t.id AND i.billing_period = date_trunc('month', CURRENT_DATE)::date
+                      )
+                    ORDER BY t.id
+                """)
+                invoice_numbers = await allocate_invoice_numbers(len(tenants)) if tenants else []
+                
+                invoices_created = await conn.fetchval("""
+                    WITH new_invoices AS (
+                        INSERT INTO invoices (tenant_id, invoice_number, invoice_date, due_date, amount, status, description, billing_run_id, billing_period)
+                        SELECT b.tenant_id, b.invoice_number, CURRENT_DATE, CURRENT_DATE + 30, b.amount, 'pending',
+                               'Monthly Subscription - ' || b.plan_name || ' Plan',
+                               $1, date_trunc('month', CURRENT_DATE)::date
+                        FROM unnest($2::uuid[], $3::text[], $4::numeric[], $5::text[]) AS b(tenant_id, invoice_number, amount, plan_name)
+                        ON CONFLICT (tenant_id, billing_period) WHERE billing_period IS NOT NULL DO NOTHING
+                        RETURNING 1
+                    )
+                    SELECT COUNT(*) FROM new_invoices
+                """, ctx.id,
+                    [tenant['id'] for tenant in tenants],
+                    invoice_numbers,
+                    [tenant['monthly_fee'] for tenant in tenants],
+                    [tenant['plan_name'] for tenant in tenants])
+                await ctx.save_checkpoint(conn, invoices_created=invoices_created)
+    
+    invoices_created = ctx.checkpoint['invoices_created']
+    async with ctx.pool.acquire() as conn:
+        invoices = await conn.fetch("""
+            SELECT i.id, i.invoice_number, i.invoice_date, i.due_date, i.amount,
+                   t.name, t.location, sp.name as plan_name
+            FROM invoices i
+            JOIN tenants t ON i.tenant_id = t.id
+            LEFT JOIN subscription_plans sp ON t.plan_id = sp.id
+            WHERE i.billing_run_id = $1 AND i.emailed_at IS NULL
+            ORDER BY i.id
+        """, ctx.id)
+    
+    async def mark_emailed(invoice_ids: List[str]):
+        async with ctx.pool.acquire() as conn:
+            await conn.execute(
+                "UPDATE invoices SET emailed_at = NOW(), updated_at = NOW() WHERE id = ANY($1::uuid[])",
+                invoice_ids
+            )
+    
+    delivery = await deliver_in_chunks(
+        ctx, invoices, render_bulk_invoice_emails, mark_emailed,
+        completed=invoices_created - len(invoices), total=invoices_created
+    )
+    
+    async with ctx.pool.acquire() as conn:
+        sent_count = await conn.fetchval(
+            "SELECT COUNT(*) FROM invoices WHERE billing_run_id = $1 AND emailed_at IS NOT NULL",
+            ctx.id
+        )
+    failed_count = invoices_created - sent_count
+    
+    return {
+        "message": f"Bulk invoices completed. Sent: {sent_count}, Failed: {failed_count}",
+        "invoices_created": invoices_created,
+        "sent_count": sent_count,
+        "failed_count": failed_count,
+        "throughput": delivery
+    }
+
+async def payment_reminders_job(ctx: JobContext) -> dict:
+    """Send one reminder per university with overdue invoices, skipping recently reminded ones"""
+    async with ctx.pool.acquire() as conn:
+        marked_overdue = await conn.execute("""
+            UPDATE invoices SET status = 'overdue', updated_at = NOW()
+            WHERE status = 'pending' AND due_date < CURRENT_DATE
+        """)
+        
+        # Tenants reminded within the interval drop out here, so reruns only pick up new work
+        tenants = await conn.fetch("""
+            SELECT i.tenant_id, t.name,
+                   array_agg(i.id ORDER BY i.due_date) as invoice_ids,
+                   array_agg(i.invoice_number ORDER BY i.due_date) as invoice_numbers,
+                   array_agg(i.amount ORDER BY i.due_date) as amounts,
+                   array_agg(i.due_date ORDER BY i.due_date) as due_dates,
+                   SUM(i.amount) as total_due
+            FROM invoices i
+            JOIN tenants t ON i.tenant_id = t.id
+            WHERE i.status = 'overdue' AND i.due_date < CURRENT_DATE AND t.status = 'active'
+            GROUP BY i.tenant_id, t.name
+            HAVING MAX(i.last_reminded_at) IS NULL
+                OR MAX(i.last_reminded_at) < NOW() - make_interval(days => $1)
+            ORDER BY i.tenant_id
+        """, PAYMENT_REMINDER_INTERVAL_DAYS)
+    
+    invoice_ids_by_tenant = {str(tenant['tenant_id']): tenant['invoice_ids'] for tenant in tenants}
+    
+    async def mark_reminded(tenant_ids: List[str]):
+        invoice_ids = [invoice_id for tenant_id in tenant_ids for invoice_id in invoice_ids_by_tenant[tenant_id]]
+        async with ctx.pool.acquire() as conn:
+            await conn.execute("""
+                UPDATE invoices
+                SET last_reminded_at = NOW(), reminder_count = reminder_count + 1, updated_at = NOW()
+                WHERE id = ANY($1::uuid[])
+            """, invoice_ids)
+    
+    delivery = await deliver_in_chunks(
+        ctx, tenants, render_payment_reminder_emails, mark_reminded,
+        completed=0, total=len(tenants)
+    )
+    
+    return {
+        "message": f"Payment reminders completed. Sent: {delivery['sent']}, Failed: {delivery['failed']}",
+        "marked_overdue": int(marked_overdue.split()[-1]),
+        "tenants_due": len(tenants),
+        "invoices_due": sum(len(tenant['invoice_ids']) for tenant in tenants),
+        "sent_count": delivery['sent'],
+        "failed_count": delivery['failed'],
+        "throughput": delivery
+    }
+
+async def provision_university_job(ctx: JobContext) -> dict:
+    """Create a university tenant and admin account, then email the admin credentials"""
+    data = ctx.payload
+    await ctx.progress(0, 2, "Creating university", force=True)
+    
+    if 'university_id' not in ctx.checkpoint:
+        async with ctx.pool.acquire() as conn:
+            async with conn.transaction():
+                # Generate unique slug
+                base_slug = generate_university_slug(data['name'])
+                slug = base_slug
+                counter = 1
+                
+                while await conn.fetchval("SELECT id FROM tenants WHERE slug = $1", slug):
+                    slug = f"{base_slug}-{counter}"
+                    counter += 1
+                
+                plan = await conn.fetchrow("SELECT id, price_monthly FROM subscription_plans WHERE id = $1", data['plan_id'])
+                if not plan:
+                    raise ValueError("Invalid subscription plan")
+                
+                # Create university tenant
+                university_id = await conn.fetchval("""
+                    INSERT INTO tenants (name, location, domain, slug, plan_id, monthly_fee, status, health_score)
+                    VALUES ($1, $2, $3, $4, $5, $6, 'active', 100.0)
+                    RETURNING id
+                """, data['name'], data['location'], data['domain'], slug, plan['id'], plan['price_monthly'])
+                
+                # Create university admin user (a generated password is set when credentials are emailed)
+                admin_user_id = await conn.fetchval("""
+                    INSERT INTO users (tenant_id, email, password_hash, name, role, is_active, is_password_temporary)
+                    VALUES ($1, $2, $3, $4, 'university_admin', true, true)
+                    RETURNING id
+                """, university_id, data['admin_email'], data.get('admin_password_hash'), data['admin_name'])
+                
+                # Create university admin profile
+                await conn.execute("""
+                    INSERT INTO university_admin_profiles (user_id, staff_id, phone, office_location)
+                    VALUES ($1, $2, $3, $4)
+                """, admin_user_id, f"UA{str(university_id)[:8]}", 
+                    data.get('admin_phone') or '+254700000000', 
+                    'Administration Office')
+                
+                # Log activity
+                await conn.execute("""
+                    INSERT INTO activity_logs (user_id, user_type, action, target_type, target_id, details)
+                    VALUES ($1, 'admin', 'University Created', 'tenant', $2, $3)
+                """, ctx.created_by, university_id, json.dumps({
+                    "name": data['name'],
+                    "slug": slug,
+                    "admin_email": data['admin_email'],
+                    "admin_created": True,
+                    "job_id": str(ctx.id)
+                }))
+                
+                # Committed together with the tenant so a retry never provisions twice
+                await ctx.save_checkpoint(
+                    conn,
+                    university_id=str(university_id),
+                    admin_user_id=str(admin_user_id),
+                    slug=slug
+                )
+        
+        request_overview_refresh()
+    
+    slug = ctx.checkpoint['slug']
+    dashboard_url = generate_dashboard_url(slug)
+    await ctx.progress(1, 2, "Sending admin credentials", force=True)
+    
+    if 'email_sent' not in ctx.checkpoint:
+        # A chosen password was stored as its hash and is never emailed; a
+        # generated one is drawn per attempt, so it only exists in memory
+        temporary_password = None
+        if not data.get('admin_password_hash'):
+            temporary_password = generate_secure_password()
+            password_hash = await asyncio.to_thread(hash_password, temporary_password)
+            async with ctx.pool.acquire() as conn:
+                await conn.execute(
+                    "UPDATE users SET password_hash = $2, updated_at = NOW() WHERE id = $1",
+                    ctx.checkpoint['admin_user_id'], password_hash
+                )
+        
+        credentials = UniversityAdminCredentials(
+            email=data['admin_email'],
+            temporary_password=temporary_password,
+            dashboard_url=dashboard_url,
+            university_name=data['name']
+        )
+        email_sent = await send_university_admin_email(data['admin_email'], credentials)
+        await ctx.save_checkpoint(email_sent=email_sent)
+    email_sent = ctx.checkpoint['email_sent']
+    
+    return {
+        "message": "University and admin created successfully",
+        "university_id": ctx.checkpoint['university_id'],
+        "slug": slug,
+        "dashboard_url": dashboard_url,
+        "admin_email": data['admin_email'],
+        "email_sent": email_sent
+    }
+
+JOB_HANDLERS = {
+    "university.provision": provision_university_job,
+    "billing.bulk_invoices": bulk_invoices_job,
+    "billing.payment_reminders": payment_reminders_job,
+}
+
+async def submit_job(job_type: str, payload: dict, idempotency_key: Optional[str], current_user: dict, message: str) -> dict:
+    """Queue a background job and describe it for a 202 response"""
+    async with db_pool.acquire() as conn:
+        try:
+            job = await enqueue_job(conn, job_type, payload, idempotency_key=idempotency_key, created_by=current_user['id'])
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    
+    if job_worker:
+        job_worker.notify()
+    
+    return {
+        "message": message,
+        "status_url": f"/jobs/{job['job_id']}",
+        **job
+    }
+
 # API Endpoints
 
 @app.get("/")
@@ -483,6 +1039,23 @@ async def health_check():
         logger.error(f"Health check failed: {e}")
         return {"status": "unhealthy", "database": "disconnected"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return metrics_response()
+
+async def get_slow_query_reader(token_data: dict = Depends(verify_token)) -> dict:
+    """Require a company-admin super admin token for slow query logs"""
+    async with db_pool.acquire() as conn:
+        if not await is_slow_query_reader(conn, token_data):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Super admin access required")
+    return token_data
+
+@app.get("/metrics/slow-queries", include_in_schema=False)
+async def slow_queries(limit: int = 50, token_data: dict = Depends(get_slow_query_reader)):
+    """Recent statements slower than SLOW_QUERY_LOG_MS with sampled plans"""
+    return slow_queries_response(min(max(limit, 1), 200))
+
 @app.post("/auth/login", response_model=LoginResponse)
 async def login(login_data: LoginRequest):
     """Authenticate admin user and return JWT token"""
@@ -546,13 +1119,8 @@ async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
         # Calculate system health (average of all tenant health scores)
         system_health = await conn.fetchval("SELECT AVG(health_score) FROM tenants WHERE status = 'active'") or 100.0
         
-        # Mock growth data (in real implementation, calculate from historical data)
-        monthly_growth = {
-            "universities": 12.5,
-            "students": 23.8,
-            "attachments": 18.2,
-            "revenue": 15.3
-        }
+        # Month-over-month growth from daily tenant snapshots
+        monthly_growth = await get_monthly_growth(conn)
         
         return DashboardStats(
             totalUniversities=total_universities,
@@ -572,13 +1140,9 @@ async def get_public_universities():
                 t.id,
                 t.name,
                 t.location,
-                COALESCE(student_count.count, 0) as students
+                COALESCE(o.students, 0) as students
             FROM tenants t
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(*) as count 
-                FROM students 
-                GROUP BY tenant_id
-            ) student_count ON t.id = student_count.tenant_id
+            LEFT JOIN university_overview o ON t.id = o.tenant_id
             WHERE t.status = 'active'
             ORDER BY t.name
             LIMIT 10
@@ -594,73 +1158,6 @@ async def get_public_universities():
             })
         
         return result
-async def get_universities(current_user: dict = Depends(get_current_user)):
-    """Get all universities"""
-    async with db_pool.acquire() as conn:
-        universities = await conn.fetch("""
-            SELECT 
-                t.id,
-                t.name,
-                t.location,
-                sp.name as plan,
-                t.status,
-                t.health_score,
-                t.monthly_fee,
-                t.last_sync,
-                COALESCE(student_count.count, 0) as students,
-                COALESCE(attachment_count.count, 0) as attachments,
-                COALESCE(faculty_count.count, 0) as faculties
-            FROM tenants t
-            LEFT JOIN subscription_plans sp ON t.plan_id = sp.id
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(*) as count 
-                FROM students 
-                GROUP BY tenant_id
-            ) student_count ON t.id = student_count.tenant_id
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(*) as count 
-                FROM attachments 
-                WHERE status = 'active'
-                GROUP BY tenant_id
-            ) attachment_count ON t.id = attachment_count.tenant_id
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(DISTINCT faculty) as count 
-                FROM students 
-                WHERE faculty IS NOT NULL
-                GROUP BY tenant_id
-            ) faculty_count ON t.id = faculty_count.tenant_id
-            ORDER BY t.created_at DESC
-        """)
-        
-        result = []
-        for uni in universities:
-            # Calculate time since last sync
-            if uni['last_sync']:
-                time_diff = datetime.now(timezone.utc) - uni['last_sync']
-                if time_diff.total_seconds() < 300:  # 5 minutes
-                    last_sync = f"{int(time_diff.total_seconds() // 60)} minutes ago"
-                elif time_diff.total_seconds() < 3600:  # 1 hour
-                    last_sync = f"{int(time_diff.total_seconds() // 60)} minutes ago"
-                else:
-                    last_sync = f"{int(time_diff.total_seconds() // 3600)} hours ago"
-            else:
-                last_sync = "Never"
-            
-            result.append(University(
-                id=str(uni['id']),
-                name=uni['name'],
-                location=uni['location'] or "Not specified",
-                plan=uni['plan'] or "Standard",
-                status=uni['status'],
-                health=float(uni['health_score'] or 100.0),
-                students=uni['students'],
-                attachments=uni['attachments'],
-                faculties=uni['faculties'],
-                monthly_fee=float(uni['monthly_fee'] or 0.0),
-                last_sync=last_sync
-            ))
-        
-        return result
 
 @app.get("/dashboard/alerts", response_model=List[SystemAlert])
 async def get_system_alerts(current_user: dict = Depends(get_current_user)):
@@ -721,26 +1218,89 @@ async def dismiss_alert(alert_id: str, current_user: dict = Depends(get_current_
 
 @app.get("/dashboard/metrics", response_model=SystemMetrics)
 async def get_system_metrics(current_user: dict = Depends(get_current_user)):
-    """Get system performance metrics"""
-    # In a real implementation, these would come from monitoring systems
-    # For now, return mock data with some variation
-    import random
+    """Get system performance metrics scraped from the backend services"""
+    summary = await service_metrics.summarize()
     
     return SystemMetrics(
-        cpuUsage=round(random.uniform(45, 85), 1),
-        memoryUsage=round(random.uniform(50, 90), 1),
-        diskUsage=round(random.uniform(30, 70), 1),
-        networkTraffic=round(random.uniform(0.8, 2.5), 1),
-        activeConnections=random.randint(800, 1500),
-        responseTime=random.randint(80, 200)
+        cpuUsage=round(summary["cpu_usage"], 1),
+        memoryUsage=round(summary["memory_usage"], 1),
+        diskUsage=round(summary["disk_usage"], 1),
+        networkTraffic=round(summary["network_gb_per_hour"], 2),
+        activeConnections=summary["active_connections"],
+        responseTime=round(summary["response_time_ms"])
+    )
+
+@app.get("/dashboard/slow-queries")
+async def get_slow_queries(
+    limit: int = 50,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    token_data: dict = Depends(get_slow_query_reader)
+):
+    """Get the slowest recent statements across services with sampled EXPLAIN plans"""
+    limit = min(max(limit, 1), 200)
+    local = slow_queries_response(limit)
+    # The other services check the same super admin token
+    remote = await collect_slow_queries(
+        SLOW_QUERY_TARGETS, f"Bearer {credentials.credentials}", limit, timeout=METRICS_SCRAPE_TIMEOUT_SECONDS
     )
+    
+    queries = sorted(local["queries"] + remote, key=lambda entry: entry["durationMs"], reverse=True)
+    return {
+        "enabled": local["enabled"],
+        "thresholdMs": local["thresholdMs"],
+        "queries": queries[:limit]
+    }
+
+@app.get("/dashboard/metrics/history")
+async def get_metrics_history(
+    metric: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    bucket: str = "day",
+    tenant_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get historical platform or tenant metrics downsampled by day, week or month"""
+    if metric not in HISTORY_METRICS:
+        raise HTTPException(status_code=400, detail=f"Invalid metric. Use one of: {', '.join(HISTORY_METRICS)}")
+    if bucket not in HISTORY_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Invalid bucket. Use one of: {', '.join(HISTORY_BUCKETS)}")
+    if tenant_id:
+        validate_uuid(tenant_id)
+    
+    try:
+        end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else datetime.now(timezone.utc).date()
+        start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else end - timedelta(days=30)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    
+    async with db_pool.acquire() as conn:
+        points = await get_metric_history(conn, metric, start, end, bucket, tenant_id)
+    
+    return {
+        "metric": metric,
+        "bucket": bucket,
+        "startDate": start.isoformat(),
+        "endDate": end.isoformat(),
+        "points": points
+    }
 
 @app.get("/dashboard/universities", response_model=List[University])
-async def get_universities(current_user: dict = Depends(get_current_user)):
-    """Get all universities"""
+async def get_universities(
+    response: Response,
+    listing: dict = Depends(tenant_listing_params),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of universities with counts served from the platform overview"""
     async with db_pool.acquire() as conn:
-        universities = await conn.fetch("""
-            SELECT 
+        refreshed_at = await get_overview_refreshed_at(conn)
+        if refreshed_at:
+            response.headers["X-Overview-Refreshed-At"] = refreshed_at.isoformat()
+        
+        universities = await fetch_tenant_page(conn, response, """
                 t.id,
                 t.name,
                 t.location,
@@ -749,30 +1309,14 @@ async def get_universities(current_user: dict = Depends(get_current_user)):
                 t.health_score,
                 t.monthly_fee,
                 t.last_sync,
-                COALESCE(student_count.count, 0) as students,
-                COALESCE(attachment_count.count, 0) as attachments,
-                COALESCE(faculty_count.count, 0) as faculties
-            FROM tenants t
+                COALESCE(o.students, 0) as students,
+                COALESCE(o.attachments, 0) as attachments,
+                COALESCE(o.faculties, 0) as faculties
+        """, """
             LEFT JOIN subscription_plans sp ON t.plan_id = sp.id
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(*) as count 
-                FROM students 
-                GROUP BY tenant_id
-            ) student_count ON t.id = student_count.tenant_id
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(*) as count 
-                FROM attachments 
-                WHERE status = 'active'
-                GROUP BY tenant_id
-            ) attachment_count ON t.id = attachment_count.tenant_id
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(DISTINCT faculty) as count 
-                FROM students 
-                WHERE faculty IS NOT NULL
-                GROUP BY tenant_id
-            ) faculty_count ON t.id = faculty_count.tenant_id
-            ORDER BY t.created_at DESC
-        """)
+            LEFT JOIN university_overview o ON t.id = o.tenant_id
+            JOIN tenant_billing_balances b ON t.id = b.tenant_id
+        """, listing)
         
         result = []
         for uni in universities:
@@ -804,6 +1348,28 @@ async def get_universities(current_user: dict = Depends(get_current_user)):
         
         return result
 
+@app.get("/dashboard/overview/status")
+async def get_overview_status(current_user: dict = Depends(get_current_user)):
+    """Get freshness information for the platform overview"""
+    async with db_pool.acquire() as conn:
+        refreshed_at = await get_overview_refreshed_at(conn)
+    
+    age_seconds = (datetime.now(timezone.utc) - refreshed_at).total_seconds() if refreshed_at else None
+    return {
+        "refreshedAt": refreshed_at.isoformat() if refreshed_at else None,
+        "ageSeconds": round(age_seconds, 1) if age_seconds is not None else None,
+        "refreshIntervalSeconds": OVERVIEW_REFRESH_SECONDS
+    }
+
+@app.post("/dashboard/overview/refresh")
+async def refresh_overview(current_user: dict = Depends(get_current_user)):
+    """Refresh the platform overview immediately"""
+    refreshed_at = await refresh_university_overview()
+    return {
+        "message": "Overview refreshed successfully",
+        "refreshedAt": refreshed_at.isoformat() if refreshed_at else None
+    }
+
 @app.patch("/dashboard/universities/{university_id}/status")
 async def update_university_status(
     university_id: str,
@@ -829,7 +1395,7 @@ async def update_university_status(
         
         result = await conn.execute("""
             UPDATE tenants 
-            SET status = $1, last_sync = NOW()
+            SET status = $1, last_sync = NOW(), updated_at = NOW()
             WHERE id = $2
         """, new_status, university_id)
         
@@ -843,6 +1409,8 @@ async def update_university_status(
         """, current_user['id'], f"University {action.title()}", university_id, 
             json.dumps({"action": action, "new_status": new_status}))
         
+        request_overview_refresh()
+        
         return {"message": f"University {action} successful", "new_status": new_status}
 
 @app.get("/dashboard/universities/{university_id}")
@@ -859,28 +1427,12 @@ async def get_university_details(
             SELECT 
                 t.*,
                 sp.name as plan_name,
-                COALESCE(student_count.count, 0) as students,
-                COALESCE(attachment_count.count, 0) as attachments,
-                COALESCE(faculty_count.count, 0) as faculties
+                COALESCE(o.students, 0) as students,
+                COALESCE(o.attachments, 0) as attachments,
+                COALESCE(o.faculties, 0) as faculties
             FROM tenants t
             LEFT JOIN subscription_plans sp ON t.plan_id = sp.id
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(*) as count 
-                FROM students 
-                GROUP BY tenant_id
-            ) student_count ON t.id = student_count.tenant_id
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(*) as count 
-                FROM attachments 
-                WHERE status = 'active'
-                GROUP BY tenant_id
-            ) attachment_count ON t.id = attachment_count.tenant_id
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(DISTINCT faculty) as count 
-                FROM students 
-                WHERE faculty IS NOT NULL
-                GROUP BY tenant_id
-            ) faculty_count ON t.id = faculty_count.tenant_id
+            LEFT JOIN university_overview o ON t.id = o.tenant_id
             WHERE t.id = $1
         """, university_id)
         
@@ -953,7 +1505,7 @@ async def update_university(
     async with db_pool.acquire() as conn:
         result = await conn.execute("""
             UPDATE tenants 
-            SET name = $1, location = $2, monthly_fee = $3
+            SET name = $1, location = $2, monthly_fee = $3, updated_at = NOW()
             WHERE id = $4
         """, 
         university_data.get('name'),
@@ -974,108 +1526,54 @@ async def update_university(
             "monthly_fee": university_data.get("monthly_fee")
         }))
         
+        request_overview_refresh()
+        
         return {"message": "University updated successfully"}
 
-@app.post("/universities", response_model=dict)
+@app.post("/universities", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
 async def create_university_with_admin(
     university_data: CreateUniversityRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Create a new university tenant with university admin credentials"""
+    """Queue provisioning of a new university tenant with university admin credentials"""
+    if university_data.plan_id:
+        validate_uuid(university_data.plan_id)
+    
     async with db_pool.acquire() as conn:
-        async with conn.transaction():
-            # Generate unique slug
-            base_slug = generate_university_slug(university_data.name)
-            slug = base_slug
-            counter = 1
-            
-            while await conn.fetchval("SELECT id FROM tenants WHERE slug = $1", slug):
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            
-            # Get default plan if not specified
-            if university_data.plan_id:
-                plan = await conn.fetchrow("SELECT id, price_monthly FROM subscription_plans WHERE id = $1", university_data.plan_id)
-            else:
-                plan = await conn.fetchrow("SELECT id, price_monthly FROM subscription_plans WHERE name = 'Standard'")
-            
-            if not plan:
-                raise HTTPException(status_code=400, detail="Invalid subscription plan")
-            
-            # Create university tenant
-            university_id = await conn.fetchval("""
-                INSERT INTO tenants (name, location, domain, slug, plan_id, monthly_fee, status, health_score)
-                VALUES ($1, $2, $3, $4, $5, $6, 'active', 100.0)
-                RETURNING id
-            """, 
-            university_data.name,
-            university_data.location,
-            university_data.domain,
-            slug,
-            plan['id'],
-            plan['price_monthly']
-            )
-            
-            # Generate or use provided password for university admin
-            admin_password = university_data.admin_password or generate_secure_password()
-            password_hash = hash_password(admin_password)
-            
-            # Create university admin user
-            admin_user_id = await conn.fetchval("""
-                INSERT INTO users (tenant_id, email, password_hash, name, role, is_active, is_password_temporary)
-                VALUES ($1, $2, $3, $4, 'university_admin', true, true)
-                RETURNING id
-            """, university_id, university_data.admin_email, password_hash, university_data.admin_name)
-            
-            # Create university admin profile
-            await conn.execute("""
-                INSERT INTO university_admin_profiles (user_id, staff_id, phone, office_location)
-                VALUES ($1, $2, $3, $4)
-            """, admin_user_id, f"UA{str(university_id)[:8]}", 
-                university_data.admin_phone or '+254700000000', 
-                'Administration Office')
-            
-            # Generate dashboard URL
-            dashboard_url = generate_dashboard_url(slug)
-            
-            # Prepare credentials for email
-            credentials = UniversityAdminCredentials(
-                email=university_data.admin_email,
-                temporary_password=admin_password,
-                dashboard_url=dashboard_url,
-                university_name=university_data.name
-            )
-            
-            # Send welcome email to university admin
-            email_sent = await send_university_admin_email(university_data.admin_email, credentials)
-            
-            # Log activity
-            await conn.execute("""
-                INSERT INTO activity_logs (user_id, user_type, action, target_type, target_id, details)
-                VALUES ($1, 'admin', 'University Created', 'tenant', $2, $3)
-            """, current_user['id'], university_id, json.dumps({
-                "name": university_data.name,
-                "slug": slug,
-                "admin_email": university_data.admin_email,
-                "admin_created": True,
-                "email_sent": email_sent
-            }))
-            
-            return {
-                "message": "University and admin created successfully",
-                "university_id": str(university_id),
-                "slug": slug,
-                "dashboard_url": dashboard_url,
-                "admin_email": university_data.admin_email,
-                "email_sent": email_sent
-            }
+        # Get default plan if not specified
+        if university_data.plan_id:
+            plan_id = await conn.fetchval("SELECT id FROM subscription_plans WHERE id = $1", university_data.plan_id)
+        else:
+            plan_id = await conn.fetchval("SELECT id FROM subscription_plans WHERE name = 'Standard'")
+        
+        if not plan_id:
+            raise HTTPException(status_code=400, detail="Invalid subscription plan")
+    
+    payload = {
+        "name": university_data.name,
+        "location": university_data.location,
+        "domain": university_data.domain,
+        "plan_id": str(plan_id),
+        "admin_name": university_data.admin_name,
+        "admin_email": university_data.admin_email,
+        "admin_phone": university_data.admin_phone
+    }
+    # Only the hash is queued, so the password never reaches the jobs table
+    if university_data.admin_password:
+        payload["admin_password_hash"] = await asyncio.to_thread(hash_password, university_data.admin_password)
+    
+    return await submit_job("university.provision", payload, idempotency_key, current_user, "University provisioning queued")
 
 @app.get("/universities", response_model=List[UniversityResponse])
-async def get_all_universities(current_user: dict = Depends(get_current_user)):
-    """Get all universities with admin information and statistics"""
+async def get_all_universities(
+    response: Response,
+    listing: dict = Depends(tenant_listing_params),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of universities with admin information and statistics"""
     async with db_pool.acquire() as conn:
-        universities = await conn.fetch("""
-            SELECT 
+        universities = await fetch_tenant_page(conn, response, """
                 t.id,
                 t.name,
                 t.location,
@@ -1089,25 +1587,19 @@ async def get_all_universities(current_user: dict = Depends(get_current_user)):
                 sp.name as plan_name,
                 u.name as admin_name,
                 u.email as admin_email,
-                COALESCE(student_count.count, 0) as student_count,
-                COALESCE(faculty_count.count, 0) as faculty_count
-            FROM tenants t
+                COALESCE(o.student_users, 0) as student_count,
+                COALESCE(o.active_faculties, 0) as faculty_count
+        """, """
             LEFT JOIN subscription_plans sp ON t.plan_id = sp.id
-            LEFT JOIN users u ON t.id = u.tenant_id AND u.role = 'university_admin' AND u.is_active = true
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(*) as count 
-                FROM users 
-                WHERE role = 'student' AND is_active = true
-                GROUP BY tenant_id
-            ) student_count ON t.id = student_count.tenant_id
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(*) as count 
-                FROM faculties 
-                WHERE is_active = true
-                GROUP BY tenant_id
-            ) faculty_count ON t.id = faculty_count.tenant_id
-            ORDER BY t.created_at DESC
-        """)
+            LEFT JOIN LATERAL (
+                SELECT name, email FROM users
+                WHERE tenant_id = t.id AND role = 'university_admin' AND is_active = true
+                ORDER BY created_at
+                LIMIT 1
+            ) u ON true
+            LEFT JOIN university_overview o ON t.id = o.tenant_id
+            JOIN tenant_billing_balances b ON t.id = b.tenant_id
+        """, listing)
         
         result = []
         for uni in universities:
@@ -1135,71 +1627,6 @@ async def get_all_universities(current_user: dict = Depends(get_current_user)):
         return result
 
 # Billing endpoints
-@app.get("/billing/universities")
-async def get_billing_universities(current_user: dict = Depends(get_current_user)):
-    """Get universities for billing management"""
-    async with db_pool.acquire() as conn:
-        universities = await conn.fetch("""
-            SELECT 
-                t.id,
-                t.name,
-                t.location,
-                sp.name as plan,
-                t.status,
-                t.monthly_fee,
-                t.created_at,
-                COALESCE(student_count.count, 0) as students,
-                COALESCE(invoice_sum.total_outstanding, 0) as outstanding_amount,
-                COALESCE(invoice_sum.total_paid, 0) as total_paid,
-                COALESCE(invoice_count.count, 0) as invoice_count
-            FROM tenants t
-            LEFT JOIN subscription_plans sp ON t.plan_id = sp.id
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(*) as count 
-                FROM students 
-                GROUP BY tenant_id
-            ) student_count ON t.id = student_count.tenant_id
-            LEFT JOIN (
-                SELECT 
-                    tenant_id, 
-                    SUM(CASE WHEN status = 'pending' THEN amount ELSE 0 END) as total_outstanding,
-                    SUM(CASE WHEN status = 'paid' THEN amount ELSE 0 END) as total_paid,
-                    COUNT(*) as count
-                FROM invoices 
-                GROUP BY tenant_id
-            ) invoice_sum ON t.id = invoice_sum.tenant_id
-            LEFT JOIN (
-                SELECT tenant_id, COUNT(*) as count 
-                FROM invoices 
-                GROUP BY tenant_id
-            ) invoice_count ON t.id = invoice_count.tenant_id
-            ORDER BY t.name
-        """)
-        
-        result = []
-        for uni in universities:
-            # Calculate next billing date (30 days from creation or last invoice)
-            next_billing = uni['created_at'] + timedelta(days=30) if uni['created_at'] else datetime.now() + timedelta(days=30)
-            last_billing = uni['created_at'] if uni['created_at'] else datetime.now() - timedelta(days=30)
-            
-            result.append({
-                "id": str(uni['id']),
-                "name": uni['name'],
-                "location": uni['location'] or "Not specified",
-                "plan": uni['plan'] or "Standard",
-                "status": uni['status'],
-                "monthlyFee": float(uni['monthly_fee'] or 0.0),
-                "students": uni['students'],
-                "outstandingAmount": float(uni['outstanding_amount'] or 0.0),
-                "totalPaid": float(uni['total_paid'] or 0.0),
-                "invoiceCount": uni['invoice_count'],
-                "lastBillingDate": last_billing.strftime('%Y-%m-%d'),
-                "nextBillingDate": next_billing.strftime('%Y-%m-%d'),
-                "created_at": uni['created_at'].isoformat() if uni['created_at'] else None
-            })
-        
-        return result
-
 @app.post("/billing/invoice/{university_id}")
 async def generate_invoice(
     university_id: str,
@@ -1221,10 +1648,12 @@ async def generate_invoice(
             raise HTTPException(status_code=404, detail="University not found")
         
         # Generate invoice data
+        invoice_number, = await allocate_invoice_numbers(1)
+        due_date = (datetime.now() + timedelta(days=30)).date()
         invoice_data = {
-            "invoice_number": f"INV-{datetime.now().strftime('%Y%m%d')}-{university_id[:8]}",
+            "invoice_number": invoice_number,
             "date": datetime.now().strftime('%Y-%m-%d'),
-            "due_date": (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d'),
+            "due_date": due_date.strftime('%Y-%m-%d'),
             "amount": float(university['monthly_fee'] or 0.0)
         }
         
@@ -1233,7 +1662,7 @@ async def generate_invoice(
             INSERT INTO invoices (tenant_id, invoice_number, amount, due_date, status)
             VALUES ($1, $2, $3, $4, 'pending')
             RETURNING id
-        """, university_id, invoice_data['invoice_number'], invoice_data['amount'], invoice_data['due_date'])
+        """, university_id, invoice_number, university['monthly_fee'] or 0, due_date)
         
         return {
             "message": "Invoice generated successfully",
@@ -1262,199 +1691,62 @@ async def send_invoice(
             raise HTTPException(status_code=404, detail="University not found")
         
         # Get university contact email (for now, use a default)
-        contact_email = f"billing@{university['name'].lower().replace(' ', '')}.edu"
+        contact_email = billing_contact_email(university['name'])
         
-        # Generate invoice data
-        invoice_data = {
-            "invoice_number": f"INV-{datetime.now().strftime('%Y%m%d')}-{university_id[:8]}",
-            "date": datetime.now().strftime('%Y-%m-%d'),
-            "due_date": (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d'),
-            "amount": float(university['monthly_fee'] or 0.0)
-        }
+        # Render invoice email
+        today = datetime.now()
+        subject, text_body, html_body = render_email("invoice", **invoice_email_context(
+            university['name'], university['location'],
+            f"INV-{today.strftime('%Y%m%d')}-{university_id[:8]}",
+            today, today + timedelta(days=30), university['monthly_fee'], university['plan_name']
+        ))
         
-        # Generate HTML invoice
-        university_dict = {
-            "name": university['name'],
-            "location": university['location'] or "Not specified",
-            "plan": university['plan_name'] or "Standard",
-            "monthly_fee": float(university['monthly_fee'] or 0.0)
-        }
-        
-        html_body = generate_invoice_html(university_dict, invoice_data)
-        
-        # Send email
-        subject = f"Invoice {invoice_data['invoice_number']} - PractiCheck Services"
-        text_body = f"""
-        Dear {university['name']} Team,
-        
-        Please find attached your invoice for PractiCheck services.
-        
-        Invoice Number: {invoice_data['invoice_number']}
-        Amount: ${invoice_data['amount']:.2f}
-        Due Date: {invoice_data['due_date']}
-        
-        Thank you for using PractiCheck!
-        
-        Best regards,
-        PractiCheck Team
-        """
-        
-        success = send_email(contact_email, subject, text_body, html_body)
+        success = await send_email(contact_email, subject, text_body, html_body)
         
         if success:
             return {"message": f"Invoice sent successfully to {contact_email}"}
         else:
             raise HTTPException(status_code=500, detail="Failed to send invoice")
 
-@app.post("/billing/bulk-invoices")
-async def send_bulk_invoices(current_user: dict = Depends(get_current_user)):
-    """Send invoices to all active universities"""
-    async with db_pool.acquire() as conn:
-        universities = await conn.fetch("""
-            SELECT t.*, sp.name as plan_name
-            FROM tenants t
-            LEFT JOIN subscription_plans sp ON t.plan_id = sp.id
-            WHERE t.status = 'active'
-        """)
-        
-        sent_count = 0
-        failed_count = 0
-        
-        for university in universities:
-            try:
-                contact_email = f"billing@{university['name'].lower().replace(' ', '')}.edu"
-                
-                invoice_data = {
-                    "invoice_number": f"INV-{datetime.now().strftime('%Y%m%d')}-{str(university['id'])[:8]}",
-                    "date": datetime.now().strftime('%Y-%m-%d'),
-                    "due_date": (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d'),
-                    "amount": float(university['monthly_fee'] or 0.0)
-                }
-                
-                university_dict = {
-                    "name": university['name'],
-                    "location": university['location'] or "Not specified",
-                    "plan": university['plan_name'] or "Standard",
-                    "monthly_fee": float(university['monthly_fee'] or 0.0)
-                }
-                
-                html_body = generate_invoice_html(university_dict, invoice_data)
-                subject = f"Invoice {invoice_data['invoice_number']} - PractiCheck Services"
-                text_body = f"""
-                Dear {university['name']} Team,
-                
-                Please find your monthly invoice for PractiCheck services.
-                
-                Invoice Number: {invoice_data['invoice_number']}
-                Amount: ${invoice_data['amount']:.2f}
-                Due Date: {invoice_data['due_date']}
-                
-                Thank you for using PractiCheck!
-                
-                Best regards,
-                PractiCheck Team
-                """
-                
-                if send_email(contact_email, subject, text_body, html_body):
-                    sent_count += 1
-                else:
-                    failed_count += 1
-                    
-            except Exception as e:
-                logger.error(f"Failed to send invoice to {university['name']}: {e}")
-                failed_count += 1
-        
-        return {
-            "message": f"Bulk invoices completed. Sent: {sent_count}, Failed: {failed_count}",
-            "sent_count": sent_count,
-            "failed_count": failed_count
-        }
+@app.post("/billing/bulk-invoices", status_code=status.HTTP_202_ACCEPTED)
+async def send_bulk_invoices(
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Queue invoices to all active universities"""
+    return await submit_job("billing.bulk_invoices", {}, idempotency_key, current_user, "Bulk invoices queued")
+
+@app.post("/billing/payment-reminders", status_code=status.HTTP_202_ACCEPTED)
+async def send_payment_reminders(
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Queue payment reminders to universities with overdue invoices"""
+    return await submit_job("billing.payment_reminders", {}, idempotency_key, current_user, "Payment reminders queued")
 
-@app.post("/billing/payment-reminders")
-async def send_payment_reminders(current_user: dict = Depends(get_current_user)):
-    """Send payment reminders to universities with overdue invoices"""
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Get status and progress of a background job"""
+    validate_uuid(job_id)
+    
     async with db_pool.acquire() as conn:
-        # Get universities with overdue invoices (for demo, we'll send to all active)
-        universities = await conn.fetch("""
-            SELECT t.*, sp.name as plan_name
-            FROM tenants t
-            LEFT JOIN subscription_plans sp ON t.plan_id = sp.id
-            WHERE t.status = 'active'
-        """)
-        
-        sent_count = 0
-        failed_count = 0
-        
-        for university in universities:
-            try:
-                contact_email = f"billing@{university['name'].lower().replace(' ', '')}.edu"
-                
-                subject = f"Payment Reminder - PractiCheck Services"
-                text_body = f"""
-                Dear {university['name']} Team,
-                
-                This is a friendly reminder that your payment for PractiCheck services is due.
-                
-                Monthly Fee: ${float(university['monthly_fee'] or 0.0):.2f}
-                
-                Please ensure payment is made to avoid any service interruption.
-                
-                If you have already made the payment, please disregard this message.
-                
-                For any questions, please contact our billing team at billing@practicheck.com
-                
-                Thank you for using PractiCheck!
-                
-                Best regards,
-                PractiCheck Billing Team
-                """
-                
-                html_body = f"""
-                <html>
-                <body>
-                    <h2>Payment Reminder</h2>
-                    <p>Dear {university['name']} Team,</p>
-                    
-                    <p>This is a friendly reminder that your payment for PractiCheck services is due.</p>
-                    
-                    <p><strong>Monthly Fee: ${float(university['monthly_fee'] or 0.0):.2f}</strong></p>
-                    
-                    <p>Please ensure payment is made to avoid any service interruption.</p>
-                    
-                    <p>If you have already made the payment, please disregard this message.</p>
-                    
-                    <p>For any questions, please contact our billing team at billing@practicheck.com</p>
-                    
-                    <p>Thank you for using PractiCheck!</p>
-                    
-                    <p>Best regards,<br>PractiCheck Billing Team</p>
-                </body>
-                </html>
-                """
-                
-                if send_email(contact_email, subject, text_body, html_body):
-                    sent_count += 1
-                else:
-                    failed_count += 1
-                    
-            except Exception as e:
-                logger.error(f"Failed to send payment reminder to {university['name']}: {e}")
-                failed_count += 1
-        
-        return {
-            "message": f"Payment reminders completed. Sent: {sent_count}, Failed: {failed_count}",
-            "sent_count": sent_count,
-            "failed_count": failed_count
-        }
+        job = await get_job(conn, job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 # Billing Endpoints
 
 @app.get("/billing/universities", response_model=List[BillingUniversitySummary])
-async def get_billing_universities(current_user: dict = Depends(get_current_user)):
-    """Get all universities with billing information"""
+async def get_billing_universities(
+    response: Response,
+    listing: dict = Depends(tenant_listing_params),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of universities with billing information"""
     async with db_pool.acquire() as conn:
-        universities = await conn.fetch("""
-            SELECT 
+        universities = await fetch_tenant_page(conn, response, """
                 t.id,
                 t.name,
                 t.location,
@@ -1463,22 +1755,13 @@ async def get_billing_universities(current_user: dict = Depends(get_current_user
                 t.status,
                 t.last_sync as last_billing_date,
                 (t.last_sync + INTERVAL '1 month') as next_billing_date,
-                COALESCE(billing_summary.total_paid, 0) as total_paid,
-                COALESCE(billing_summary.outstanding_amount, 0) as outstanding_amount,
-                COALESCE(billing_summary.invoice_count, 0) as invoice_count
-            FROM tenants t
+                COALESCE(b.paid_amount, 0) as total_paid,
+                COALESCE(b.outstanding_amount, 0) as outstanding_amount,
+                COALESCE(b.invoice_count, 0) as invoice_count
+        """, """
             LEFT JOIN subscription_plans sp ON t.plan_id = sp.id
-            LEFT JOIN (
-                SELECT 
-                    tenant_id,
-                    SUM(CASE WHEN status = 'paid' THEN amount ELSE 0 END) as total_paid,
-                    SUM(CASE WHEN status IN ('pending', 'overdue') THEN amount ELSE 0 END) as outstanding_amount,
-                    COUNT(*) as invoice_count
-                FROM invoices 
-                GROUP BY tenant_id
-            ) billing_summary ON t.id = billing_summary.tenant_id
-            ORDER BY t.created_at DESC
-        """)
+            JOIN tenant_billing_balances b ON t.id = b.tenant_id
+        """, listing)
         
         result = []
         for uni in universities:
@@ -1517,19 +1800,11 @@ async def get_university_billing(
             SELECT 
                 t.*,
                 sp.name as plan_name,
-                COALESCE(billing_summary.total_paid, 0) as total_paid,
-                COALESCE(billing_summary.outstanding_amount, 0) as outstanding_amount
+                COALESCE(b.paid_amount, 0) as total_paid,
+                COALESCE(b.outstanding_amount, 0) as outstanding_amount
             FROM tenants t
             LEFT JOIN subscription_plans sp ON t.plan_id = sp.id
-            LEFT JOIN (
-                SELECT 
-                    tenant_id,
-                    SUM(CASE WHEN status = 'paid' THEN amount ELSE 0 END) as total_paid,
-                    SUM(CASE WHEN status IN ('pending', 'overdue') THEN amount ELSE 0 END) as outstanding_amount
-                FROM invoices 
-                WHERE tenant_id = $1
-                GROUP BY tenant_id
-            ) billing_summary ON t.id = billing_summary.tenant_id
+            LEFT JOIN tenant_billing_balances b ON t.id = b.tenant_id
             WHERE t.id = $1
         """, university_id)
         
@@ -1598,8 +1873,7 @@ async def create_invoice(
     
     async with db_pool.acquire() as conn:
         # Generate invoice number
-        invoice_count = await conn.fetchval("SELECT COUNT(*) FROM invoices") or 0
-        invoice_number = f"INV-{datetime.now().year}-{str(invoice_count + 1).zfill(3)}"
+        invoice_number, = await allocate_invoice_numbers(1)
         
         # Create invoice
         invoice_id = await conn.fetchval("""
@@ -1617,7 +1891,7 @@ async def create_invoice(
         await conn.execute("""
             INSERT INTO activity_logs (user_id, user_type, action, target_type, target_id, details)
             VALUES ($1, 'admin', 'Invoice Created', 'invoice', $2, $3)
-        """, current_user['id'], invoice_id, {"invoice_number": invoice_number, "amount": invoice_data.get('amount')})
+        """, current_user['id'], invoice_id, json.dumps({"invoice_number": invoice_number, "amount": invoice_data.get('amount')}))
         
         return {"message": "Invoice created successfully", "invoice_id": str(invoice_id), "invoice_number": invoice_number}
 
@@ -1651,130 +1925,106 @@ async def send_invoice(
         
         return {"message": "Invoice sent successfully"}
 
+@app.post("/billing/invoices/{invoice_id}/pay")
+async def record_invoice_payment(
+    invoice_id: str,
+    payment: RecordPaymentRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Mark an invoice as paid"""
+    validate_uuid(invoice_id)
+    
+    async with db_pool.acquire() as conn:
+        async with conn.transaction():
+            invoice = await conn.fetchrow("""
+                UPDATE invoices
+                SET status = 'paid',
+                    paid_date = COALESCE($2, CURRENT_DATE),
+                    payment_method = $3,
+                    payment_reference = $4,
+                    updated_at = NOW()
+                WHERE id = $1 AND status IN ('pending', 'overdue')
+                RETURNING id, tenant_id, invoice_number, amount, paid_date
+            """, invoice_id, payment.paid_date, payment.payment_method, payment.payment_reference)
+            
+            if not invoice:
+                exists = await conn.fetchval("SELECT status FROM invoices WHERE id = $1", invoice_id)
+                if not exists:
+                    raise HTTPException(status_code=404, detail="Invoice not found")
+                raise HTTPException(status_code=409, detail=f"Invoice is already {exists}")
+            
+            # Log activity
+            await conn.execute("""
+                INSERT INTO activity_logs (user_id, user_type, action, target_type, target_id, details)
+                VALUES ($1, 'admin', 'Invoice Paid', 'invoice', $2, $3)
+            """, current_user['id'], invoice['id'], json.dumps({
+                "invoice_number": invoice['invoice_number'],
+                "amount": float(invoice['amount']),
+                "payment_method": payment.payment_method,
+                "payment_reference": payment.payment_reference
+            }))
+    
+    request_overview_refresh()
+    
+    return {
+        "message": "Payment recorded successfully",
+        "invoice_id": str(invoice['id']),
+        "paid_date": invoice['paid_date'].isoformat()
+    }
+
+async def get_invoice_document_source(invoice_id: str):
+    """Load the invoice fields rendered into its documents"""
+    async with db_pool.acquire() as conn:
+        invoice = await conn.fetchrow("""
+            SELECT i.id, i.invoice_number, i.invoice_date, i.due_date, i.amount, i.status, i.description, i.updated_at,
+                   t.name as university_name, t.location, t.updated_at as tenant_updated_at
+            FROM invoices i
+            JOIN tenants t ON i.tenant_id = t.id
+            WHERE i.id = $1
+        """, invoice_id)
+    
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    return invoice
+
 @app.get("/billing/invoices/{invoice_id}/pdf")
 async def download_invoice_pdf(
     invoice_id: str,
+    request: Request,
     current_user: dict = Depends(get_current_user)
 ):
     """Download invoice as PDF"""
     # Validate UUID
     validate_uuid(invoice_id)
     
-    # In a real implementation, you would generate a PDF here
-    # For now, return a mock response
-    from fastapi.responses import Response
-    
-    # Mock PDF content
-    pdf_content = b"Mock PDF content for invoice " + invoice_id.encode()
+    invoice = await get_invoice_document_source(invoice_id)
+    key = document_key(invoice)
+    if etag_matches(request, f'"{key}"'):
+        return Response(status_code=304, headers={"ETag": f'"{key}"'})
     
-    return Response(
-        content=pdf_content,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=invoice-{invoice_id}.pdf"}
-    )
+    file = await invoice_documents.open_pdf(invoice)
+    return await file_response(request, file, key, "application/pdf", f"invoice-{invoice['invoice_number']}.pdf")
 
 @app.get("/billing/invoices/{invoice_id}/print")
 async def print_invoice(
     invoice_id: str,
+    request: Request,
     current_user: dict = Depends(get_current_user)
 ):
     """Get printable invoice HTML"""
     # Validate UUID
     validate_uuid(invoice_id)
     
-    async with db_pool.acquire() as conn:
-        # Get invoice details
-        invoice = await conn.fetchrow("""
-            SELECT i.*, t.name as university_name, t.location, t.settings
-            FROM invoices i
-            JOIN tenants t ON i.tenant_id = t.id
-            WHERE i.id = $1
-        """, invoice_id)
-        
-        if not invoice:
-            raise HTTPException(status_code=404, detail="Invoice not found")
-        
-        # Generate HTML for printing
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Invoice {invoice['invoice_number']}</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 40px; }}
-                .header {{ text-align: center; margin-bottom: 40px; }}
-                .invoice-details {{ margin-bottom: 30px; }}
-                .billing-info {{ display: flex; justify-content: space-between; margin-bottom: 30px; }}
-                .items {{ border-collapse: collapse; width: 100%; }}
-                .items th, .items td {{ border: 1px solid #ddd; padding: 12px; text-align: left; }}
-                .items th {{ background-color: #f2f2f2; }}
-                .total {{ text-align: right; font-weight: bold; font-size: 18px; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>INVOICE</h1>
-                <h2>#{invoice['invoice_number']}</h2>
-            </div>
-            
-            <div class="billing-info">
-                <div>
-                    <h3>From:</h3>
-                    <p><strong>PractiCheck Ltd.</strong><br>
-                    123 Business Street<br>
-                    Nairobi, Kenya<br>
-                    info@practicheck.com</p>
-                </div>
-                <div>
-                    <h3>To:</h3>
-                    <p><strong>{invoice['university_name']}</strong><br>
-                    {invoice['location']}<br>
-                    billing@university.edu</p>
-                </div>
-            </div>
-            
-            <div class="invoice-details">
-                <p><strong>Invoice Date:</strong> {invoice['invoice_date'].strftime('%Y-%m-%d')}</p>
-                <p><strong>Due Date:</strong> {invoice['due_date'].strftime('%Y-%m-%d')}</p>
-                <p><strong>Status:</strong> {invoice['status'].title()}</p>
-            </div>
-            
-            <table class="items">
-                <thead>
-                    <tr>
-                        <th>Description</th>
-                        <th>Amount</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    <tr>
-                        <td>{invoice['description']}</td>
-                        <td>${invoice['amount']:,.2f}</td>
-                    </tr>
-                </tbody>
-                <tfoot>
-                    <tr>
-                        <td class="total">Total:</td>
-                        <td class="total">${invoice['amount']:,.2f}</td>
-                    </tr>
-                </tfoot>
-            </table>
-            
-            <div style="text-align: center; margin-top: 40px; color: #666;">
-                <p>Thank you for your business!</p>
-            </div>
-            
-            <script>
-                window.onload = function() {{
-                    window.print();
-                }}
-            </script>
-        </body>
-        </html>
-        """
-        
-        from fastapi.responses import HTMLResponse
-        return HTMLResponse(content=html_content)
+    invoice = await get_invoice_document_source(invoice_id)
+    etag = f'"{document_key(invoice)}"'
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    from fastapi.responses import HTMLResponse
+    return HTMLResponse(
+        content=render_template("documents/invoice_print.html", **invoice_document_data(invoice)),
+        headers={"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"}
+    )
 
 @app.put("/billing/universities/{university_id}")
 async def update_university_billing(
@@ -1790,7 +2040,7 @@ async def update_university_billing(
         # Update university basic info
         result = await conn.execute("""
             UPDATE tenants 
-            SET name = $1, location = $2, monthly_fee = $3, settings = $4
+            SET name = $1, location = $2, monthly_fee = $3, settings = $4, updated_at = NOW()
             WHERE id = $5
         """, 
         university_data.get('name'),
@@ -1811,6 +2061,8 @@ async def update_university_billing(
             VALUES ($1, 'admin', 'University Billing Updated', 'tenant', $2, $3)
         """, current_user['id'], university_id, university_data)
         
+        request_overview_refresh()
+        
         return {"message": "University billing information updated successfully"}
 
 @app.get("/billing/invoices/{university_id}")
@@ -0,0 +1,195 @@
+"""
+PractiCheck Metrics History
+Daily tenant counter snapshots, growth calculation and downsampled range queries
+"""
+
+from datetime import date
+from typing import List, Optional
+
+# Metrics that can be queried, mapped to their snapshot columns
+HISTORY_METRICS = {
+    "universities": "CASE WHEN is_active THEN 1 ELSE 0 END",
+    "students": "students",
+    "attachments": "active_attachments",
+    "faculties": "faculties",
+    "revenue": "CASE WHEN is_active THEN monthly_fee ELSE 0 END",
+}
+
+HISTORY_BUCKETS = ("day", "week", "month")
+
+async def snapshot_tenant_metrics(conn) -> int:
+    """Snapshot today's per-tenant counters from the platform overview"""
+    result = await conn.execute("""
+        INSERT INTO tenant_daily_metrics (
+            tenant_id, snapshot_date, students, active_attachments, faculties, monthly_fee, is_active
+        )
+        SELECT
+            t.id,
+            CURRENT_DATE,
+            COALESCE(o.students, 0),
+            COALESCE(o.attachments, 0),
+            COALESCE(o.faculties, 0),
+            COALESCE(t.monthly_fee, 0),
+            t.status = 'active'
+        FROM tenants t
+        LEFT JOIN university_overview o ON t.id = o.tenant_id
+        ON CONFLICT (tenant_id, snapshot_date) DO UPDATE SET
+            students = EXCLUDED.students,
+            active_attachments = EXCLUDED.active_attachments,
+            faculties = EXCLUDED.faculties,
+            monthly_fee = EXCLUDED.monthly_fee,
+            is_active = EXCLUDED.is_active
+    """)
+    return int(result.split()[-1])
+
+async def has_snapshot_for_today(conn) -> bool:
+    """Check whether today's snapshot has already been taken"""
+    return bool(await conn.fetchval(
+        "SELECT EXISTS(SELECT 1 FROM tenant_daily_metrics WHERE snapshot_date = CURRENT_DATE)"
+    ))
+
+async def rollup_and_prune_metrics(conn, retention_days: int) -> int:
+    """Roll daily snapshots older than the retention window into month-end rows and delete them"""
+    async with conn.transaction():
+        await conn.execute("""
+            INSERT INTO tenant_monthly_metrics (
+                tenant_id, month, students, active_attachments, faculties, monthly_fee, is_active
+            )
+            SELECT DISTINCT ON (tenant_id, date_trunc('month', snapshot_date))
+                tenant_id,
+                date_trunc('month', snapshot_date)::date,
+                students,
+                active_attachments,
+                faculties,
+                monthly_fee,
+                is_active
+            FROM tenant_daily_metrics
+            WHERE snapshot_date < CURRENT_DATE - $1::int
+            ORDER BY tenant_id, date_trunc('month', snapshot_date), snapshot_date DESC
+            ON CONFLICT (tenant_id, month) DO UPDATE SET
+                students = EXCLUDED.students,
+                active_attachments = EXCLUDED.active_attachments,
+                faculties = EXCLUDED.faculties,
+                monthly_fee = EXCLUDED.monthly_fee,
+                is_active = EXCLUDED.is_active
+        """, retention_days)
+
+        result = await conn.execute(
+            "DELETE FROM tenant_daily_metrics WHERE snapshot_date < CURRENT_DATE - $1::int",
+            retention_days
+        )
+    return int(result.split()[-1])
+
+def growth_percentage(current, previous) -> float:
+    """Calculate percentage growth between two values"""
+    if not previous:
+        return 0.0
+    return round((float(current) - float(previous)) / float(previous) * 100, 1)
+
+async def get_monthly_growth(conn) -> dict:
+    """Calculate month-over-month platform growth from month-end snapshots"""
+    row = await conn.fetchrow("""
+        WITH platform_daily AS (
+            SELECT
+                snapshot_date,
+                COUNT(*) FILTER (WHERE is_active) AS universities,
+                COALESCE(SUM(students) FILTER (WHERE is_active), 0) AS students,
+                COALESCE(SUM(active_attachments) FILTER (WHERE is_active), 0) AS attachments,
+                COALESCE(SUM(monthly_fee) FILTER (WHERE is_active), 0) AS revenue
+            FROM tenant_daily_metrics
+            WHERE snapshot_date >= date_trunc('month', CURRENT_DATE) - INTERVAL '1 month'
+            GROUP BY snapshot_date
+        ),
+        month_end AS (
+            SELECT
+                *,
+                ROW_NUMBER() OVER (
+                    PARTITION BY date_trunc('month', snapshot_date)
+                    ORDER BY snapshot_date DESC
+                ) AS rn
+            FROM platform_daily
+        ),
+        growth AS (
+            SELECT
+                snapshot_date,
+                universities,
+                students,
+                attachments,
+                revenue,
+                LAG(universities) OVER w AS prev_universities,
+                LAG(students) OVER w AS prev_students,
+                LAG(attachments) OVER w AS prev_attachments,
+                LAG(revenue) OVER w AS prev_revenue
+            FROM month_end
+            WHERE rn = 1
+            WINDOW w AS (ORDER BY snapshot_date)
+        )
+        SELECT * FROM growth
+        ORDER BY snapshot_date DESC
+        LIMIT 1
+    """)
+
+    if not row:
+        return {"universities": 0.0, "students": 0.0, "attachments": 0.0, "revenue": 0.0}
+
+    return {
+        "universities": growth_percentage(row['universities'], row['prev_universities']),
+        "students": growth_percentage(row['students'], row['prev_students']),
+        "attachments": growth_percentage(row['attachments'], row['prev_attachments']),
+        "revenue": growth_percentage(row['revenue'], row['prev_revenue'])
+    }
+
+async def get_metric_history(
+    conn,
+    metric: str,
+    start_date: date,
+    end_date: date,
+    bucket: str = "day",
+    tenant_id: Optional[str] = None
+) -> List[dict]:
+    """Get a downsampled platform or tenant time series for a metric
+
+    Each bucket reports the closing (last) value and the average of the daily
+    totals inside it. Month-end rollups cover ranges older than the daily
+    retention window.
+    """
+    column = HISTORY_METRICS[metric]
+
+    rows = await conn.fetch(f"""
+        WITH oldest_daily AS (
+            SELECT COALESCE(MIN(snapshot_date), CURRENT_DATE) AS snapshot_date
+            FROM tenant_daily_metrics
+        ),
+        samples AS (
+            SELECT snapshot_date AS sample_date, tenant_id, {column} AS value
+            FROM tenant_daily_metrics
+            WHERE snapshot_date BETWEEN $1 AND $2
+            UNION ALL
+            SELECT month AS sample_date, tenant_id, {column} AS value
+            FROM tenant_monthly_metrics
+            WHERE month BETWEEN date_trunc('month', $1::date) AND $2
+            AND month < date_trunc('month', (SELECT snapshot_date FROM oldest_daily))
+        ),
+        daily_totals AS (
+            SELECT sample_date, SUM(value) AS value
+            FROM samples
+            WHERE $4::uuid IS NULL OR tenant_id = $4::uuid
+            GROUP BY sample_date
+        )
+        SELECT
+            date_trunc($3, sample_date)::date AS bucket_start,
+            (array_agg(value ORDER BY sample_date DESC))[1] AS closing_value,
+            AVG(value) AS average_value
+        FROM daily_totals
+        GROUP BY 1
+        ORDER BY 1
+    """, start_date, end_date, bucket, tenant_id)
+
+    return [
+        {
+            "date": row['bucket_start'].isoformat(),
+            "value": float(row['closing_value'] or 0),
+            "average": round(float(row['average_value'] or 0), 2)
+        }
+        for row in rows
+    ]
@@ -0,0 +1,19 @@
+"""
+PractiCheck Company Admin Job Worker
+Standalone process running queued background jobs for the Company Admin service
+"""
+
+import asyncio
+import os
+
+import main
+from shared.jobs import run_worker_process
+
+WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+
+def use_pool(pool):
+    """Point the service's handlers at the worker's connection pool"""
+    main.db_pool = pool
+
+if __name__ == "__main__":
+    asyncio.run(run_worker_process(main.SERVICE_NAME, main.DATABASE_URL, main.JOB_HANDLERS, WORKER_CONCURRENCY, on_pool=use_pool))
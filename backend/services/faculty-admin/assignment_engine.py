@@ -0,0 +1,142 @@
+"""
+PractiCheck Assignment Engine
+Greedy batch assignment of pending assessment requests to a faculty's lecturers,
+most urgent first, preferring matching specializations and the least loaded
+lecturer within each lecturer's max_students capacity
+"""
+
+import re
+from datetime import date, datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+PRIORITY_RANK = {"urgent": 0, "high": 1, "normal": 2, "low": 3}
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Words too generic to count as a specialization match
+_STOPWORDS = {"and", "of", "the", "in", "for", "with", "to", "a", "an", "bsc", "ba", "msc", "diploma", "studies"}
+
+def _keywords(*texts: Optional[str]) -> Set[str]:
+    words = set()
+    for text in texts:
+        if text:
+            words.update(word for word in _WORD.findall(text.lower()) if len(word) > 2 and word not in _STOPWORDS)
+    return words
+
+class PendingRequest(NamedTuple):
+    id: str
+    student_id: str
+    student_name: str
+    priority: str
+    due_date: Optional[date]
+    requested_at: datetime
+    # Course, program and assessment type, matched against lecturer specializations
+    keywords: frozenset
+
+class Lecturer:
+    """A lecturer's remaining capacity while a batch is planned"""
+
+    __slots__ = ("id", "name", "max_students", "students", "keywords", "added")
+
+    def __init__(self, lecturer_id: str, name: str, max_students: int, students: Iterable[str], specialization: Optional[str]):
+        self.id = lecturer_id
+        self.name = name
+        self.max_students = max_students
+        # Distinct active students; a second request for the same student takes no extra capacity
+        self.students = set(students)
+        self.keywords = _keywords(specialization)
+        self.added = 0
+
+    @property
+    def load(self) -> float:
+        return len(self.students) / self.max_students if self.max_students else 1.0
+
+    def can_take(self, student_id: str) -> bool:
+        return student_id in self.students or len(self.students) < self.max_students
+
+    def take(self, student_id: str):
+        if student_id not in self.students:
+            self.students.add(student_id)
+            self.added += 1
+
+class Assignment(NamedTuple):
+    request_id: str
+    student_id: str
+    student_name: str
+    lecturer_id: str
+    lecturer_name: str
+    specialization_match: bool
+
+class Unassigned(NamedTuple):
+    request_id: str
+    reason: str
+
+class AssignmentPlan(NamedTuple):
+    assignments: List[Assignment]
+    unassigned: List[Unassigned]
+    # New distinct students per lecturer, for incrementing current_students
+    added_students: Dict[str, int]
+
+def pending_request(row) -> PendingRequest:
+    """Build a PendingRequest from an assessment_requests row joined with the student's course"""
+    return PendingRequest(
+        id=str(row['id']),
+        student_id=str(row['student_id']),
+        student_name=row['student_name'],
+        priority=row['priority'] or "normal",
+        due_date=row['due_date'],
+        requested_at=row['requested_at'],
+        keywords=frozenset(_keywords(row['course_name'], row['program'], row['assessment_type']))
+    )
+
+def request_order(request: PendingRequest):
+    """Priority, then earliest due date (undated last), then oldest request"""
+    return (
+        PRIORITY_RANK.get(request.priority, PRIORITY_RANK["normal"]),
+        request.due_date or date.max,
+        request.requested_at
+    )
+
+def plan_assignments(requests: List[PendingRequest], lecturers: List[Lecturer]) -> AssignmentPlan:
+    """Assign requests in priority order to the best lecturer with room
+
+    Best is: already assessing the student, then a specialization match, then
+    the lowest load ratio, then the fewest students overall.
+    """
+    assignments: List[Assignment] = []
+    unassigned: List[Unassigned] = []
+
+    if not lecturers:
+        return AssignmentPlan([], [Unassigned(request.id, "No active lecturers in faculty") for request in requests], {})
+
+    for request in sorted(requests, key=request_order):
+        best = None
+        best_score = None
+        for lecturer in lecturers:
+            if not lecturer.can_take(request.student_id):
+                continue
+            matches = bool(lecturer.keywords & request.keywords)
+            score = (
+                request.student_id not in lecturer.students,
+                not matches,
+                lecturer.load,
+                len(lecturer.students)
+            )
+            if best_score is None or score < best_score:
+                best, best_score = lecturer, score
+
+        if best is None:
+            unassigned.append(Unassigned(request.id, "All lecturers are at capacity"))
+            continue
+
+        best.take(request.student_id)
+        assignments.append(Assignment(
+            request_id=request.id,
+            student_id=request.student_id,
+            student_name=request.student_name,
+            lecturer_id=best.id,
+            lecturer_name=best.name,
+            specialization_match=not best_score[1]
+        ))
+
+    added = {lecturer.id: lecturer.added for lecturer in lecturers if lecturer.added}
+    return AssignmentPlan(assignments, unassigned, added)
@@ -3,12 +3,11 @@ PractiCheck Faculty Admin API
 FastAPI backend for faculty-specific administration
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, File, Header, Query, Response, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
-import asyncpg
 import bcrypt
 import jwt
 from jwt.exceptions import ExpiredSignatureError, InvalidTokenError
@@ -16,11 +15,31 @@ import os
 from datetime import datetime, timedelta, timezone
 import logging
 import uuid
+import asyncio
+import base64
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 import json
 from dotenv import load_dotenv
+import sys
+from pathlib import Path
 import secrets
 import string
+import time
+from assignment_engine import PRIORITY_RANK, Lecturer, pending_request, plan_assignments
+from visit_planner import kmeans, plan_route, project, reference_latitude, start_point
+
+# Shared backend utilities live alongside the services directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from shared.metrics import MetricsMiddleware, metrics_response, start_runtime_sampler, stop_runtime_sampler
+from shared.db import create_pool
+from shared.slow_queries import is_slow_query_reader, slow_queries_response
+from shared.roster import RosterFormatError, import_roster
+from shared.jobs import JobContext, JobWorker, enqueue_job, get_job
+from shared.mailer import Mailer
+from shared.pagination import CountEstimator, QueryFilters, clamp_limit, set_page_headers
+from shared.logbook_search import SearchScope, search_logbook_entries
+from shared.templating import preload_templates, render_email
 
 # Load environment variables from .env file
 load_dotenv("../../../.env")
@@ -30,6 +49,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration
+SERVICE_NAME = "faculty-admin"
 DATABASE_URL = os.getenv("DATABASE_URL")
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 JWT_ALGORITHM = "HS256"
@@ -43,20 +63,59 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER)
 
+# Bulk lecturer onboarding configuration
+BULK_LECTURER_MAX_BATCH = int(os.getenv("BULK_LECTURER_MAX_BATCH", "500"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+
+# Bulk assessment request actions
+BULK_ASSESSMENT_MAX_BATCH = int(os.getenv("BULK_ASSESSMENT_MAX_BATCH", "500"))
+
+# Statuses each bulk action applies to, and the activity log action it records
+BULK_ASSESSMENT_ACTIONS = {
+    "assign": ({"pending"}, "Lecturer Assigned"),
+    "reassign": ({"assigned"}, "Lecturer Reassigned"),
+    "cancel": ({"pending", "assigned"}, "Assessment Request Cancelled"),
+    "priority": ({"pending", "assigned", "in_progress"}, "Assessment Priority Changed")
+}
+
+# Background job configuration (set JOB_WORKERS=0 to run jobs only in worker.py processes)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
 # Security
 security = HTTPBearer()
 
 # Database connection pool
 db_pool = None
 
+# Async SMTP sender
+mailer = Mailer(EMAIL_HOST, EMAIL_PORT, EMAIL_HOST_USER, EMAIL_HOST_PASSWORD, EMAIL_USE_TLS, DEFAULT_FROM_EMAIL)
+
+# Cached totals for the paginated assessment queue
+assessment_counts = CountEstimator()
+
+# bcrypt releases the GIL, so a thread pool hashes passwords in parallel
+password_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+# Background job worker running in this process
+job_worker = None
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global db_pool
-    db_pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=10, statement_cache_size=0)
+    global db_pool, job_worker
+    db_pool = await create_pool(SERVICE_NAME, DATABASE_URL, min_size=1, max_size=10, statement_cache_size=0)
     logger.info("Faculty Admin service - Database connection pool created")
+    metrics_sampler = start_runtime_sampler(SERVICE_NAME, lambda: db_pool)
+    logger.info(f"Compiled {preload_templates()} templates")
+    if JOB_WORKERS > 0:
+        job_worker = JobWorker(db_pool, JOB_HANDLERS, concurrency=JOB_WORKERS)
+        job_worker.start()
     yield
     # Shutdown
+    if job_worker:
+        await job_worker.stop()
+    await stop_runtime_sampler(metrics_sampler)
+    password_hash_executor.shutdown(wait=False)
     await db_pool.close()
     logger.info("Faculty Admin service - Database connection pool closed")
 
@@ -79,8 +138,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Total-Count-Estimated", "X-Next-Cursor"],
 )
 
+# Request metrics middleware
+app.add_middleware(MetricsMiddleware, service=SERVICE_NAME)
+
 # Pydantic Models
 class CreateCourseRequest(BaseModel):
     name: str
@@ -112,6 +175,10 @@ class CreateLecturerRequest(BaseModel):
     specialization: Optional[str] = None
     max_students: Optional[int] = 20
 
+class BulkCreateLecturersRequest(BaseModel):
+    lecturers: List[CreateLecturerRequest] = Field(..., min_length=1)
+    send_emails: bool = True
+
 class LecturerResponse(BaseModel):
     id: str
     name: str
@@ -150,6 +217,33 @@ class AssignLecturerRequest(BaseModel):
     lecturer_id: str
     notes: Optional[str] = None
 
+class AutoAssignRequest(BaseModel):
+    dry_run: bool = False
+    request_ids: Optional[List[str]] = None  # Defaults to every pending request in the faculty
+    max_requests: Optional[int] = Field(None, ge=1)
+
+class VisitPlanRequest(BaseModel):
+    # assigned: route each lecturer's assigned visits; pending: cluster pending visits into suggested routes
+    status: str = Field("assigned", pattern="^(assigned|pending)$")
+    clusters: Optional[int] = Field(None, ge=1, le=500)  # Pending mode; defaults to the number of active lecturers
+    start_latitude: Optional[float] = Field(None, ge=-90, le=90)
+    start_longitude: Optional[float] = Field(None, ge=-180, le=180)
+
+class PlacementLocation(BaseModel):
+    location: str = Field(..., min_length=1, max_length=255)
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
+class PlacementLocationsRequest(BaseModel):
+    locations: List[PlacementLocation] = Field(..., min_length=1, max_length=5000)
+
+class BulkAssessmentActionRequest(BaseModel):
+    action: str = Field(..., pattern="^(assign|reassign|cancel|priority)$")
+    request_ids: List[str] = Field(..., min_length=1)
+    lecturer_id: Optional[str] = None  # assign and reassign
+    priority: Optional[str] = Field(None, pattern="^(low|normal|high|urgent)$")  # priority
+    notes: Optional[str] = None
+
 class LecturerCredentials(BaseModel):
     email: str
     temporary_password: str
@@ -194,6 +288,64 @@ def generate_secure_password(length: int = 12) -> str:
     password = ''.join(secrets.choice(alphabet) for _ in range(length))
     return password
 
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash a batch of passwords in parallel on the password hashing pool"""
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(
+        loop.run_in_executor(password_hash_executor, hash_password, password)
+        for password in passwords
+    ))
+
+async def reserve_lecturer_capacity(conn, lecturer_id, student_id) -> bool:
+    """Count a student against a lecturer's capacity, returning False if the lecturer is full
+
+    Runs in the caller's transaction and keeps the lecturer's profile row locked
+    until it ends, so concurrent assignments to one lecturer are serialized. A
+    student the lecturer already has an active assignment for takes no extra
+    capacity. Call before inserting the assignment.
+    """
+    await conn.execute("SELECT 1 FROM lecturer_profiles WHERE user_id = $1 FOR UPDATE", lecturer_id)
+    already_assigned = await conn.fetchval("""
+        SELECT EXISTS (
+            SELECT 1 FROM student_lecturer_assignments
+            WHERE lecturer_id = $1 AND student_id = $2 AND status = 'active'
+        )
+    """, lecturer_id, student_id)
+    if already_assigned:
+        return True
+    
+    reserved = await conn.fetchval("""
+        UPDATE lecturer_profiles
+        SET current_students = current_students + 1
+        WHERE user_id = $1 AND current_students < max_students
+        RETURNING current_students
+    """, lecturer_id)
+    return reserved is not None
+
+async def release_lecturer_capacity(conn, lecturer_ids: List, student_ids: List):
+    """Uncount students whose lecturers have no active assignment left for them
+
+    Takes the (lecturer, student) pairs of assignments just completed or
+    cancelled, as parallel lists, and runs in the same transaction.
+    """
+    await conn.execute("""
+        SELECT 1 FROM lecturer_profiles WHERE user_id = ANY($1::uuid[]) ORDER BY user_id FOR UPDATE
+    """, lecturer_ids)
+    await conn.execute("""
+        UPDATE lecturer_profiles lp
+        SET current_students = GREATEST(lp.current_students - x.released, 0)
+        FROM (
+            SELECT p.lecturer_id, COUNT(DISTINCT p.student_id) as released
+            FROM unnest($1::uuid[], $2::uuid[]) AS p(lecturer_id, student_id)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM student_lecturer_assignments sla
+                WHERE sla.lecturer_id = p.lecturer_id AND sla.student_id = p.student_id AND sla.status = 'active'
+            )
+            GROUP BY p.lecturer_id
+        ) x
+        WHERE lp.user_id = x.lecturer_id
+    """, lecturer_ids, student_ids)
+
 async def get_current_user(token_data: dict = Depends(verify_token)) -> dict:
     """Get current faculty admin user"""
     async with db_pool.acquire() as conn:
@@ -216,70 +368,8 @@ async def get_current_user(token_data: dict = Depends(verify_token)) -> dict:
 async def send_lecturer_email(lecturer_email: str, credentials: LecturerCredentials) -> bool:
     """Send welcome email to lecturer with credentials"""
     try:
-        import smtplib
-        from email.mime.text import MimeText
-        from email.mime.multipart import MimeMultipart
-        
-        subject = f"Lecturer Account Created - {credentials.faculty_name}"
-        
-        # Email body
-        body = f"""
-Dear Lecturer,
-
-Your lecturer account has been created for {credentials.faculty_name} at {credentials.university_name}.
-
-Login Details:
-- Email: {credentials.email}
-- Temporary Password: {credentials.temporary_password}
-
-IMPORTANT: Please log in and change your password immediately for security.
-You will be prompted to create a new password on your first login.
-
-Best regards,
-{credentials.faculty_name} Administration
-        """
-        
-        # HTML version
-        html_body = f"""
-        <html>
-        <body>
-            <h2>Lecturer Account Created</h2>
-            <p>Dear Lecturer,</p>
-            <p>Your lecturer account has been created for <strong>{credentials.faculty_name}</strong> at <strong>{credentials.university_name}</strong>.</p>
-            
-            <h3>Login Details:</h3>
-            <ul>
-                <li><strong>Email:</strong> {credentials.email}</li>
-                <li><strong>Temporary Password:</strong> <code>{credentials.temporary_password}</code></li>
-            </ul>
-            
-            <p><strong>IMPORTANT:</strong> Please log in and change your password immediately for security.</p>
-            <p>You will be prompted to create a new password on your first login.</p>
-            
-            <p>Best regards,<br>{credentials.faculty_name} Administration</p>
-        </body>
-        </html>
-        """
-        
-        msg = MimeMultipart('alternative')
-        msg['From'] = DEFAULT_FROM_EMAIL
-        msg['To'] = lecturer_email
-        msg['Subject'] = subject
-
-        text_part = MimeText(body, 'plain')
-        html_part = MimeText(html_body, 'html')
-        msg.attach(text_part)
-        msg.attach(html_part)
-
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        if EMAIL_USE_TLS:
-            server.starttls()
-        server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        
-        logger.info(f"Lecturer welcome email sent to {lecturer_email}")
-        return True
+        subject, body, html_body = render_email("lecturer_welcome", **credentials.model_dump())
+        return await mailer.send(lecturer_email, subject, body, html_body)
     except Exception as e:
         logger.error(f"Failed to send lecturer email to {lecturer_email}: {e}")
         return False
@@ -306,6 +396,23 @@ async def health_check():
         logger.error(f"Health check failed: {e}")
         return {"status": "unhealthy", "database": "disconnected"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return metrics_response()
+
+async def get_slow_query_reader(token_data: dict = Depends(verify_token)) -> dict:
+    """Require a company-admin super admin token for slow query logs"""
+    async with db_pool.acquire() as conn:
+        if not await is_slow_query_reader(conn, token_data):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Super admin access required")
+    return token_data
+
+@app.get("/metrics/slow-queries", include_in_schema=False)
+async def slow_queries(limit: int = 50, token_data: dict = Depends(get_slow_query_reader)):
+    """Recent statements slower than SLOW_QUERY_LOG_MS with sampled plans"""
+    return slow_queries_response(min(max(limit, 1), 200))
+
 @app.get("/dashboard/stats", response_model=FacultyDashboardStats)
 async def get_faculty_dashboard_stats(current_user: dict = Depends(get_current_user)):
     """Get faculty-specific dashboard statistics"""
@@ -549,6 +656,237 @@ async def create_lecturer(
                 "email_sent": email_sent
             }
 
+async def onboard_lecturers_job(ctx: JobContext) -> dict:
+    """Hash credentials, insert lecturers in one statement and send their welcome emails"""
+    data = ctx.payload
+    tenant_id = data['tenant_id']
+    faculty_id = data['faculty_id']
+    lecturers = [CreateLecturerRequest(**lecturer) for lecturer in data['lecturers']]
+    passwords = {}
+    
+    if 'lecturers' not in ctx.checkpoint:
+        await ctx.progress(0, len(lecturers), "Hashing credentials", force=True)
+        generated = [generate_secure_password() for _ in lecturers]
+        password_hashes = await hash_passwords(generated)
+        
+        await ctx.progress(0, len(lecturers), "Creating lecturers", force=True)
+        async with ctx.pool.acquire() as conn:
+            async with conn.transaction():
+                created = await conn.fetch("""
+                    WITH batch AS (
+                        SELECT *
+                        FROM unnest($3::text[], $4::text[], $5::text[], $6::text[], $7::text[], $8::text[], $9::text[], $10::int[])
+                            AS b(email, name, password_hash, staff_id, phone, office_location, specialization, max_students)
+                    ),
+                    new_users AS (
+                        INSERT INTO users (tenant_id, email, password_hash, name, role, faculty_id, is_active, is_password_temporary)
+                        SELECT $1, email, password_hash, name, 'lecturer', $2, true, true
+                        FROM batch
+                        ON CONFLICT (tenant_id, email) DO NOTHING
+                        RETURNING id, email
+                    )
+                    INSERT INTO lecturer_profiles (user_id, staff_id, phone, office_location, specialization, max_students, current_students)
+                    SELECT nu.id, b.staff_id, b.phone, b.office_location, b.specialization, b.max_students, 0
+                    FROM new_users nu
+                    JOIN batch b ON b.email = nu.email
+                    RETURNING user_id, staff_id
+                """,
+                tenant_id,
+                faculty_id,
+                [lecturer.email for lecturer in lecturers],
+                [lecturer.name for lecturer in lecturers],
+                password_hashes,
+                [lecturer.staff_id for lecturer in lecturers],
+                [lecturer.phone or '+254700000000' for lecturer in lecturers],
+                [lecturer.office_location or f'{data["faculty_name"]} Office' for lecturer in lecturers],
+                [lecturer.specialization for lecturer in lecturers],
+                [lecturer.max_students or 20 for lecturer in lecturers]
+                )
+                
+                created_by_staff_id = {row['staff_id']: row['user_id'] for row in created}
+                
+                # Log activity
+                await conn.execute("""
+                    INSERT INTO activity_logs (tenant_id, user_id, user_type, action, target_type, target_id, details)
+                    SELECT $1, $2, 'user', 'Lecturer Created', 'lecturer', target_id, details
+                    FROM unnest($3::uuid[], $4::jsonb[]) AS l(target_id, details)
+                """, tenant_id, ctx.created_by,
+                    [created_by_staff_id[lecturer.staff_id] for lecturer in lecturers if lecturer.staff_id in created_by_staff_id],
+                    [json.dumps({
+                        "name": lecturer.name,
+                        "email": lecturer.email,
+                        "staff_id": lecturer.staff_id,
+                        "faculty_id": str(faculty_id),
+                        "bulk_job_id": str(ctx.id)
+                    }) for lecturer in lecturers if lecturer.staff_id in created_by_staff_id])
+                
+                created_lecturers = []
+                errors = []
+                for lecturer, password in zip(lecturers, generated):
+                    lecturer_id = created_by_staff_id.get(lecturer.staff_id)
+                    if lecturer_id:
+                        created_lecturers.append({"lecturer_id": str(lecturer_id), "email": lecturer.email, "staff_id": lecturer.staff_id})
+                        passwords[str(lecturer_id)] = password
+                    else:
+                        errors.append({"email": lecturer.email, "staff_id": lecturer.staff_id, "message": "Email already exists"})
+                
+                # Committed with the accounts so a retry never inserts the batch twice
+                await ctx.save_checkpoint(conn, lecturers=created_lecturers, errors=errors, emailed=[], emails_failed=0)
+    
+    created_lecturers = ctx.checkpoint['lecturers']
+    emailed = set(ctx.checkpoint['emailed'])
+    emails_failed = ctx.checkpoint['emails_failed']
+    
+    # Credentials are only emailed once the accounts are committed
+    if data['send_emails']:
+        pending = [lecturer for lecturer in created_lecturers if lecturer['lecturer_id'] not in emailed]
+        
+        # Passwords are never stored in the job, so a retried attempt issues fresh ones
+        missing = [lecturer for lecturer in pending if lecturer['lecturer_id'] not in passwords]
+        if missing:
+            regenerated = [generate_secure_password() for _ in missing]
+            regenerated_hashes = await hash_passwords(regenerated)
+            async with ctx.pool.acquire() as conn:
+                await conn.execute("""
+                    UPDATE users u
+                    SET password_hash = r.password_hash, is_password_temporary = true, updated_at = NOW()
+                    FROM unnest($1::uuid[], $2::text[]) AS r(id, password_hash)
+                    WHERE u.id = r.id
+                """, [lecturer['lecturer_id'] for lecturer in missing], regenerated_hashes)
+            passwords.update({lecturer['lecturer_id']: password for lecturer, password in zip(missing, regenerated)})
+        
+        total = len(created_lecturers)
+        for index, lecturer in enumerate(pending, start=1):
+            credentials = LecturerCredentials(
+                email=lecturer['email'],
+                temporary_password=passwords[lecturer['lecturer_id']],
+                faculty_name=data['faculty_name'],
+                university_name=data['university_name']
+            )
+            if not await send_lecturer_email(credentials.email, credentials):
+                emails_failed += 1
+            emailed.add(lecturer['lecturer_id'])
+            if index % 25 == 0 or index == len(pending):
+                await ctx.save_checkpoint(emailed=list(emailed), emails_failed=emails_failed)
+            await ctx.progress(total - len(pending) + index, total, "Sending welcome emails")
+    
+    errors = ctx.checkpoint['errors']
+    logger.info(f"Bulk lecturer job {ctx.id}: {len(created_lecturers)} created, {len(errors)} failed, {len(emailed) - emails_failed} emails sent")
+    return {
+        "total": len(lecturers),
+        "created": len(created_lecturers),
+        "failed": len(errors),
+        "emails_sent": len(emailed) - emails_failed,
+        "emails_failed": emails_failed,
+        "errors": errors,
+        "lecturers": created_lecturers
+    }
+
+JOB_HANDLERS = {
+    "lecturers.bulk_create": onboard_lecturers_job,
+}
+
+@app.post("/lecturers/bulk", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+async def create_lecturers_bulk(
+    bulk_data: BulkCreateLecturersRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Validate a batch of lecturers and create them in the background"""
+    tenant_id = current_user['tenant_id']
+    faculty_id = current_user['faculty_id']
+    
+    if len(bulk_data.lecturers) > BULK_LECTURER_MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {BULK_LECTURER_MAX_BATCH} lecturers")
+    
+    emails = [lecturer.email for lecturer in bulk_data.lecturers]
+    staff_ids = [lecturer.staff_id for lecturer in bulk_data.lecturers]
+    
+    async with db_pool.acquire() as conn:
+        existing_emails = {row['email'] for row in await conn.fetch(
+            "SELECT email FROM users WHERE email = ANY($1::text[])",
+            emails
+        )}
+        existing_staff_ids = {row['staff_id'] for row in await conn.fetch("""
+            SELECT lp.staff_id FROM users u
+            JOIN lecturer_profiles lp ON u.id = lp.user_id
+            WHERE u.tenant_id = $1 AND u.faculty_id = $2 AND lp.staff_id = ANY($3::text[])
+        """, tenant_id, faculty_id, staff_ids)}
+    
+    accepted = []
+    rejected = []
+    seen_emails = set()
+    seen_staff_ids = set()
+    for index, lecturer in enumerate(bulk_data.lecturers):
+        if lecturer.email in existing_emails:
+            message = "Email already exists"
+        elif lecturer.staff_id in existing_staff_ids:
+            message = "Staff ID already exists in this faculty"
+        elif lecturer.email.lower() in seen_emails:
+            message = "Duplicate email in batch"
+        elif lecturer.staff_id in seen_staff_ids:
+            message = "Duplicate staff ID in batch"
+        else:
+            accepted.append(lecturer)
+            message = None
+        seen_emails.add(lecturer.email.lower())
+        seen_staff_ids.add(lecturer.staff_id)
+        if message:
+            rejected.append({"index": index, "email": lecturer.email, "staff_id": lecturer.staff_id, "message": message})
+    
+    if not accepted:
+        raise HTTPException(status_code=400, detail={"message": "No valid lecturers in batch", "rejected": rejected})
+    
+    payload = {
+        "tenant_id": str(tenant_id),
+        "faculty_id": str(faculty_id),
+        "faculty_name": current_user['faculty_name'],
+        "university_name": current_user['university_name'],
+        "send_emails": bulk_data.send_emails,
+        "lecturers": [lecturer.model_dump() for lecturer in accepted]
+    }
+    
+    async with db_pool.acquire() as conn:
+        try:
+            job = await enqueue_job(
+                conn, "lecturers.bulk_create", payload,
+                idempotency_key=idempotency_key, tenant_id=tenant_id, created_by=current_user['id']
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    
+    if job_worker:
+        job_worker.notify()
+    
+    return {
+        "message": "Lecturer batch accepted",
+        "job_id": job['job_id'],
+        "status": job['status'],
+        "created": job['created'],
+        "status_url": f"/lecturers/bulk/{job['job_id']}",
+        "accepted": len(accepted),
+        "rejected": rejected
+    }
+
+@app.get("/lecturers/bulk/{job_id}", response_model=dict)
+async def get_lecturer_bulk_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Get progress of a bulk lecturer creation job"""
+    try:
+        uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async with db_pool.acquire() as conn:
+        row = await conn.fetchrow("""
+            SELECT id FROM background_jobs
+            WHERE id = $1 AND job_type = 'lecturers.bulk_create' AND payload->>'faculty_id' = $2
+        """, job_id, str(current_user['faculty_id']))
+        job = await get_job(conn, row['id']) if row else None
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.get("/lecturers", response_model=List[LecturerResponse])
 async def get_faculty_lecturers(current_user: dict = Depends(get_current_user)):
     """Get all lecturers for the current faculty with workload information"""
@@ -599,56 +937,119 @@ async def get_faculty_lecturers(current_user: dict = Depends(get_current_user)):
         
         return result
 
+# Assessment Queue
+
+ASSESSMENT_STATUSES = {"pending", "assigned", "in_progress", "completed", "cancelled"}
+# Statuses covered by the partial queue index
+OPEN_ASSESSMENT_STATUSES = ("pending", "assigned")
+
+def encode_queue_cursor(row) -> str:
+    """Opaque cursor naming the last request of a queue page"""
+    raw = json.dumps([row['priority_rank'], row['requested_at'].isoformat(), str(row['id'])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_queue_cursor(cursor: str):
+    """(priority rank, requested_at, id) of the previous page's last request"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        rank, requested_at, request_id = json.loads(raw)
+        return int(rank), datetime.fromisoformat(requested_at), str(uuid.UUID(request_id))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
 @app.get("/assessment-requests", response_model=List[AssessmentRequestResponse])
-async def get_assessment_requests(current_user: dict = Depends(get_current_user)):
-    """Get all assessment requests for the faculty"""
-    tenant_id = current_user['tenant_id']
-    faculty_id = current_user['faculty_id']
+async def get_assessment_requests(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status", description="Comma-separated statuses, or 'all'; defaults to pending,assigned"),
+    priority: Optional[str] = Query(None, description="Comma-separated priorities"),
+    lecturer_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of the faculty's assessment queue, most urgent and then oldest first"""
+    filters = QueryFilters()
+    filters.add("ar.tenant_id = {}", current_user['tenant_id'])
+    filters.add("ar.faculty_id = {}", current_user['faculty_id'])
+    
+    statuses = [value.strip() for value in (status_filter or ",".join(OPEN_ASSESSMENT_STATUSES)).split(",") if value.strip()]
+    if statuses != ["all"]:
+        unknown = set(statuses) - ASSESSMENT_STATUSES
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown status '{sorted(unknown)[0]}'")
+        if set(statuses) == set(OPEN_ASSESSMENT_STATUSES):
+            # Written out so the planner matches the partial queue index
+            filters.add("ar.status IN ('pending', 'assigned')")
+        else:
+            filters.add("ar.status = ANY({}::text[])", statuses)
+    if priority:
+        filters.add("ar.priority = ANY({}::text[])", [value.strip() for value in priority.split(",") if value.strip()])
+    if lecturer_id:
+        try:
+            filters.add("ar.assigned_lecturer_id = {}::uuid", str(uuid.UUID(lecturer_id)))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid lecturer id")
     
+    limit = clamp_limit(limit)
     async with db_pool.acquire() as conn:
-        requests = await conn.fetch("""
+        total, is_estimate = await assessment_counts.count(conn, "FROM assessment_requests ar", filters)
+        
+        if cursor:
+            filters.add(
+                "(ar.priority_rank, ar.requested_at, ar.id) > ({}::int, {}::timestamptz, {}::uuid)",
+                *decode_queue_cursor(cursor)
+            )
+        
+        # The page is picked from the queue index alone; only its rows are joined
+        requests = await conn.fetch(f"""
             SELECT 
-                ar.id,
-                ar.assessment_type,
-                ar.description,
-                ar.priority,
-                ar.due_date,
-                ar.status,
-                ar.requested_at,
+                page.id,
+                page.assessment_type,
+                page.description,
+                page.priority,
+                page.priority_rank,
+                page.due_date,
+                page.status,
+                page.requested_at,
                 u.name as student_name,
                 u.email as student_email,
                 c.name as course_name
-            FROM assessment_requests ar
-            JOIN users u ON ar.student_id = u.id
+            FROM (
+                SELECT ar.id, ar.student_id, ar.assessment_type, ar.description, ar.priority,
+                       ar.priority_rank, ar.due_date, ar.status, ar.requested_at
+                FROM assessment_requests ar
+                {filters.where}
+                ORDER BY ar.priority_rank, ar.requested_at, ar.id
+                LIMIT {limit + 1}
+            ) page
+            JOIN users u ON page.student_id = u.id
             LEFT JOIN student_profiles sp ON u.id = sp.user_id
             LEFT JOIN courses c ON sp.course_id = c.id
-            WHERE ar.tenant_id = $1 AND ar.faculty_id = $2
-            ORDER BY 
-                CASE ar.priority 
-                    WHEN 'urgent' THEN 1
-                    WHEN 'high' THEN 2
-                    WHEN 'normal' THEN 3
-                    WHEN 'low' THEN 4
-                END,
-                ar.requested_at DESC
-        """, tenant_id, faculty_id)
-        
-        result = []
-        for request in requests:
-            result.append(AssessmentRequestResponse(
-                id=str(request['id']),
-                student_name=request['student_name'],
-                student_email=request['student_email'],
-                course_name=request['course_name'] or "Not specified",
-                assessment_type=request['assessment_type'],
-                description=request['description'],
-                priority=request['priority'],
-                due_date=request['due_date'].isoformat() if request['due_date'] else None,
-                status=request['status'],
-                requested_at=request['requested_at'].isoformat()
-            ))
-        
-        return result
+            ORDER BY page.priority_rank, page.requested_at, page.id
+        """, *filters.args)
+    
+    next_cursor = None
+    if len(requests) > limit:
+        requests = requests[:limit]
+        next_cursor = encode_queue_cursor(requests[-1])
+    set_page_headers(response, total, is_estimate, next_cursor)
+    
+    result = []
+    for request in requests:
+        result.append(AssessmentRequestResponse(
+            id=str(request['id']),
+            student_name=request['student_name'],
+            student_email=request['student_email'],
+            course_name=request['course_name'] or "Not specified",
+            assessment_type=request['assessment_type'],
+            description=request['description'],
+            priority=request['priority'],
+            due_date=request['due_date'].isoformat() if request['due_date'] else None,
+            status=request['status'],
+            requested_at=request['requested_at'].isoformat()
+        ))
+    
+    return result
 
 @app.post("/assessment-requests/{request_id}/assign", response_model=dict)
 async def assign_lecturer_to_assessment(
@@ -662,12 +1063,14 @@ async def assign_lecturer_to_assessment(
     
     async with db_pool.acquire() as conn:
         async with conn.transaction():
-            # Verify assessment request exists and belongs to faculty
+            # Verify assessment request exists and belongs to faculty; the lock stops
+            # a concurrent assignment of the same request
             request_info = await conn.fetchrow("""
                 SELECT ar.*, u.name as student_name
                 FROM assessment_requests ar
                 JOIN users u ON ar.student_id = u.id
                 WHERE ar.id = $1 AND ar.tenant_id = $2 AND ar.faculty_id = $3
+                FOR UPDATE OF ar
             """, request_id, tenant_id, faculty_id)
             
             if not request_info:
@@ -678,7 +1081,7 @@ async def assign_lecturer_to_assessment(
             
             # Verify lecturer exists and belongs to faculty
             lecturer_info = await conn.fetchrow("""
-                SELECT u.*, lp.max_students, lp.current_students
+                SELECT u.id, u.name
                 FROM users u
                 JOIN lecturer_profiles lp ON u.id = lp.user_id
                 WHERE u.id = $1 AND u.tenant_id = $2 AND u.faculty_id = $3 AND u.role = 'lecturer' AND u.is_active = true
@@ -687,11 +1090,8 @@ async def assign_lecturer_to_assessment(
             if not lecturer_info:
                 raise HTTPException(status_code=404, detail="Lecturer not found")
             
-            # Check lecturer workload
-            max_students = lecturer_info['max_students'] or 20
-            current_students = lecturer_info['current_students'] or 0
-            
-            if current_students >= max_students:
+            # Check and take lecturer capacity atomically
+            if not await reserve_lecturer_capacity(conn, lecturer_info['id'], request_info['student_id']):
                 raise HTTPException(status_code=400, detail="Lecturer has reached maximum student capacity")
             
             # Update assessment request
@@ -709,17 +1109,6 @@ async def assign_lecturer_to_assessment(
                 DO UPDATE SET status = 'active', assigned_by = $5
             """, tenant_id, request_info['student_id'], assignment_data.lecturer_id, faculty_id, current_user['id'])
             
-            # Update lecturer current students count
-            await conn.execute("""
-                UPDATE lecturer_profiles 
-                SET current_students = (
-                    SELECT COUNT(DISTINCT student_id) 
-                    FROM student_lecturer_assignments 
-                    WHERE lecturer_id = $1 AND status = 'active'
-                )
-                WHERE user_id = $1
-            """, assignment_data.lecturer_id)
-            
             # Create notification for lecturer
             await conn.execute("""
                 INSERT INTO notifications (tenant_id, user_id, type, title, message, data)
@@ -744,12 +1133,582 @@ async def assign_lecturer_to_assessment(
                 "notes": assignment_data.notes
             }))
             
+            assessment_counts.invalidate()
             return {
                 "message": "Lecturer assigned successfully",
                 "lecturer_name": lecturer_info['name'],
                 "student_name": request_info['student_name']
             }
 
+@app.post("/assessment-requests/bulk", response_model=dict)
+async def bulk_assessment_request_action(
+    action_data: BulkAssessmentActionRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Assign, reassign, cancel or reprioritise many assessment requests in one transaction"""
+    tenant_id = current_user['tenant_id']
+    faculty_id = current_user['faculty_id']
+    action = action_data.action
+    allowed_statuses, log_action = BULK_ASSESSMENT_ACTIONS[action]
+    started = time.perf_counter()
+    
+    if len(action_data.request_ids) > BULK_ASSESSMENT_MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {BULK_ASSESSMENT_MAX_BATCH} requests")
+    if action in ("assign", "reassign") and not action_data.lecturer_id:
+        raise HTTPException(status_code=400, detail="lecturer_id is required to assign or reassign")
+    if action == "priority" and not action_data.priority:
+        raise HTTPException(status_code=400, detail="priority is required to change priority")
+    
+    # Outcome per request id, reported in the order the ids were given
+    outcomes = {}
+    request_ids = []
+    for request_id in action_data.request_ids:
+        try:
+            request_ids.append(str(uuid.UUID(request_id)))
+        except ValueError:
+            outcomes[request_id] = ("invalid_id", "Not a valid request id")
+    request_ids = list(dict.fromkeys(request_ids))
+    
+    async with db_pool.acquire() as conn:
+        async with conn.transaction():
+            lecturer = None
+            if action in ("assign", "reassign"):
+                lecturer = await conn.fetchrow("""
+                    SELECT u.id, u.name
+                    FROM users u
+                    JOIN lecturer_profiles lp ON u.id = lp.user_id
+                    WHERE u.id = $1 AND u.tenant_id = $2 AND u.faculty_id = $3 AND u.role = 'lecturer' AND u.is_active = true
+                """, action_data.lecturer_id, tenant_id, faculty_id)
+                if not lecturer:
+                    raise HTTPException(status_code=404, detail="Lecturer not found")
+            
+            rows = await conn.fetch("""
+                SELECT ar.id, ar.student_id, ar.status, ar.priority, ar.assigned_lecturer_id,
+                       ar.assessment_type, ar.requested_at, u.name as student_name
+                FROM assessment_requests ar
+                JOIN users u ON ar.student_id = u.id
+                WHERE ar.id = ANY($1::uuid[]) AND ar.tenant_id = $2 AND ar.faculty_id = $3
+                ORDER BY ar.id
+                FOR UPDATE OF ar
+            """, request_ids, tenant_id, faculty_id)
+            found = {str(row['id']): row for row in rows}
+            
+            eligible = []
+            for request_id in request_ids:
+                row = found.get(request_id)
+                if not row:
+                    outcomes[request_id] = ("not_found", "Assessment request not found")
+                elif row['status'] not in allowed_statuses:
+                    outcomes[request_id] = ("invalid_status", f"Assessment request is {row['status']}")
+                elif action == "reassign" and str(row['assigned_lecturer_id']) == str(lecturer['id']):
+                    outcomes[request_id] = ("unchanged", "Already assigned to this lecturer")
+                elif action == "priority" and row['priority'] == action_data.priority:
+                    outcomes[request_id] = ("unchanged", f"Priority is already {row['priority']}")
+                else:
+                    eligible.append(row)
+            
+            # Requests leaving a lecturer, whose assignments and workload are released below
+            previous = [row for row in eligible if row['assigned_lecturer_id']] if action in ("reassign", "cancel") else []
+            
+            # Every lecturer whose workload changes, locked in one order so concurrent batches cannot deadlock
+            workload_lecturers = {row['assigned_lecturer_id'] for row in previous}
+            if lecturer:
+                workload_lecturers.add(lecturer['id'])
+            profiles = {}
+            if eligible and workload_lecturers:
+                profiles = {row['user_id']: row for row in await conn.fetch("""
+                    SELECT user_id, current_students, max_students
+                    FROM lecturer_profiles
+                    WHERE user_id = ANY($1::uuid[])
+                    ORDER BY user_id
+                    FOR UPDATE
+                """, list(workload_lecturers))}
+            
+            added_students = 0
+            if lecturer and eligible:
+                # Take capacity for new students, most urgent requests first
+                profile = profiles[lecturer['id']]
+                assigned_students = {str(student_id) for student_id in await conn.fetchval("""
+                    SELECT COALESCE(array_agg(DISTINCT student_id), '{}')
+                    FROM student_lecturer_assignments
+                    WHERE lecturer_id = $1 AND status = 'active' AND student_id = ANY($2::uuid[])
+                """, lecturer['id'], [row['student_id'] for row in eligible])}
+                room = profile['max_students'] - profile['current_students']
+                
+                accepted = []
+                for row in sorted(eligible, key=lambda row: (PRIORITY_RANK.get(row['priority'], PRIORITY_RANK["normal"]), row['requested_at'])):
+                    student_id = str(row['student_id'])
+                    if student_id not in assigned_students:
+                        if room <= 0:
+                            outcomes[str(row['id'])] = ("capacity", "Lecturer has reached maximum student capacity")
+                            continue
+                        assigned_students.add(student_id)
+                        room -= 1
+                        added_students += 1
+                    accepted.append(row)
+                accepted_ids = {row['id'] for row in accepted}
+                eligible = accepted
+                previous = [row for row in previous if row['id'] in accepted_ids]
+            
+            eligible_ids = [row['id'] for row in eligible]
+            
+            if eligible and lecturer:
+                await conn.execute("""
+                    UPDATE assessment_requests
+                    SET assigned_lecturer_id = $1, assigned_at = NOW(), status = 'assigned'
+                    WHERE id = ANY($2::uuid[])
+                """, lecturer['id'], eligible_ids)
+                
+                await conn.execute("""
+                    INSERT INTO student_lecturer_assignments (tenant_id, student_id, lecturer_id, faculty_id, assignment_type, assigned_by, status)
+                    SELECT DISTINCT $1::uuid, x.student_id, $2::uuid, $3::uuid, 'assessment', $4::uuid, 'active'
+                    FROM unnest($5::uuid[]) AS x(student_id)
+                    ON CONFLICT (tenant_id, student_id, lecturer_id, assignment_type)
+                    DO UPDATE SET status = 'active', assigned_by = EXCLUDED.assigned_by
+                """, tenant_id, lecturer['id'], faculty_id, current_user['id'], [row['student_id'] for row in eligible])
+                
+                if added_students:
+                    await conn.execute("""
+                        UPDATE lecturer_profiles
+                        SET current_students = current_students + $2
+                        WHERE user_id = $1
+                    """, lecturer['id'], added_students)
+            elif eligible and action == "cancel":
+                await conn.execute("""
+                    UPDATE assessment_requests SET status = 'cancelled' WHERE id = ANY($1::uuid[])
+                """, eligible_ids)
+            elif eligible and action == "priority":
+                await conn.execute("""
+                    UPDATE assessment_requests SET priority = $1 WHERE id = ANY($2::uuid[])
+                """, action_data.priority, eligible_ids)
+            
+            if previous:
+                # End assessment assignments the previous lecturers no longer have a request behind
+                ended = await conn.fetch("""
+                    UPDATE student_lecturer_assignments sla
+                    SET status = 'cancelled'
+                    FROM unnest($1::uuid[], $2::uuid[]) AS p(lecturer_id, student_id)
+                    WHERE sla.lecturer_id = p.lecturer_id AND sla.student_id = p.student_id
+                      AND sla.tenant_id = $3 AND sla.assignment_type = 'assessment' AND sla.status = 'active'
+                      AND NOT EXISTS (
+                          SELECT 1 FROM assessment_requests ar
+                          WHERE ar.assigned_lecturer_id = sla.lecturer_id AND ar.student_id = sla.student_id
+                            AND ar.status IN ('assigned', 'in_progress')
+                      )
+                    RETURNING sla.lecturer_id, sla.student_id
+                """, [row['assigned_lecturer_id'] for row in previous], [row['student_id'] for row in previous], tenant_id)
+                if ended:
+                    await release_lecturer_capacity(conn, [row['lecturer_id'] for row in ended], [row['student_id'] for row in ended])
+            
+            # Notifications, one statement for the whole batch
+            recipients, titles, messages, data = [], [], [], []
+            def notify(user_id, title, message, row):
+                recipients.append(user_id)
+                titles.append(title)
+                messages.append(message)
+                data.append(json.dumps({
+                    "assessment_request_id": str(row['id']),
+                    "student_id": str(row['student_id']),
+                    "assessment_type": row['assessment_type']
+                }))
+            
+            for row in eligible:
+                if lecturer:
+                    notify(lecturer['id'], "New Student Assignment",
+                           f"You have been assigned to assess {row['student_name']} for {row['assessment_type']}", row)
+                if action == "reassign":
+                    notify(row['assigned_lecturer_id'], "Assessment Reassigned",
+                           f"Your assessment of {row['student_name']} for {row['assessment_type']} has been reassigned", row)
+                elif action == "cancel":
+                    notify(row['student_id'], "Assessment Request Cancelled",
+                           f"Your {row['assessment_type']} assessment request has been cancelled", row)
+                    if row['assigned_lecturer_id']:
+                        notify(row['assigned_lecturer_id'], "Assessment Cancelled",
+                               f"The {row['assessment_type']} assessment of {row['student_name']} has been cancelled", row)
+            
+            if recipients:
+                await conn.execute("""
+                    INSERT INTO notifications (tenant_id, user_id, type, title, message, data)
+                    SELECT $1, x.user_id, 'assignment', x.title, x.message, x.data::jsonb
+                    FROM unnest($2::uuid[], $3::text[], $4::text[], $5::text[]) AS x(user_id, title, message, data)
+                """, tenant_id, recipients, titles, messages, data)
+            
+            # Log activity, one entry per request
+            if eligible:
+                await conn.execute("""
+                    INSERT INTO activity_logs (tenant_id, user_id, user_type, action, target_type, target_id, details)
+                    SELECT $1, $2, 'user', $3, 'assessment_request', x.request_id, x.details::jsonb
+                    FROM unnest($4::uuid[], $5::text[]) AS x(request_id, details)
+                """, tenant_id, current_user['id'], log_action, eligible_ids, [
+                    json.dumps({
+                        "student_name": row['student_name'],
+                        "assessment_type": row['assessment_type'],
+                        "previous_status": row['status'],
+                        "previous_lecturer_id": str(row['assigned_lecturer_id']) if row['assigned_lecturer_id'] else None,
+                        "previous_priority": row['priority'],
+                        "lecturer_id": str(lecturer['id']) if lecturer else None,
+                        "lecturer_name": lecturer['name'] if lecturer else None,
+                        "priority": action_data.priority,
+                        "notes": action_data.notes
+                    })
+                    for row in eligible
+                ])
+    
+    for row in eligible:
+        outcomes[str(row['id'])] = ("ok", None)
+    
+    results = []
+    for request_id in action_data.request_ids:
+        try:
+            key = str(uuid.UUID(request_id))
+        except ValueError:
+            key = request_id
+        outcome, detail = outcomes[key]
+        results.append({"request_id": request_id, "outcome": outcome, "detail": detail})
+    
+    if eligible:
+        assessment_counts.invalidate()
+    return {
+        "message": f"Bulk {action} completed",
+        "action": action,
+        "succeeded": len(eligible),
+        "failed": len(results) - sum(1 for result in results if result['outcome'] == "ok"),
+        "results": results,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+@app.post("/assessment-requests/auto-assign", response_model=dict)
+async def auto_assign_assessment_requests(
+    assign_data: AutoAssignRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Assign the faculty's pending assessment requests to lecturers in one transaction"""
+    tenant_id = current_user['tenant_id']
+    faculty_id = current_user['faculty_id']
+    started = time.perf_counter()
+    
+    request_ids = None
+    if assign_data.request_ids:
+        try:
+            request_ids = [str(uuid.UUID(request_id)) for request_id in assign_data.request_ids]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid assessment request id")
+    
+    async with db_pool.acquire() as conn:
+        async with conn.transaction():
+            # Lock the faculty's lecturers so concurrent runs cannot overfill them
+            lecturer_rows = await conn.fetch("""
+                SELECT u.id, u.name, COALESCE(lp.max_students, 20) as max_students, lp.specialization
+                FROM users u
+                JOIN lecturer_profiles lp ON u.id = lp.user_id
+                WHERE u.tenant_id = $1 AND u.faculty_id = $2 AND u.role = 'lecturer' AND u.is_active = true
+                ORDER BY u.id
+                FOR UPDATE OF lp
+            """, tenant_id, faculty_id)
+            
+            # Requests another run is already assigning are skipped, not waited on
+            request_rows = await conn.fetch("""
+                SELECT ar.id, ar.student_id, ar.assessment_type, ar.priority, ar.due_date, ar.requested_at,
+                       u.name as student_name, c.name as course_name, sp.program
+                FROM assessment_requests ar
+                JOIN users u ON ar.student_id = u.id
+                LEFT JOIN student_profiles sp ON u.id = sp.user_id
+                LEFT JOIN courses c ON sp.course_id = c.id
+                WHERE ar.tenant_id = $1 AND ar.faculty_id = $2 AND ar.status = 'pending'
+                  AND ($3::uuid[] IS NULL OR ar.id = ANY($3::uuid[]))
+                ORDER BY ar.priority_rank, ar.requested_at
+                LIMIT $4
+                FOR UPDATE OF ar SKIP LOCKED
+            """, tenant_id, faculty_id, request_ids, assign_data.max_requests)
+            
+            # Each lecturer's active students, so a second request for one of them takes no capacity;
+            # the lecturers stay locked, so the increments below cannot race a single assignment
+            students = {}
+            if lecturer_rows:
+                rows = await conn.fetch("""
+                    SELECT lecturer_id, array_agg(DISTINCT student_id) as student_ids
+                    FROM student_lecturer_assignments
+                    WHERE lecturer_id = ANY($1::uuid[]) AND status = 'active'
+                    GROUP BY lecturer_id
+                """, [row['id'] for row in lecturer_rows])
+                students = {str(row['lecturer_id']): [str(student_id) for student_id in row['student_ids']] for row in rows}
+            
+            lecturers = [
+                Lecturer(str(row['id']), row['name'], row['max_students'], students.get(str(row['id']), []), row['specialization'])
+                for row in lecturer_rows
+            ]
+            plan = plan_assignments([pending_request(row) for row in request_rows], lecturers)
+            
+            if plan.assignments and not assign_data.dry_run:
+                request_column = [assignment.request_id for assignment in plan.assignments]
+                student_column = [assignment.student_id for assignment in plan.assignments]
+                lecturer_column = [assignment.lecturer_id for assignment in plan.assignments]
+                
+                await conn.execute("""
+                    UPDATE assessment_requests ar
+                    SET assigned_lecturer_id = x.lecturer_id, assigned_at = NOW(), status = 'assigned'
+                    FROM unnest($1::uuid[], $2::uuid[]) AS x(request_id, lecturer_id)
+                    WHERE ar.id = x.request_id
+                """, request_column, lecturer_column)
+                
+                # DISTINCT: one student may have several requests for the same lecturer
+                await conn.execute("""
+                    INSERT INTO student_lecturer_assignments (tenant_id, student_id, lecturer_id, faculty_id, assignment_type, assigned_by, status)
+                    SELECT DISTINCT $3::uuid, x.student_id, x.lecturer_id, $4::uuid, 'assessment', $5::uuid, 'active'
+                    FROM unnest($1::uuid[], $2::uuid[]) AS x(student_id, lecturer_id)
+                    ON CONFLICT (tenant_id, student_id, lecturer_id, assignment_type)
+                    DO UPDATE SET status = 'active', assigned_by = EXCLUDED.assigned_by
+                """, student_column, lecturer_column, tenant_id, faculty_id, current_user['id'])
+                
+                if plan.added_students:
+                    await conn.execute("""
+                        UPDATE lecturer_profiles lp
+                        SET current_students = COALESCE(lp.current_students, 0) + x.added
+                        FROM unnest($1::uuid[], $2::int[]) AS x(lecturer_id, added)
+                        WHERE lp.user_id = x.lecturer_id
+                    """, list(plan.added_students), list(plan.added_students.values()))
+                
+                requests_by_id = {str(row['id']): row for row in request_rows}
+                await conn.execute("""
+                    INSERT INTO notifications (tenant_id, user_id, type, title, message, data)
+                    SELECT $1, x.lecturer_id, 'assignment', 'New Student Assignment', x.message, x.data::jsonb
+                    FROM unnest($2::uuid[], $3::text[], $4::text[]) AS x(lecturer_id, message, data)
+                """, tenant_id, lecturer_column, [
+                    f"You have been assigned to assess {assignment.student_name} for {requests_by_id[assignment.request_id]['assessment_type']}"
+                    for assignment in plan.assignments
+                ], [
+                    json.dumps({
+                        "assessment_request_id": assignment.request_id,
+                        "student_id": assignment.student_id,
+                        "assessment_type": requests_by_id[assignment.request_id]['assessment_type']
+                    })
+                    for assignment in plan.assignments
+                ])
+                
+                # Log activity
+                await conn.execute("""
+                    INSERT INTO activity_logs (tenant_id, user_id, user_type, action, target_type, target_id, details)
+                    VALUES ($1, $2, 'user', 'Lecturers Auto-Assigned', 'faculty', $3, $4)
+                """, tenant_id, current_user['id'], faculty_id, json.dumps({
+                    "assigned": len(plan.assignments),
+                    "unassigned": len(plan.unassigned),
+                    "lecturers": len(plan.added_students)
+                }))
+    
+    if plan.assignments and not assign_data.dry_run:
+        assessment_counts.invalidate()
+    return {
+        "message": "Auto-assignment preview" if assign_data.dry_run else "Auto-assignment completed",
+        "dry_run": assign_data.dry_run,
+        "assigned": len(plan.assignments),
+        "unassigned": len(plan.unassigned),
+        "assignments": [assignment._asdict() for assignment in plan.assignments],
+        "unassigned_requests": [item._asdict() for item in plan.unassigned],
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+@app.put("/placement-locations", response_model=dict)
+async def upsert_placement_locations(
+    locations_data: PlacementLocationsRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Record coordinates for placement location names used in student logbooks"""
+    locations = {item.location.strip().lower(): item for item in locations_data.locations}
+    
+    async with db_pool.acquire() as conn:
+        await conn.execute("""
+            INSERT INTO placement_locations (tenant_id, location_key, location, latitude, longitude, updated_by)
+            SELECT $1, x.location_key, x.location, x.latitude, x.longitude, $6
+            FROM unnest($2::text[], $3::text[], $4::float8[], $5::float8[]) AS x(location_key, location, latitude, longitude)
+            ON CONFLICT (tenant_id, location_key)
+            DO UPDATE SET location = EXCLUDED.location, latitude = EXCLUDED.latitude,
+                          longitude = EXCLUDED.longitude, updated_by = EXCLUDED.updated_by, updated_at = NOW()
+        """, current_user['tenant_id'],
+        list(locations),
+        [item.location.strip() for item in locations.values()],
+        [item.latitude for item in locations.values()],
+        [item.longitude for item in locations.values()],
+        current_user['id'])
+    
+    return {"message": "Placement locations saved", "saved": len(locations)}
+
+def build_visit_routes(plan_data: VisitPlanRequest, located: list, lecturers: dict) -> list:
+    """Group located visits (per assigned lecturer, or by k-means for pending ones) and route each group"""
+    latitudes = [row['latitude'] for row in located]
+    longitudes = [row['longitude'] for row in located]
+    # The start is projected about the stops' reference latitude so both share one plane
+    reference = reference_latitude(latitudes)
+    points = project(latitudes, longitudes, reference)
+    start = start_point(plan_data.start_latitude, plan_data.start_longitude, reference)
+    
+    if plan_data.status == "assigned":
+        groups = {}
+        for index, row in enumerate(located):
+            groups.setdefault(str(row['assigned_lecturer_id']), []).append(index)
+        group_lecturers = {lecturer_id: lecturer_id for lecturer_id in groups}
+    else:
+        k = plan_data.clusters or max(len(lecturers), 1)
+        labels = kmeans(points, k) if located else []
+        groups = {}
+        for index, label in enumerate(labels):
+            groups.setdefault(int(label), []).append(index)
+        
+        # Suggest a lecturer per cluster, largest clusters to the lecturers with most spare capacity
+        spare = {lecturer_id: row['max_students'] - row['current_students'] for lecturer_id, row in lecturers.items()}
+        group_lecturers = {}
+        for label in sorted(groups, key=lambda label: -len(groups[label])):
+            if not spare:
+                break
+            lecturer_id = max(spare, key=spare.get)
+            if spare[lecturer_id] <= 0:
+                break
+            group_lecturers[label] = lecturer_id
+            spare[lecturer_id] -= len(groups[label])
+    
+    routes = []
+    for key, indices in groups.items():
+        route = plan_route(points[indices], start)
+        lecturer = lecturers.get(group_lecturers.get(key))
+        routes.append({
+            "lecturer_id": str(lecturer['id']) if lecturer else None,
+            "lecturer_name": lecturer['name'] if lecturer else None,
+            "distance_km": route.distance_km,
+            "stops": [
+                {
+                    "request_id": str(stop['id']),
+                    "student_name": stop['student_name'],
+                    "assessment_type": stop['assessment_type'],
+                    "priority": stop['priority'],
+                    "due_date": stop['due_date'].isoformat() if stop['due_date'] else None,
+                    "location": stop['location'],
+                    "latitude": stop['latitude'],
+                    "longitude": stop['longitude']
+                }
+                for stop in (located[indices[position]] for position in route.order)
+            ]
+        })
+    return routes
+
+@app.post("/visit-plans", response_model=dict)
+async def plan_assessment_visits(
+    plan_data: VisitPlanRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Group the faculty's assessment visits by placement location and order each group into a route"""
+    tenant_id = current_user['tenant_id']
+    faculty_id = current_user['faculty_id']
+    started = time.perf_counter()
+    
+    async with db_pool.acquire() as conn:
+        # Each student's placement: coordinates from their latest located logbook entry,
+        # or the faculty's coordinates for the location name they wrote
+        rows = await conn.fetch("""
+            SELECT ar.id, ar.assessment_type, ar.priority, ar.due_date, ar.assigned_lecturer_id,
+                   u.name as student_name, le.location,
+                   COALESCE(le.latitude, pl.latitude) as latitude,
+                   COALESCE(le.longitude, pl.longitude) as longitude
+            FROM assessment_requests ar
+            JOIN users u ON ar.student_id = u.id
+            LEFT JOIN LATERAL (
+                SELECT location, latitude, longitude
+                FROM logbook_entries
+                WHERE student_id = ar.student_id
+                  AND (NULLIF(trim(location), '') IS NOT NULL OR (latitude IS NOT NULL AND longitude IS NOT NULL))
+                ORDER BY entry_date DESC
+                LIMIT 1
+            ) le ON true
+            LEFT JOIN placement_locations pl
+                ON pl.tenant_id = ar.tenant_id AND pl.location_key = lower(trim(le.location))
+            WHERE ar.tenant_id = $1 AND ar.faculty_id = $2 AND ar.status = $3
+        """, tenant_id, faculty_id, plan_data.status)
+        
+        lecturer_rows = await conn.fetch("""
+            SELECT u.id, u.name, COALESCE(lp.max_students, 20) as max_students,
+                   COALESCE(lp.current_students, 0) as current_students
+            FROM users u
+            JOIN lecturer_profiles lp ON u.id = lp.user_id
+            WHERE u.tenant_id = $1 AND u.faculty_id = $2 AND u.role = 'lecturer' AND u.is_active = true
+        """, tenant_id, faculty_id)
+    
+    located = [row for row in rows if row['latitude'] is not None and row['longitude'] is not None]
+    unlocated = [
+        {"request_id": str(row['id']), "student_name": row['student_name'], "location": row['location']}
+        for row in rows if row['latitude'] is None or row['longitude'] is None
+    ]
+    lecturers = {str(row['id']): row for row in lecturer_rows}
+    
+    # Clustering and 2-opt are CPU-bound NumPy work, kept off the event loop
+    routes = await asyncio.to_thread(build_visit_routes, plan_data, located, lecturers)
+    routes.sort(key=lambda route: -len(route['stops']))
+    
+    return {
+        "status": plan_data.status,
+        "routes": routes,
+        "total_distance_km": round(sum(route['distance_km'] for route in routes), 2),
+        "located": len(located),
+        "unlocated_requests": unlocated,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+@app.get("/logbook/search", response_model=dict)
+async def search_faculty_logbooks(
+    q: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    sort: Optional[str] = Query(None, description="'-relevance' (default), 'relevance', '-entry_date' or 'entry_date'"),
+    student_id: Optional[str] = None,
+    fuzzy: bool = True,
+    current_user: dict = Depends(get_current_user)
+):
+    """Search the logbook entries of the faculty's students"""
+    if student_id:
+        try:
+            student_id = str(uuid.UUID(student_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid student id")
+    
+    async with db_pool.acquire() as conn:
+        try:
+            results, next_cursor = await search_logbook_entries(
+                conn,
+                SearchScope(current_user['tenant_id'], faculty_id=current_user['faculty_id']),
+                q, limit=limit, cursor=cursor, sort=sort, student_id=student_id, fuzzy=fuzzy
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"results": results, "next_cursor": next_cursor}
+
+@app.post("/students/import", response_model=dict)
+async def import_students(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """Bulk import or update faculty students from a CSV or XLSX roster"""
+    tenant_id = current_user['tenant_id']
+    
+    async with db_pool.acquire() as conn:
+        try:
+            result = await import_roster(conn, file.file, file.filename, tenant_id, current_user['faculty_id'], dry_run=dry_run)
+        except RosterFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        if not dry_run:
+            await conn.execute("""
+                INSERT INTO activity_logs (tenant_id, user_id, user_type, action, target_type, target_id, details)
+                VALUES ($1, $2, 'user', 'Students Imported', 'faculty', $3, $4)
+            """, tenant_id, current_user['id'], current_user['faculty_id'], json.dumps({
+                "filename": file.filename,
+                "total_rows": result['total_rows'],
+                "created": result['created'],
+                "updated": result['updated'],
+                "failed": result['failed']
+            }))
+    
+    logger.info(f"Roster import for tenant {tenant_id}: {result['created']} created, {result['updated']} updated, {result['failed']} failed in {result['duration_ms']}ms")
+    return result
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,135 @@
+"""
+PractiCheck Visit Planner
+Groups assessment visits by placement location and orders each group into a
+short route: k-means clustering, then nearest-neighbour construction improved
+by 2-opt, all vectorized with NumPy
+"""
+
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# 2-opt keeps an n x n distance matrix; longer routes keep the nearest-neighbour order
+TWO_OPT_MAX_STOPS = 1500
+TWO_OPT_MAX_PASSES = 8
+
+class Route(NamedTuple):
+    order: List[int]  # Indices into the stops passed in, in visiting order
+    distance_km: float
+
+def reference_latitude(latitudes: Sequence[float]) -> float:
+    """Latitude (degrees) whose parallel the projection keeps true to scale: the stops' mean"""
+    return float(np.mean(latitudes)) if len(latitudes) else 0.0
+
+def project(latitudes: Sequence[float], longitudes: Sequence[float], reference: float) -> np.ndarray:
+    """Equirectangular projection to kilometres about `reference`; accurate enough within a country
+
+    Points only share a plane when projected with the same reference.
+    """
+    latitudes = np.radians(np.asarray(latitudes, dtype=np.float64))
+    longitudes = np.radians(np.asarray(longitudes, dtype=np.float64))
+    return np.column_stack((longitudes * np.cos(np.radians(reference)), latitudes)).reshape(-1, 2) * EARTH_RADIUS_KM
+
+def kmeans(points: np.ndarray, k: int, iterations: int = 50, seed: int = 0) -> np.ndarray:
+    """Cluster label per point, k-means++ seeded"""
+    n = len(points)
+    k = max(1, min(k, n))
+    if k == 1:
+        return np.zeros(n, dtype=np.int64)
+
+    rng = np.random.default_rng(seed)
+    centroids = np.empty((k, 2))
+    centroids[0] = points[rng.integers(n)]
+    closest = np.sum((points - centroids[0]) ** 2, axis=1)
+    for index in range(1, k):
+        total = closest.sum()
+        choice = rng.choice(n, p=closest / total) if total > 0 else rng.integers(n)
+        centroids[index] = points[choice]
+        closest = np.minimum(closest, np.sum((points - centroids[index]) ** 2, axis=1))
+
+    labels = np.full(n, -1, dtype=np.int64)
+    for _ in range(iterations):
+        # (n, k) squared distances without materialising an (n, k, 2) array
+        distances = (
+            np.sum(points ** 2, axis=1)[:, None]
+            - 2 * points @ centroids.T
+            + np.sum(centroids ** 2, axis=1)[None, :]
+        )
+        new_labels = np.argmin(distances, axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=k)
+        for axis in (0, 1):
+            sums = np.bincount(labels, weights=points[:, axis], minlength=k)
+            # Empty clusters keep their previous centroid
+            centroids[:, axis] = np.where(counts > 0, sums / np.maximum(counts, 1), centroids[:, axis])
+    return labels
+
+def _nearest_neighbour(points: np.ndarray, start: np.ndarray) -> np.ndarray:
+    n = len(points)
+    order = np.empty(n, dtype=np.int64)
+    visited = np.zeros(n, dtype=bool)
+    current = start
+    for step in range(n):
+        distances = np.sum((points - current) ** 2, axis=1)
+        distances[visited] = np.inf
+        nearest = int(np.argmin(distances))
+        order[step] = nearest
+        visited[nearest] = True
+        current = points[nearest]
+    return order
+
+def _two_opt(path: np.ndarray, distances: np.ndarray) -> np.ndarray:
+    """Improve an open path whose first node (the start) is fixed
+
+    For each edge (a, b) every candidate second edge (c, d) is scored in one
+    vectorized step and the best improving reversal is applied.
+    """
+    n = len(path)
+    for _ in range(TWO_OPT_MAX_PASSES):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = path[i - 1], path[i]
+            c = path[i + 1:]
+            # The edge after c; reversing up to the path's end removes no second edge
+            d = np.append(path[i + 2:], -1)
+            after = np.where(d >= 0, distances[c, np.maximum(d, 0)], 0.0)
+            new_after = np.where(d >= 0, distances[b, np.maximum(d, 0)], 0.0)
+            delta = distances[a, c] + new_after - distances[a, b] - after
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                j = i + 1 + best
+                path[i:j + 1] = path[i:j + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return path
+
+def plan_route(points: np.ndarray, start: Optional[np.ndarray] = None) -> Route:
+    """Short open route through every point, beginning at `start` (or the point nearest the centroid)"""
+    n = len(points)
+    if n == 0:
+        return Route([], 0.0)
+    if start is None:
+        start = points[int(np.argmin(np.sum((points - points.mean(axis=0)) ** 2, axis=1)))]
+
+    order = _nearest_neighbour(points, start)
+    if 2 < n <= TWO_OPT_MAX_STOPS:
+        # Node 0 is the start; stops are 1..n
+        nodes = np.vstack((start, points))
+        distances = np.sqrt(np.sum((nodes[:, None, :] - nodes[None, :, :]) ** 2, axis=2))
+        path = _two_opt(np.concatenate(([0], order + 1)), distances)
+        order = path[1:] - 1
+
+    sequence = np.vstack((start, points[order]))
+    distance = float(np.sum(np.sqrt(np.sum(np.diff(sequence, axis=0) ** 2, axis=1))))
+    return Route(order.tolist(), round(distance, 2))
+
+def start_point(latitude: Optional[float], longitude: Optional[float], reference: float) -> Optional[np.ndarray]:
+    """Project a starting location (e.g. the campus) into the stops' plane, given their reference latitude"""
+    if latitude is None or longitude is None:
+        return None
+    return project([latitude], [longitude], reference)[0]
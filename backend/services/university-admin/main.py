@@ -3,12 +3,11 @@ PractiCheck University Admin API
 FastAPI backend for university-specific administration
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
-import asyncpg
 import bcrypt
 import jwt
 from jwt.exceptions import ExpiredSignatureError, InvalidTokenError
@@ -19,9 +18,20 @@ import uuid
 from contextlib import asynccontextmanager
 import json
 from dotenv import load_dotenv
+import sys
+from pathlib import Path
 import secrets
 import string
 
+# Shared backend utilities live alongside the services directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from shared.metrics import MetricsMiddleware, metrics_response, start_runtime_sampler, stop_runtime_sampler
+from shared.db import create_pool
+from shared.slow_queries import is_slow_query_reader, slow_queries_response
+from shared.roster import RosterFormatError, import_roster
+from shared.mailer import Mailer
+from shared.templating import preload_templates, render_email
+
 # Load environment variables from .env file
 load_dotenv("../../../.env")
 
@@ -30,6 +40,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration
+SERVICE_NAME = "university-admin"
 DATABASE_URL = os.getenv("DATABASE_URL")
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 JWT_ALGORITHM = "HS256"
@@ -49,14 +60,20 @@ security = HTTPBearer()
 # Database connection pool
 db_pool = None
 
+# Async SMTP sender
+mailer = Mailer(EMAIL_HOST, EMAIL_PORT, EMAIL_HOST_USER, EMAIL_HOST_PASSWORD, EMAIL_USE_TLS, DEFAULT_FROM_EMAIL)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     global db_pool
-    db_pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=10, statement_cache_size=0)
+    db_pool = await create_pool(SERVICE_NAME, DATABASE_URL, min_size=1, max_size=10, statement_cache_size=0)
     logger.info("University Admin service - Database connection pool created")
+    metrics_sampler = start_runtime_sampler(SERVICE_NAME, lambda: db_pool)
+    logger.info(f"Compiled {preload_templates()} templates")
     yield
     # Shutdown
+    await stop_runtime_sampler(metrics_sampler)
     await db_pool.close()
     logger.info("University Admin service - Database connection pool closed")
 
@@ -81,6 +98,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request metrics middleware
+app.add_middleware(MetricsMiddleware, service=SERVICE_NAME)
+
 # Pydantic Models
 class CreateFacultyRequest(BaseModel):
     name: str
@@ -181,68 +201,8 @@ async def get_current_user(token_data: dict = Depends(verify_token)) -> dict:
 async def send_faculty_admin_email(admin_email: str, credentials: FacultyAdminCredentials) -> bool:
     """Send welcome email to faculty admin with credentials"""
     try:
-        import smtplib
-        from email.mime.text import MimeText
-        from email.mime.multipart import MimeMultipart
-        
-        subject = f"Faculty Admin Access - {credentials.faculty_name}"
-        
-        # Email body
-        body = f"""
-Dear Faculty Administrator,
-
-Your faculty admin account has been created for {credentials.faculty_name} at {credentials.university_name}.
-
-Login Details:
-- Email: {credentials.email}
-- Temporary Password: {credentials.temporary_password}
-
-Please log in and change your password immediately for security.
-
-Best regards,
-{credentials.university_name} Administration
-        """
-        
-        # HTML version
-        html_body = f"""
-        <html>
-        <body>
-            <h2>Faculty Admin Access</h2>
-            <p>Dear Faculty Administrator,</p>
-            <p>Your faculty admin account has been created for <strong>{credentials.faculty_name}</strong> at <strong>{credentials.university_name}</strong>.</p>
-            
-            <h3>Login Details:</h3>
-            <ul>
-                <li><strong>Email:</strong> {credentials.email}</li>
-                <li><strong>Temporary Password:</strong> <code>{credentials.temporary_password}</code></li>
-            </ul>
-            
-            <p><strong>Important:</strong> Please log in and change your password immediately for security.</p>
-            
-            <p>Best regards,<br>{credentials.university_name} Administration</p>
-        </body>
-        </html>
-        """
-        
-        msg = MimeMultipart('alternative')
-        msg['From'] = DEFAULT_FROM_EMAIL
-        msg['To'] = admin_email
-        msg['Subject'] = subject
-
-        text_part = MimeText(body, 'plain')
-        html_part = MimeText(html_body, 'html')
-        msg.attach(text_part)
-        msg.attach(html_part)
-
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        if EMAIL_USE_TLS:
-            server.starttls()
-        server.login(EMAIL_HOST_USER, EMAIL_HOST_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        
-        logger.info(f"Faculty admin welcome email sent to {admin_email}")
-        return True
+        subject, body, html_body = render_email("faculty_admin_welcome", **credentials.model_dump())
+        return await mailer.send(admin_email, subject, body, html_body)
     except Exception as e:
         logger.error(f"Failed to send faculty admin email to {admin_email}: {e}")
         return False
@@ -269,6 +229,23 @@ async def health_check():
         logger.error(f"Health check failed: {e}")
         return {"status": "unhealthy", "database": "disconnected"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint"""
+    return metrics_response()
+
+async def get_slow_query_reader(token_data: dict = Depends(verify_token)) -> dict:
+    """Require a company-admin super admin token for slow query logs"""
+    async with db_pool.acquire() as conn:
+        if not await is_slow_query_reader(conn, token_data):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Super admin access required")
+    return token_data
+
+@app.get("/metrics/slow-queries", include_in_schema=False)
+async def slow_queries(limit: int = 50, token_data: dict = Depends(get_slow_query_reader)):
+    """Recent statements slower than SLOW_QUERY_LOG_MS with sampled plans"""
+    return slow_queries_response(min(max(limit, 1), 200))
+
 @app.get("/dashboard/stats", response_model=UniversityDashboardStats)
 async def get_university_dashboard_stats(current_user: dict = Depends(get_current_user)):
     """Get university-specific dashboard statistics"""
@@ -476,6 +453,36 @@ async def get_university_faculties(current_user: dict = Depends(get_current_user
         
         return result
 
+@app.post("/students/import", response_model=dict)
+async def import_students(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """Bulk import or update university students from a CSV or XLSX roster"""
+    tenant_id = current_user['tenant_id']
+    
+    async with db_pool.acquire() as conn:
+        try:
+            result = await import_roster(conn, file.file, file.filename, tenant_id, None, dry_run=dry_run)
+        except RosterFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        if not dry_run:
+            await conn.execute("""
+                INSERT INTO activity_logs (tenant_id, user_id, user_type, action, target_type, target_id, details)
+                VALUES ($1, $2, 'user', 'Students Imported', 'tenant', $3, $4)
+            """, tenant_id, current_user['id'], tenant_id, json.dumps({
+                "filename": file.filename,
+                "total_rows": result['total_rows'],
+                "created": result['created'],
+                "updated": result['updated'],
+                "failed": result['failed']
+            }))
+    
+    logger.info(f"Roster import for tenant {tenant_id}: {result['created']} created, {result['updated']} updated, {result['failed']} failed in {result['duration_ms']}ms")
+    return result
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
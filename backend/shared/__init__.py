@@ -0,0 +1,4 @@
+"""
+PractiCheck Shared Backend Package
+Utilities shared by the PractiCheck FastAPI services
+"""
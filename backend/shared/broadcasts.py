@@ -0,0 +1,168 @@
+"""
+PractiCheck Notification Broadcasts
+Audience-targeted notifications: small audiences get one notification row per
+recipient (fan-out on write), large ones a single broadcast row whose read
+state is recorded per recipient only once they read it (fan-out on read)
+"""
+
+import json
+import os
+from typing import NamedTuple, Optional
+
+# Audiences larger than this are stored as one broadcast row
+NOTIFICATION_FANOUT_WRITE_LIMIT = int(os.getenv("NOTIFICATION_FANOUT_WRITE_LIMIT", "200"))
+
+class Audience(NamedTuple):
+    """Recipients within a tenant; unset fields do not narrow the audience"""
+    tenant_id: str
+    faculty_id: Optional[str] = None
+    role: Optional[str] = None
+    year_of_study: Optional[int] = None
+
+# Users (u, with student profile sp) in the audience described by columns or parameters of the same names
+AUDIENCE_USERS = """
+    FROM users u
+    LEFT JOIN student_profiles sp ON sp.user_id = u.id
+    WHERE u.tenant_id = {tenant_id}
+      AND u.is_active = true
+      AND ({faculty_id}::uuid IS NULL OR COALESCE(u.faculty_id, sp.faculty_id) = {faculty_id}::uuid)
+      AND ({role}::text IS NULL OR u.role = {role}::text)
+      AND ({year_of_study}::int IS NULL OR sp.year_of_study = {year_of_study}::int)
+"""
+
+BROADCAST_AUDIENCE = {
+    "tenant_id": "b.tenant_id",
+    "faculty_id": "b.faculty_id",
+    "role": "b.role",
+    "year_of_study": "b.year_of_study"
+}
+
+# Broadcasts (b) addressed to user $1 and created after the user joined, live or expired
+ADDRESSED_BROADCASTS = f"""
+    FROM notification_broadcasts b
+    JOIN users me ON me.id = $1 AND b.tenant_id = me.tenant_id AND b.created_at >= me.created_at
+    WHERE EXISTS (
+          SELECT 1 {AUDIENCE_USERS.format(**BROADCAST_AUDIENCE)} AND u.id = $1
+      )
+"""
+
+# Broadcasts (b) addressed to user $1, live and created after the user joined
+USER_BROADCASTS = f"""
+    {ADDRESSED_BROADCASTS}
+      AND (b.expires_at IS NULL OR b.expires_at > NOW())
+"""
+
+UNREAD_BY_USER = """
+      AND NOT EXISTS (
+          SELECT 1 FROM notification_broadcast_reads r
+          WHERE r.broadcast_id = b.id AND r.user_id = $1
+      )
+"""
+
+# Same shape as NOTIFICATION_COLUMNS, with read state for user $1
+BROADCAST_COLUMNS = """
+    b.seq, b.id, b.type, b.title, b.message, b.data,
+    EXISTS (SELECT 1 FROM notification_broadcast_reads r WHERE r.broadcast_id = b.id AND r.user_id = $1) as is_read,
+    b.created_at, true as broadcast
+"""
+
+async def notify_audience(
+    conn,
+    audience: Audience,
+    notification_type: str,
+    title: str,
+    message: str,
+    data: Optional[dict] = None,
+    created_by=None,
+    expires_at=None
+) -> dict:
+    """Notify everyone in an audience, choosing per-recipient rows or one broadcast by audience size"""
+    params = {"tenant_id": "$1", "faculty_id": "$2", "role": "$3", "year_of_study": "$4"}
+    audience_args = (audience.tenant_id, audience.faculty_id, audience.role, audience.year_of_study)
+    payload = json.dumps(data or {})
+
+    recipients = await conn.fetchval(f"SELECT COUNT(*) {AUDIENCE_USERS.format(**params)}", *audience_args)
+    if recipients == 0:
+        return {"mode": "none", "recipients": 0}
+
+    if recipients <= NOTIFICATION_FANOUT_WRITE_LIMIT:
+        await conn.execute(f"""
+            INSERT INTO notifications (tenant_id, user_id, type, title, message, data)
+            SELECT $1, u.id, $5, $6, $7, $8
+            {AUDIENCE_USERS.format(**params)}
+        """, *audience_args, notification_type, title, message, payload)
+        return {"mode": "write", "recipients": recipients}
+
+    broadcast_id = await conn.fetchval("""
+        INSERT INTO notification_broadcasts (
+            tenant_id, faculty_id, role, year_of_study,
+            type, title, message, data, created_by, recipient_count, expires_at
+        )
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+        RETURNING id
+    """, *audience_args, notification_type, title, message, payload, created_by, recipients, expires_at)
+    return {"mode": "read", "recipients": recipients, "broadcast_id": str(broadcast_id)}
+
+# Broadcasts for user $1 sent past counter watermark $2 up to the commit
+# watermark (019), addressed ones expired since $3, and the tenant's newest seq
+# up to it; unread ones above it are only counted (pending), as a lower seq may
+# still commit. Each is a range scan of a per-tenant index
+BROADCAST_CHANGES = f"""
+    SELECT
+        (
+            SELECT COUNT(*) {USER_BROADCASTS} AND b.seq > $2 AND b.seq <= w.watermark {UNREAD_BY_USER}
+        ) as sent,
+        (
+            SELECT COUNT(*) {ADDRESSED_BROADCASTS}
+              AND b.seq <= $2 AND b.expires_at > $3 AND b.expires_at <= NOW() {UNREAD_BY_USER}
+        ) as expired,
+        (
+            SELECT MAX(b.seq)
+            FROM notification_broadcasts b
+            JOIN users me ON me.id = $1 AND b.tenant_id = me.tenant_id
+            WHERE b.seq > $2 AND b.seq <= w.watermark
+        ) as seq,
+        (
+            SELECT COUNT(*) {USER_BROADCASTS} AND b.seq > GREATEST($2, w.watermark) {UNREAD_BY_USER}
+        ) as pending
+    FROM (SELECT notification_seq_watermark() as watermark) w
+"""
+
+COUNTER_STATE = "SELECT broadcast_unread, broadcast_seq, broadcasts_counted_at FROM notification_counters WHERE user_id = $1"
+
+def _unchanged(changes) -> bool:
+    return not changes['sent'] and not changes['expired'] and changes['seq'] is None
+
+async def count_unread_broadcasts(conn, user_id) -> int:
+    """Unread live broadcasts for a user, folding only broadcasts sent or expired since the last count into their counter
+
+    The counter is read without a lock, and only locked and written back when
+    something changed, so badge reads from a user's open tabs do not queue.
+    """
+    counter = await conn.fetchrow(COUNTER_STATE, user_id)
+    if counter is None:
+        await conn.execute("""
+            INSERT INTO notification_counters (user_id) VALUES ($1)
+            ON CONFLICT (user_id) DO NOTHING
+        """, user_id)
+        counter = await conn.fetchrow(COUNTER_STATE, user_id)
+
+    changes = await conn.fetchrow(BROADCAST_CHANGES, user_id, counter['broadcast_seq'], counter['broadcasts_counted_at'])
+    if _unchanged(changes):
+        return counter['broadcast_unread'] + changes['pending']
+
+    async with conn.transaction():
+        # Recounted under the lock: another tab may have folded the changes in,
+        # or the user read some of them, since the unlocked look
+        locked = await conn.fetchrow(f"{COUNTER_STATE} FOR UPDATE", user_id)
+        changes = await conn.fetchrow(BROADCAST_CHANGES, user_id, locked['broadcast_seq'], locked['broadcasts_counted_at'])
+        if _unchanged(changes):
+            return locked['broadcast_unread'] + changes['pending']
+
+        unread = max(locked['broadcast_unread'] + changes['sent'] - changes['expired'], 0)
+        await conn.execute("""
+            UPDATE notification_counters
+            SET broadcast_unread = $2, broadcast_seq = $3, broadcasts_counted_at = NOW(), updated_at = NOW()
+            WHERE user_id = $1
+        """, user_id, unread, changes['seq'] or locked['broadcast_seq'])
+        return unread + changes['pending']
@@ -0,0 +1,181 @@
+"""
+PractiCheck Database Instrumentation
+asyncpg pool and connection wrappers recording per-statement timings, row counts and pool wait time
+"""
+
+import hashlib
+import re
+import time
+from functools import lru_cache
+
+import asyncpg
+from prometheus_client import Counter, Histogram
+
+from shared.metrics import LATENCY_BUCKETS, current_request_timings
+from shared.slow_queries import explaining, slow_query_log
+
+DB_QUERY_DURATION = Histogram(
+    "practicheck_db_query_duration_seconds",
+    "Database statement execution time by statement fingerprint",
+    ["service", "statement"],
+    buckets=LATENCY_BUCKETS
+)
+DB_QUERY_ROWS = Counter(
+    "practicheck_db_query_rows_total",
+    "Rows returned or affected by database statements",
+    ["service", "statement"]
+)
+DB_QUERY_ERRORS = Counter(
+    "practicheck_db_query_errors_total",
+    "Database statements that raised an error",
+    ["service", "statement"]
+)
+DB_POOL_WAIT = Histogram(
+    "practicheck_db_pool_wait_seconds",
+    "Time spent waiting to acquire a pooled database connection",
+    ["service"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_TARGET_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+([a-zA-Z_][a-zA-Z0-9_\.]*)", re.IGNORECASE)
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace and replace literals so equivalent statements share a fingerprint"""
+    normalized = _STRING_LITERAL.sub("?", query)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+@lru_cache(maxsize=2048)
+def statement_fingerprint(query: str) -> str:
+    """Readable, bounded label for a statement, e.g. select:users:1a2b3c4d"""
+    normalized = normalize_query(query)
+    operation = normalized.split(" ", 1)[0].lower() if normalized else "unknown"
+    table_match = _TARGET_TABLE.search(normalized)
+    table = table_match.group(1).lower() if table_match else "-"
+    digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:8]
+    return f"{operation}:{table}:{digest}"
+
+def count_rows(result) -> int:
+    """Number of rows returned by fetch/fetchrow/fetchval or affected according to a status tag"""
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, str):
+        last = result.rsplit(" ", 1)[-1]
+        return int(last) if last.isdigit() else 0
+    return 1
+
+def record_query(service: str, query: str, args, seconds: float, rows: int, failed: bool = False):
+    """Record a statement execution in metrics, the slow query log and the current request's timings"""
+    if explaining.get():
+        return
+
+    fingerprint = statement_fingerprint(query)
+    DB_QUERY_DURATION.labels(service, fingerprint).observe(seconds)
+    if rows:
+        DB_QUERY_ROWS.labels(service, fingerprint).inc(rows)
+    if failed:
+        DB_QUERY_ERRORS.labels(service, fingerprint).inc()
+
+    timings = current_request_timings.get()
+    if timings is not None:
+        timings.db_seconds += seconds
+        timings.db_queries += 1
+        timings.db_rows += rows
+
+    if slow_query_log.enabled and not failed:
+        slow_query_log.record(service, fingerprint, query, args, seconds, rows, timings.request if timings else None)
+
+class InstrumentedConnection(asyncpg.Connection):
+    """asyncpg connection that times every statement it runs"""
+
+    service = "unknown"
+
+    async def _timed(self, method, query, *args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            result = await method(self, query, *args, **kwargs)
+        except Exception:
+            record_query(self.service, query, args, time.perf_counter() - start_time, 0, failed=True)
+            raise
+        record_query(self.service, query, args, time.perf_counter() - start_time, count_rows(result))
+        return result
+
+    async def fetch(self, query, *args, **kwargs):
+        return await self._timed(asyncpg.Connection.fetch, query, *args, **kwargs)
+
+    async def fetchrow(self, query, *args, **kwargs):
+        return await self._timed(asyncpg.Connection.fetchrow, query, *args, **kwargs)
+
+    async def fetchval(self, query, *args, **kwargs):
+        return await self._timed(asyncpg.Connection.fetchval, query, *args, **kwargs)
+
+    async def execute(self, query, *args, **kwargs):
+        return await self._timed(asyncpg.Connection.execute, query, *args, **kwargs)
+
+    async def executemany(self, command, args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            result = await asyncpg.Connection.executemany(self, command, args, **kwargs)
+        except Exception:
+            record_query(self.service, command, (), time.perf_counter() - start_time, 0, failed=True)
+            raise
+        record_query(self.service, command, (), time.perf_counter() - start_time, len(args) if hasattr(args, "__len__") else 0)
+        return result
+
+class _InstrumentedAcquire:
+    """Acquire context that measures how long the caller waited for a connection"""
+
+    __slots__ = ("pool", "timeout", "connection")
+
+    def __init__(self, pool: "InstrumentedPool", timeout):
+        self.pool = pool
+        self.timeout = timeout
+        self.connection = None
+
+    async def _acquire(self):
+        start_time = time.perf_counter()
+        connection = await self.pool.pool.acquire(timeout=self.timeout)
+        waited = time.perf_counter() - start_time
+        DB_POOL_WAIT.labels(self.pool.service).observe(waited)
+        timings = current_request_timings.get()
+        if timings is not None:
+            timings.pool_wait_seconds += waited
+        return connection
+
+    async def __aenter__(self):
+        self.connection = await self._acquire()
+        return self.connection
+
+    async def __aexit__(self, *exc):
+        connection, self.connection = self.connection, None
+        await self.pool.pool.release(connection)
+
+    def __await__(self):
+        return self._acquire().__await__()
+
+class InstrumentedPool:
+    """Thin proxy over an asyncpg pool adding acquire wait measurement"""
+
+    def __init__(self, pool: asyncpg.Pool, service: str):
+        self.pool = pool
+        self.service = service
+
+    def acquire(self, *, timeout=None) -> _InstrumentedAcquire:
+        return _InstrumentedAcquire(self, timeout)
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+async def create_pool(service: str, dsn: str, **kwargs) -> InstrumentedPool:
+    """Create an asyncpg pool whose connections and acquires are instrumented"""
+    connection_class = type(
+        "InstrumentedConnection", (InstrumentedConnection,), {"service": service}
+    )
+    pool = await asyncpg.create_pool(dsn, connection_class=connection_class, **kwargs)
+    slow_query_log.attach_pool(pool)
+    return InstrumentedPool(pool, service)
@@ -0,0 +1,341 @@
+"""
+PractiCheck Background Jobs
+Postgres-backed job queue claimed with FOR UPDATE SKIP LOCKED, with retries,
+idempotency keys, progress tracking and stale-lock recovery
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_STALE_AFTER_SECONDS = float(os.getenv("JOB_STALE_AFTER_SECONDS", "120"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "10"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "900"))
+JOB_PROGRESS_INTERVAL_SECONDS = 1.0
+
+JOB_STATUSES = ("queued", "running", "completed", "failed")
+
+class JobContext:
+    """Handle passed to job handlers for progress reporting and checkpointing"""
+
+    def __init__(self, pool, job):
+        self.pool = pool
+        self.id = job['id']
+        self.job_type = job['job_type']
+        self.payload = json.loads(job['payload']) if isinstance(job['payload'], str) else dict(job['payload'] or {})
+        self.checkpoint = json.loads(job['checkpoint']) if isinstance(job['checkpoint'], str) else dict(job['checkpoint'] or {})
+        self.attempt = job['attempts']
+        self.tenant_id = job['tenant_id']
+        self.created_by = job['created_by']
+        self._last_progress_at = 0.0
+
+    async def progress(self, current: int, total: Optional[int] = None, message: Optional[str] = None, force: bool = False):
+        """Record progress, throttled so tight loops do not flood the database"""
+        now = time.monotonic()
+        if not force and now - self._last_progress_at < JOB_PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last_progress_at = now
+        async with self.pool.acquire() as conn:
+            await conn.execute("""
+                UPDATE background_jobs
+                SET progress_current = $2,
+                    progress_total = COALESCE($3, progress_total),
+                    progress_message = COALESCE($4, progress_message),
+                    heartbeat_at = NOW(),
+                    updated_at = NOW()
+                WHERE id = $1
+            """, self.id, current, total, message)
+
+    async def save_checkpoint(self, conn=None, **state):
+        """Persist handler state so a retried attempt can skip completed work
+
+        Pass the connection of an open transaction to commit the checkpoint
+        atomically with the work it describes.
+        """
+        self.checkpoint.update(state)
+        query = "UPDATE background_jobs SET checkpoint = $2, updated_at = NOW() WHERE id = $1"
+        if conn is not None:
+            await conn.execute(query, self.id, json.dumps(self.checkpoint))
+            return
+        async with self.pool.acquire() as conn:
+            await conn.execute(query, self.id, json.dumps(self.checkpoint))
+
+JobHandler = Callable[[JobContext], Awaitable[Optional[dict]]]
+
+async def enqueue_job(
+    conn,
+    job_type: str,
+    payload: dict,
+    idempotency_key: Optional[str] = None,
+    tenant_id=None,
+    created_by=None,
+    max_attempts: int = 3
+) -> dict:
+    """Queue a job, returning the existing job when the idempotency key was already used"""
+    idempotency_key = scoped_idempotency_key(idempotency_key, tenant_id, created_by)
+    job = await conn.fetchrow("""
+        INSERT INTO background_jobs (job_type, payload, idempotency_key, tenant_id, created_by, max_attempts)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        ON CONFLICT (idempotency_key) DO NOTHING
+        RETURNING *
+    """, job_type, json.dumps(payload), idempotency_key, tenant_id, created_by, max_attempts)
+
+    if job:
+        return serialize_job(job, created=True)
+
+    existing = await conn.fetchrow("SELECT * FROM background_jobs WHERE idempotency_key = $1", idempotency_key)
+    if existing['job_type'] != job_type:
+        raise ValueError("Idempotency key was already used for a different operation")
+    return serialize_job(existing, created=False)
+
+def scoped_idempotency_key(key: Optional[str], tenant_id=None, created_by=None) -> Optional[str]:
+    """Idempotency keys are chosen by clients, so they only dedupe within one tenant and requester"""
+    if key is None:
+        return None
+    scope = f"{tenant_id or ''}:{created_by or ''}:{key}"
+    return hashlib.sha256(scope.encode("utf-8")).hexdigest()
+
+async def get_job(conn, job_id) -> Optional[dict]:
+    """Load a job by id"""
+    job = await conn.fetchrow("SELECT * FROM background_jobs WHERE id = $1", job_id)
+    return serialize_job(job) if job else None
+
+def serialize_job(job, created: Optional[bool] = None) -> dict:
+    """Public view of a job row"""
+    def iso(value: Optional[datetime]):
+        return value.isoformat() if value else None
+
+    total = job['progress_total']
+    current = job['progress_current'] or 0
+    result = job['result']
+    data = {
+        "job_id": str(job['id']),
+        "job_type": job['job_type'],
+        "status": job['status'],
+        "attempts": job['attempts'],
+        "max_attempts": job['max_attempts'],
+        "progress": {
+            "current": current,
+            "total": total,
+            "percentage": round(current / total * 100, 1) if total else (100.0 if job['status'] == 'completed' else 0.0),
+            "message": job['progress_message']
+        },
+        "result": json.loads(result) if isinstance(result, str) else result,
+        "error": job['last_error'],
+        "created_at": iso(job['created_at']),
+        "started_at": iso(job['started_at']),
+        "finished_at": iso(job['finished_at']),
+        "next_run_at": iso(job['run_at']) if job['status'] == 'queued' else None
+    }
+    if created is not None:
+        data["created"] = created
+    return data
+
+def retry_delay_seconds(attempt: int) -> float:
+    """Exponential backoff with jitter for a failed attempt"""
+    delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * (2 ** max(attempt - 1, 0)))
+    return delay * random.uniform(0.8, 1.2)
+
+class JobWorker:
+    """Claims and runs queued jobs for a set of handlers
+
+    Several workers (in API processes or standalone worker processes) can
+    poll the same table; SKIP LOCKED hands each job to exactly one of them.
+    """
+
+    def __init__(self, pool, handlers: Dict[str, JobHandler], concurrency: int = 1, name: Optional[str] = None):
+        self.pool = pool
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.worker_id = name or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.wakeup = asyncio.Event()
+        self._tasks = []
+
+    def start(self):
+        """Start the polling loops and the stale job recovery loop"""
+        self._tasks = [asyncio.create_task(self._run_loop(slot)) for slot in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._recovery_loop()))
+        logger.info(f"Job worker {self.worker_id} started with {self.concurrency} slots for {', '.join(self.handlers)}")
+
+    async def stop(self):
+        """Stop polling; jobs interrupted mid-run are released back to the queue"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle loops after a job was enqueued in this process"""
+        self.wakeup.set()
+
+    async def _claim(self):
+        async with self.pool.acquire() as conn:
+            return await conn.fetchrow("""
+                UPDATE background_jobs
+                SET status = 'running',
+                    attempts = attempts + 1,
+                    locked_by = $1,
+                    locked_at = NOW(),
+                    heartbeat_at = NOW(),
+                    started_at = COALESCE(started_at, NOW()),
+                    updated_at = NOW()
+                WHERE id = (
+                    SELECT id FROM background_jobs
+                    WHERE status = 'queued' AND run_at <= NOW() AND job_type = ANY($2::text[])
+                    ORDER BY run_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING *
+            """, self.worker_id, list(self.handlers))
+
+    async def _run_loop(self, slot: int):
+        # Nothing but cancellation may end a slot, or the worker silently loses capacity
+        while True:
+            try:
+                job = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {self.worker_id} failed to claim a job: {e}")
+                job = None
+
+            if job:
+                try:
+                    await self._execute(job)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.exception(f"Job worker {self.worker_id} slot {slot} failed while running job {job['id']}: {e}")
+                continue
+
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=JOB_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+    async def _heartbeat(self, job_id):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                async with self.pool.acquire() as conn:
+                    await conn.execute(
+                        "UPDATE background_jobs SET heartbeat_at = NOW() WHERE id = $1 AND locked_by = $2",
+                        job_id, self.worker_id
+                    )
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {job_id} failed: {e}")
+
+    async def _execute(self, job):
+        heartbeat = asyncio.create_task(self._heartbeat(job['id']))
+        try:
+            try:
+                result = await self.handlers[job['job_type']](JobContext(self.pool, job))
+            except asyncio.CancelledError:
+                await self._release(job)
+                raise
+            except Exception as e:
+                logger.error(f"Job {job['id']} ({job['job_type']}) attempt {job['attempts']} failed: {e}")
+                await self._fail(job, str(e))
+            else:
+                await self._complete(job, result)
+        finally:
+            heartbeat.cancel()
+
+    async def _complete(self, job, result: Optional[dict]):
+        # Only the lock holder may finish a job; a stale worker's result is dropped
+        async with self.pool.acquire() as conn:
+            updated = await conn.execute("""
+                UPDATE background_jobs
+                SET status = 'completed',
+                    result = $3,
+                    progress_current = COALESCE(progress_total, progress_current),
+                    locked_by = NULL,
+                    finished_at = NOW(),
+                    updated_at = NOW()
+                WHERE id = $1 AND locked_by = $2
+            """, job['id'], self.worker_id, json.dumps(result or {}))
+        if updated == "UPDATE 0":
+            logger.warning(f"Job {job['id']} ({job['job_type']}) finished after its lock was taken over; result discarded")
+            return
+        logger.info(f"Job {job['id']} ({job['job_type']}) completed")
+
+    async def _fail(self, job, error: str):
+        retry = job['attempts'] < job['max_attempts']
+        async with self.pool.acquire() as conn:
+            updated = await conn.execute("""
+                UPDATE background_jobs
+                SET status = $3,
+                    run_at = NOW() + make_interval(secs => $4),
+                    last_error = $5,
+                    locked_by = NULL,
+                    finished_at = CASE WHEN $3 = 'failed' THEN NOW() END,
+                    updated_at = NOW()
+                WHERE id = $1 AND locked_by = $2
+            """, job['id'], self.worker_id, 'queued' if retry else 'failed',
+                retry_delay_seconds(job['attempts']) if retry else 0.0, error[:2000])
+        if updated == "UPDATE 0":
+            logger.warning(f"Job {job['id']} ({job['job_type']}) failed after its lock was taken over; outcome discarded")
+
+    async def _release(self, job):
+        """Hand an interrupted job back to the queue without consuming an attempt"""
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.execute("""
+                    UPDATE background_jobs
+                    SET status = 'queued', attempts = GREATEST(attempts - 1, 0), locked_by = NULL, updated_at = NOW()
+                    WHERE id = $1 AND locked_by = $2
+                """, job['id'], self.worker_id)
+        except Exception as e:
+            logger.warning(f"Failed to release job {job['id']}: {e}")
+
+    async def _recovery_loop(self):
+        """Requeue jobs whose worker stopped heartbeating (crashed or was killed)"""
+        while True:
+            await asyncio.sleep(JOB_STALE_AFTER_SECONDS / 2)
+            try:
+                async with self.pool.acquire() as conn:
+                    recovered = await conn.fetch("""
+                        UPDATE background_jobs
+                        SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                            finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE NOW() END,
+                            run_at = NOW(),
+                            locked_by = NULL,
+                            last_error = 'Worker stopped responding',
+                            updated_at = NOW()
+                        WHERE status = 'running' AND heartbeat_at < NOW() - make_interval(secs => $1)
+                        RETURNING id
+                    """, JOB_STALE_AFTER_SECONDS)
+                if recovered:
+                    logger.warning(f"Recovered {len(recovered)} stale jobs")
+            except Exception as e:
+                logger.error(f"Stale job recovery failed: {e}")
+
+async def run_worker_process(service: str, dsn: str, handlers: Dict[str, JobHandler], concurrency: int, on_pool=None):
+    """Entry point for a standalone worker process"""
+    from shared.db import create_pool
+
+    pool = await create_pool(f"{service}-worker", dsn, min_size=1, max_size=concurrency + 2, statement_cache_size=0)
+    if on_pool:
+        on_pool(pool)
+    worker = JobWorker(pool, handlers, concurrency=concurrency)
+    worker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await worker.stop()
+        await pool.close()
@@ -0,0 +1,130 @@
+"""
+PractiCheck Logbook Search
+Full-text search over logbook entries: weighted tsvector matches with a
+trigram fallback on titles for misspellings, scoped to what the caller may
+see, keyset-paginated, with HTML-safe highlighted snippets
+"""
+
+import html
+from typing import List, NamedTuple, Optional, Tuple
+
+from shared.pagination import QueryFilters, SortKey, add_keyset_condition, clamp_limit, encode_cursor, order_by, parse_sort
+
+LOGBOOK_SEARCH_MAX_QUERY_LENGTH = 200
+
+# ts_headline cannot escape the text it highlights, so matches are delimited
+# with control characters and turned into <mark> only after escaping
+_START, _STOP = "\x02", "\x03"
+_HEADLINE_OPTIONS = f"StartSel={_START}, StopSel={_STOP}, MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter=\" … \""
+
+# Relevance is the cover-density rank (normalised to [0, 1)) plus title similarity,
+# so fuzzy-only title matches still order sensibly
+SEARCH_SORT_KEYS = {
+    "relevance": SortKey("(ts_rank_cd(le.search_vector, q.query, 32) + similarity(le.title, q.text))::real", "real"),
+    "entry_date": SortKey("le.entry_date", "date"),
+}
+
+class SearchScope(NamedTuple):
+    """Entries a caller may search: a tenant, narrowed to a faculty's students or a lecturer's assigned students"""
+    tenant_id: str
+    faculty_id: Optional[str] = None
+    lecturer_id: Optional[str] = None
+
+def highlight(headline: Optional[str]) -> Optional[str]:
+    """Escape a ts_headline result and mark its matches"""
+    if headline is None:
+        return None
+    return html.escape(headline).replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+def add_scope(filters: QueryFilters, scope: SearchScope):
+    """Restrict logbook entries (le) to the caller's scope"""
+    filters.add("le.tenant_id = {}::uuid", scope.tenant_id)
+    if scope.faculty_id:
+        filters.add("""EXISTS (
+            SELECT 1 FROM users su
+            LEFT JOIN student_profiles ssp ON ssp.user_id = su.id
+            WHERE su.id = le.student_id AND COALESCE(su.faculty_id, ssp.faculty_id) = {}::uuid
+        )""", scope.faculty_id)
+    if scope.lecturer_id:
+        filters.add("""EXISTS (
+            SELECT 1 FROM student_lecturer_assignments sla
+            WHERE sla.student_id = le.student_id AND sla.lecturer_id = {}::uuid AND sla.status = 'active'
+        )""", scope.lecturer_id)
+
+async def search_logbook_entries(
+    conn,
+    scope: SearchScope,
+    text: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    student_id: Optional[str] = None,
+    fuzzy: bool = True
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of matching entries and the cursor for the next, raising ValueError for bad input"""
+    text = (text or "").strip()
+    if not text:
+        raise ValueError("Search text is required")
+    if len(text) > LOGBOOK_SEARCH_MAX_QUERY_LENGTH:
+        raise ValueError(f"Search text may be at most {LOGBOOK_SEARCH_MAX_QUERY_LENGTH} characters")
+    sort = parse_sort(sort, SEARCH_SORT_KEYS, "-relevance")
+
+    # $1 is the search text, parsed once into the query row q
+    filters = QueryFilters()
+    filters.args.append(text)
+    add_scope(filters, scope)
+    if student_id:
+        filters.add("le.student_id = {}::uuid", student_id)
+    if fuzzy:
+        # Both branches are tenant-led GIN bitmap scans combined with a BitmapOr;
+        # relevance order still fetches and ranks every match, so broad terms
+        # across a whole university cost a heap read per match
+        filters.add("(le.search_vector @@ q.query OR le.title % q.text)")
+    else:
+        filters.add("le.search_vector @@ q.query")
+    if cursor:
+        add_keyset_condition(filters, sort, cursor, "le.id")
+
+    limit = clamp_limit(limit)
+    # Snippets are only built for the page's rows
+    direction = "DESC" if sort.descending else "ASC"
+    rows = await conn.fetch(f"""
+        SELECT page.id, page.student_id, page.entry_date, page.title, page.supervisor_status, page.sort_value,
+               u.name as student_name,
+               ts_headline('english', page.title, q.query, '{_HEADLINE_OPTIONS}') as title_headline,
+               ts_headline('english', concat_ws(' ', page.description, page.skills_learned, page.challenges_faced),
+                           q.query, '{_HEADLINE_OPTIONS}') as snippet
+        FROM (
+            SELECT le.id, le.student_id, le.entry_date, le.title, le.description,
+                   le.skills_learned, le.challenges_faced, le.supervisor_status,
+                   {sort.key.expression} as sort_value
+            FROM logbook_entries le
+            CROSS JOIN (SELECT websearch_to_tsquery('english', $1) as query, $1::text as text) q
+            {filters.where}
+            {order_by(sort, "le.id")}
+            LIMIT {limit + 1}
+        ) page
+        CROSS JOIN (SELECT websearch_to_tsquery('english', $1) as query) q
+        JOIN users u ON page.student_id = u.id
+        ORDER BY page.sort_value {direction}, page.id {direction}
+    """, *filters.args)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, rows[-1]['sort_value'], rows[-1]['id'])
+
+    return [
+        {
+            "id": str(row['id']),
+            "student_id": str(row['student_id']),
+            "student_name": row['student_name'],
+            "entry_date": row['entry_date'].isoformat(),
+            "title": row['title'],
+            "title_highlighted": highlight(row['title_headline']),
+            "snippet": highlight(row['snippet']),
+            "supervisor_status": row['supervisor_status'],
+            "score": round(float(row['sort_value']), 4) if sort.name == "relevance" else None
+        }
+        for row in rows
+    ], next_cursor
@@ -0,0 +1,163 @@
+"""
+PractiCheck Mailer
+Async SMTP delivery with a bounded pool of reusable connections for bulk sends
+"""
+
+import asyncio
+import logging
+import time
+from email.message import EmailMessage
+from typing import Awaitable, Callable, Iterable, NamedTuple, Optional
+
+import aiosmtplib
+
+logger = logging.getLogger(__name__)
+
+class OutgoingEmail(NamedTuple):
+    """A rendered message; key identifies it to the result callback"""
+    key: str
+    to_email: str
+    subject: str
+    body: str
+    html_body: Optional[str] = None
+
+class BulkSendStats:
+    """Outcome and throughput of a bulk send"""
+
+    __slots__ = ("sent", "failed", "started", "finished")
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def per_second(self) -> float:
+        return round((self.sent + self.failed) / self.seconds, 2) if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "duration_seconds": round(self.seconds, 2),
+            "emails_per_second": self.per_second
+        }
+
+ResultCallback = Callable[[str, bool, Optional[str]], Awaitable[None]]
+
+class Mailer:
+    """SMTP sender that never blocks the event loop"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str],
+        password: Optional[str],
+        use_tls: bool,
+        from_email: Optional[str],
+        concurrency: int = 10,
+        timeout: float = 30.0
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.from_email = from_email
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+
+    def build_message(self, to_email: str, subject: str, body: str, html_body: Optional[str] = None) -> EmailMessage:
+        """Plain text message with an optional HTML alternative"""
+        message = EmailMessage()
+        message['From'] = self.from_email
+        message['To'] = to_email
+        message['Subject'] = subject
+        message.set_content(body)
+        if html_body:
+            message.add_alternative(html_body, subtype='html')
+        return message
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(hostname=self.host, port=self.port, start_tls=self.use_tls, timeout=self.timeout)
+        await client.connect()
+        if self.username:
+            try:
+                await client.login(self.username, self.password)
+            except aiosmtplib.SMTPException:
+                client.close()
+                raise
+        return client
+
+    async def send(self, to_email: str, subject: str, body: str, html_body: Optional[str] = None) -> bool:
+        """Send a single message on its own connection"""
+        try:
+            client = await self._connect()
+            try:
+                await client.send_message(self.build_message(to_email, subject, body, html_body))
+            finally:
+                await client.quit()
+            logger.info(f"Email sent successfully to {to_email}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to send email to {to_email}: {e}")
+            return False
+
+    async def send_bulk(self, emails: Iterable[OutgoingEmail], on_result: Optional[ResultCallback] = None) -> BulkSendStats:
+        """Send many messages over at most `concurrency` reused connections
+
+        A connection that drops is reopened once per message before the
+        message is counted as failed.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for email in emails:
+            queue.put_nowait(email)
+        stats = BulkSendStats()
+
+        async def report(email: OutgoingEmail, error: Optional[str]):
+            if error:
+                stats.failed += 1
+                logger.error(f"Failed to send email to {email.to_email}: {error}")
+            else:
+                stats.sent += 1
+            if on_result:
+                await on_result(email.key, error is None, error)
+
+        async def sender():
+            client = None
+            try:
+                while not queue.empty():
+                    email = queue.get_nowait()
+                    message = self.build_message(email.to_email, email.subject, email.body, email.html_body)
+                    error = None
+                    for attempt in range(2):
+                        try:
+                            if client is None or not client.is_connected:
+                                client = await self._connect()
+                            await client.send_message(message)
+                            error = None
+                            break
+                        except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, ConnectionError) as e:
+                            client = None
+                            error = str(e)
+                        except aiosmtplib.SMTPException as e:
+                            error = str(e)
+                            break
+                    await report(email, error)
+            finally:
+                if client is not None and client.is_connected:
+                    try:
+                        await client.quit()
+                    except aiosmtplib.SMTPException:
+                        client.close()
+
+        workers = min(self.concurrency, queue.qsize())
+        await asyncio.gather(*(sender() for _ in range(workers)))
+        stats.finished = time.perf_counter()
+        return stats
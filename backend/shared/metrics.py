@@ -0,0 +1,394 @@
+"""
+PractiCheck Service Metrics
+Lightweight in-process runtime sampler and Prometheus exposition for backend services
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import resource
+import shutil
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.parser import text_string_to_metric_families
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+METRICS_SAMPLE_INTERVAL_SECONDS = float(os.getenv("METRICS_SAMPLE_INTERVAL_SECONDS", "5"))
+METRICS_DISK_PATH = os.getenv("METRICS_DISK_PATH", "/")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# HTTP metrics
+HTTP_REQUESTS_TOTAL = Counter(
+    "practicheck_http_requests_total",
+    "HTTP requests handled",
+    ["service", "method", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "practicheck_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["service", "method", "route"],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "practicheck_http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["service"]
+)
+
+# Runtime metrics
+EVENT_LOOP_LAG = Gauge(
+    "practicheck_event_loop_lag_seconds",
+    "Delay between a scheduled wakeup and the event loop running it",
+    ["service"]
+)
+PROCESS_RESIDENT_MEMORY = Gauge(
+    "practicheck_process_resident_memory_bytes",
+    "Resident set size of the service process",
+    ["service"]
+)
+PROCESS_CPU_PERCENT = Gauge(
+    "practicheck_process_cpu_percent",
+    "Service process CPU usage as a percentage of available CPUs",
+    ["service"]
+)
+SYSTEM_MEMORY_PERCENT = Gauge(
+    "practicheck_system_memory_percent",
+    "Host memory in use as a percentage of total memory",
+    ["service"]
+)
+DISK_USAGE_PERCENT = Gauge(
+    "practicheck_disk_usage_percent",
+    "Disk space in use on the data volume",
+    ["service"]
+)
+NETWORK_BYTES_PER_SECOND = Gauge(
+    "practicheck_network_bytes_per_second",
+    "Host network throughput (received and transmitted)",
+    ["service"]
+)
+
+# Database pool metrics
+DB_POOL_SIZE = Gauge("practicheck_db_pool_size", "Open database connections in the pool", ["service"])
+DB_POOL_IN_USE = Gauge("practicheck_db_pool_in_use", "Database connections currently checked out", ["service"])
+DB_POOL_MAX_SIZE = Gauge("practicheck_db_pool_max_size", "Maximum database pool size", ["service"])
+
+class RequestTimings:
+    """Database time accumulated while handling a single request"""
+
+    __slots__ = ("request", "db_seconds", "db_queries", "db_rows", "pool_wait_seconds")
+
+    def __init__(self, request: Optional[str] = None):
+        self.request = request
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.db_rows = 0
+        self.pool_wait_seconds = 0.0
+
+# Timings for the request being handled in the current context, if any
+current_request_timings: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    "current_request_timings", default=None
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+def resolve_route_template(scope) -> str:
+    """Return the route template (e.g. /universities/{university_id}) that handled a request
+
+    The router stores the matched endpoint in the scope; mapping it back to its
+    path template keeps the route label bounded regardless of path parameters.
+    """
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return UNMATCHED_ROUTE
+
+    routes_by_endpoint = getattr(app.state, "metrics_routes_by_endpoint", None)
+    if routes_by_endpoint is None:
+        routes_by_endpoint = {}
+        for route in app.router.routes:
+            if hasattr(route, "endpoint") and hasattr(route, "path"):
+                routes_by_endpoint.setdefault(route.endpoint, []).append(route)
+        app.state.metrics_routes_by_endpoint = routes_by_endpoint
+
+    routes = routes_by_endpoint.get(endpoint)
+    if not routes:
+        return UNMATCHED_ROUTE
+    if len(routes) == 1:
+        return routes[0].path
+    for route in routes:
+        if route.path_regex.match(scope["path"]):
+            return route.path
+    return routes[0].path
+
+def format_server_timing(service: str, app_seconds: float, timings: RequestTimings) -> str:
+    """Build a Server-Timing header value for a request"""
+    metrics = [f'app;desc="{service}";dur={app_seconds * 1000:.2f}']
+    if timings.db_queries:
+        metrics.append(
+            f'db;desc="{service} ({timings.db_queries} queries, {timings.db_rows} rows)";dur={timings.db_seconds * 1000:.2f}'
+        )
+        metrics.append(f'db-wait;desc="{service} pool wait";dur={timings.pool_wait_seconds * 1000:.2f}')
+    return ", ".join(metrics)
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts and route latency with minimal overhead
+
+    Adds a Server-Timing header (handler time plus database time and pool wait
+    collected by shared.db) and an X-Process-Time header to every response.
+    """
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+        self.in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(service)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        timings = RequestTimings(f"{scope['method']} {scope['path']}")
+        token = current_request_timings.set(timings)
+        start_time = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed = time.perf_counter() - start_time
+                # Proxied responses may already carry an upstream process time
+                headers = [header for header in message.get("headers", []) if header[0].lower() != b"x-process-time"]
+                headers.append((b"server-timing", format_server_timing(self.service, elapsed, timings).encode("latin-1")))
+                headers.append((b"x-process-time", f"{elapsed:.6f}".encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        self.in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            self.in_progress.dec()
+            current_request_timings.reset(token)
+            HTTP_REQUEST_DURATION.labels(self.service, scope["method"], resolve_route_template(scope)).observe(duration)
+            HTTP_REQUESTS_TOTAL.labels(self.service, scope["method"], str(status_code)).inc()
+
+def metrics_response() -> Response:
+    """Render all registered metrics in the Prometheus text format"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+def read_resident_memory_bytes() -> float:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return float(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak RSS is the best portable approximation (kilobytes on Linux)
+        return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * 1024
+
+def read_system_memory_percent() -> Optional[float]:
+    """Host memory usage from /proc/meminfo"""
+    try:
+        meminfo = {}
+        with open("/proc/meminfo") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                meminfo[key] = float(value.split()[0])
+        total = meminfo["MemTotal"]
+        available = meminfo.get("MemAvailable", meminfo.get("MemFree", 0))
+        return (total - available) / total * 100 if total else None
+    except (OSError, ValueError, KeyError):
+        return None
+
+def read_network_bytes() -> Optional[float]:
+    """Total bytes received and transmitted on non-loopback interfaces"""
+    try:
+        total = 0.0
+        with open("/proc/net/dev") as f:
+            for line in f.readlines()[2:]:
+                interface, data = line.split(":", 1)
+                if interface.strip() == "lo":
+                    continue
+                fields = data.split()
+                total += float(fields[0]) + float(fields[8])
+        return total
+    except (OSError, ValueError, IndexError):
+        return None
+
+async def run_runtime_sampler(service: str, get_pool: Optional[Callable] = None, interval: float = None):
+    """Sample event loop lag, process and pool statistics on a fixed interval"""
+    interval = interval or METRICS_SAMPLE_INTERVAL_SECONDS
+    loop = asyncio.get_running_loop()
+    cpu_count = os.cpu_count() or 1
+
+    last_wall = time.monotonic()
+    last_cpu = sum(os.times()[:2])
+    last_network = read_network_bytes()
+
+    while True:
+        expected_wakeup = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.labels(service).set(max(0.0, loop.time() - expected_wakeup))
+
+        try:
+            now_wall = time.monotonic()
+            now_cpu = sum(os.times()[:2])
+            elapsed = now_wall - last_wall
+            if elapsed > 0:
+                PROCESS_CPU_PERCENT.labels(service).set((now_cpu - last_cpu) / elapsed / cpu_count * 100)
+            last_wall, last_cpu = now_wall, now_cpu
+
+            PROCESS_RESIDENT_MEMORY.labels(service).set(read_resident_memory_bytes())
+
+            memory_percent = read_system_memory_percent()
+            if memory_percent is not None:
+                SYSTEM_MEMORY_PERCENT.labels(service).set(memory_percent)
+
+            disk = shutil.disk_usage(METRICS_DISK_PATH)
+            DISK_USAGE_PERCENT.labels(service).set(disk.used / disk.total * 100 if disk.total else 0)
+
+            network = read_network_bytes()
+            if network is not None and last_network is not None and elapsed > 0:
+                NETWORK_BYTES_PER_SECOND.labels(service).set(max(0.0, network - last_network) / elapsed)
+            last_network = network
+
+            pool = get_pool() if get_pool else None
+            if pool is not None:
+                size = pool.get_size()
+                DB_POOL_SIZE.labels(service).set(size)
+                DB_POOL_IN_USE.labels(service).set(size - pool.get_idle_size())
+                DB_POOL_MAX_SIZE.labels(service).set(pool.get_max_size())
+        except Exception as e:
+            logger.warning(f"Runtime metrics sampling failed: {e}")
+
+def start_runtime_sampler(service: str, get_pool: Optional[Callable] = None) -> asyncio.Task:
+    """Start the runtime sampler as a background task"""
+    return asyncio.create_task(run_runtime_sampler(service, get_pool))
+
+async def stop_runtime_sampler(task: asyncio.Task):
+    """Cancel a running runtime sampler"""
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+class ServiceMetricsAggregator:
+    """Scrape service /metrics endpoints and summarize them for the admin dashboard
+
+    Request rate and response time are computed from the change in counters
+    between consecutive scrapes so they reflect recent traffic rather than
+    process lifetime averages.
+    """
+
+    def __init__(self, targets: List[str], timeout: float = 2.0, cache_seconds: float = 5.0):
+        self.targets = targets
+        self.timeout = timeout
+        self.cache_seconds = cache_seconds
+        self._previous: Dict[str, dict] = {}
+        self._summary: Optional[dict] = None
+        self._summary_time = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _scrape(self, client: httpx.AsyncClient, target: str) -> Optional[dict]:
+        try:
+            response = await client.get(f"{target.rstrip('/')}/metrics")
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Failed to scrape metrics from {target}: {e}")
+            return None
+
+        values = {
+            "requests": 0.0,
+            "latency_sum": 0.0,
+            "latency_count": 0.0,
+            "in_progress": 0.0,
+            "cpu_percent": 0.0,
+            "memory_percent": 0.0,
+            "disk_percent": 0.0,
+            "network_bytes_per_second": 0.0,
+            "pool_in_use": 0.0,
+            "event_loop_lag": 0.0,
+        }
+        gauges = {
+            "practicheck_http_requests_in_progress": "in_progress",
+            "practicheck_process_cpu_percent": "cpu_percent",
+            "practicheck_system_memory_percent": "memory_percent",
+            "practicheck_disk_usage_percent": "disk_percent",
+            "practicheck_network_bytes_per_second": "network_bytes_per_second",
+            "practicheck_db_pool_in_use": "pool_in_use",
+            "practicheck_event_loop_lag_seconds": "event_loop_lag",
+        }
+        # The parser is lazy, so malformed exposition text surfaces while iterating;
+        # such a target counts as down rather than failing the whole summary
+        try:
+            for family in text_string_to_metric_families(response.text):
+                for sample in family.samples:
+                    if sample.name == "practicheck_http_requests_total":
+                        values["requests"] += sample.value
+                    elif sample.name == "practicheck_http_request_duration_seconds_sum":
+                        values["latency_sum"] += sample.value
+                    elif sample.name == "practicheck_http_request_duration_seconds_count":
+                        values["latency_count"] += sample.value
+                    elif sample.name in gauges:
+                        values[gauges[sample.name]] += sample.value
+        except Exception as e:
+            logger.warning(f"Failed to parse metrics from {target}: {e}")
+            return None
+        values["scraped_at"] = time.monotonic()
+        return values
+
+    async def summarize(self) -> dict:
+        """Scrape all targets (cached briefly) and return the dashboard summary"""
+        async with self._lock:
+            if self._summary and time.monotonic() - self._summary_time < self.cache_seconds:
+                return self._summary
+
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                results = await asyncio.gather(*(self._scrape(client, target) for target in self.targets))
+
+            scraped = {target: values for target, values in zip(self.targets, results) if values}
+            request_delta = latency_delta = count_delta = request_rate = 0.0
+            for target, values in scraped.items():
+                previous = self._previous.get(target)
+                if previous and values["requests"] >= previous["requests"]:
+                    elapsed = values["scraped_at"] - previous["scraped_at"]
+                    request_delta = values["requests"] - previous["requests"]
+                    latency_delta += values["latency_sum"] - previous["latency_sum"]
+                    count_delta += values["latency_count"] - previous["latency_count"]
+                    if elapsed > 0:
+                        request_rate += request_delta / elapsed
+                self._previous[target] = values
+
+            if count_delta > 0:
+                response_time_ms = latency_delta / count_delta * 1000
+            else:
+                total_count = sum(v["latency_count"] for v in scraped.values())
+                total_sum = sum(v["latency_sum"] for v in scraped.values())
+                response_time_ms = total_sum / total_count * 1000 if total_count else 0.0
+
+            count = len(scraped) or 1
+            self._summary = {
+                # CPU is per process, averaged across services; host-level gauges use the maximum
+                "cpu_usage": sum(v["cpu_percent"] for v in scraped.values()) / count,
+                "memory_usage": max((v["memory_percent"] for v in scraped.values()), default=0.0),
+                "disk_usage": max((v["disk_percent"] for v in scraped.values()), default=0.0),
+                "network_gb_per_hour": max((v["network_bytes_per_second"] for v in scraped.values()), default=0.0) * 3600 / 1e9,
+                "active_connections": int(sum(v["in_progress"] + v["pool_in_use"] for v in scraped.values())),
+                "response_time_ms": response_time_ms,
+                "request_rate": request_rate,
+                "event_loop_lag_ms": max((v["event_loop_lag"] for v in scraped.values()), default=0.0) * 1000,
+                "services_up": len(scraped),
+                "services_total": len(self.targets),
+            }
+            self._summary_time = time.monotonic()
+            return self._summary
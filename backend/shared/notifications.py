@@ -0,0 +1,305 @@
+"""
+PractiCheck Notification Push
+Fan-out of LISTEN/NOTIFY notification events to connected users, with bounded
+per-connection queues and resume-from-cursor on reconnect or overflow
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import asyncpg
+from prometheus_client import Counter, Gauge
+
+from shared.broadcasts import AUDIENCE_USERS, BROADCAST_AUDIENCE, BROADCAST_COLUMNS, USER_BROADCASTS
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+NOTIFICATION_CHANNEL = "notifications"
+NOTIFICATION_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "100"))
+NOTIFICATION_RESUME_LIMIT = int(os.getenv("NOTIFICATION_RESUME_LIMIT", "200"))
+NOTIFICATION_KEEPALIVE_SECONDS = float(os.getenv("NOTIFICATION_KEEPALIVE_SECONDS", "25"))
+NOTIFICATION_RECONNECT_SECONDS = 5.0
+
+NOTIFICATION_SUBSCRIBERS = Gauge(
+    "practicheck_notification_subscribers",
+    "Open notification streams (SSE and WebSocket) in this process",
+    ["service"]
+)
+NOTIFICATION_PUSHED = Counter(
+    "practicheck_notification_pushed_total",
+    "Notifications handed to connected streams",
+    ["service"]
+)
+NOTIFICATION_OVERFLOWS = Counter(
+    "practicheck_notification_overflows_total",
+    "Streams whose queue filled up and fell back to catching up from the database",
+    ["service"]
+)
+
+NOTIFICATION_COLUMNS = "seq, id, type, title, message, data, is_read, created_at, false as broadcast"
+
+def serialize_notification(row) -> dict:
+    """Public view of a notification or broadcast row"""
+    data = row['data']
+    created_at: Optional[datetime] = row['created_at']
+    return {
+        "seq": row['seq'],
+        "id": str(row['id']),
+        "type": row['type'],
+        "title": row['title'],
+        "message": row['message'],
+        "data": json.loads(data) if isinstance(data, str) else (data or {}),
+        "is_read": row['is_read'],
+        "created_at": created_at.isoformat() if created_at else None,
+        "broadcast": row['broadcast']
+    }
+
+class Subscription:
+    """One open stream for a user
+
+    Live events are queued up to NOTIFICATION_QUEUE_SIZE. A stream that cannot
+    keep up is marked lagging instead of growing its queue; its next read
+    replays from the database after its cursor.
+
+    seq follows the writing transaction, not the commit, so the cursor only
+    moves up to the watermark below which every row was already committed and
+    delivered; rows above it may be delivered again after a reconnect.
+    """
+
+    def __init__(self, hub: "NotificationHub", user_id: str, last_seq: int):
+        self.hub = hub
+        self.user_id = user_id
+        self.last_seq = last_seq  # Everything at or below it has been delivered
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=hub.queue_size)
+        self.lagging = last_seq > 0
+        # Ids already delivered, so a replay and the live feed never double-deliver
+        self._recent = deque(maxlen=hub.queue_size + NOTIFICATION_RESUME_LIMIT)
+        self._recent_ids: Set[str] = set()
+
+    def offer(self, notification: dict, watermark: int):
+        if self.lagging:
+            return
+        try:
+            self.queue.put_nowait((notification, watermark))
+        except asyncio.QueueFull:
+            self.lagging = True
+            NOTIFICATION_OVERFLOWS.labels(self.hub.service).inc()
+
+    def _remember(self, items: List[Tuple[dict, int]]) -> List[dict]:
+        """Notifications not yet delivered, each with the cursor to resume after it"""
+        fresh = []
+        for notification, watermark in items:
+            self.last_seq = max(self.last_seq, min(notification['seq'], watermark))
+            if notification['id'] in self._recent_ids:
+                continue
+            if len(self._recent) == self._recent.maxlen:
+                self._recent_ids.discard(self._recent[0])
+            self._recent.append(notification['id'])
+            self._recent_ids.add(notification['id'])
+            fresh.append(dict(notification, cursor=self.last_seq))
+        return fresh
+
+    async def next_batch(self, timeout: float = NOTIFICATION_KEEPALIVE_SECONDS) -> List[dict]:
+        """Notifications to deliver next, or an empty list when the keepalive interval passes"""
+        if self.lagging:
+            # Anything still queued is also in the replay
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.lagging = False
+            cursor = self.last_seq
+            replay, watermark = await self.hub.fetch_since(self.user_id, cursor)
+            batch = self._remember([(notification, watermark) for notification in replay])
+            if len(replay) < NOTIFICATION_RESUME_LIMIT:
+                # Every committed row up to the watermark was in the replay
+                self.last_seq = max(self.last_seq, watermark)
+            elif self.last_seq > cursor:
+                self.lagging = True
+            if batch or self.lagging:
+                return batch
+
+        try:
+            first = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return []
+        batch = [first]
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return self._remember(batch)
+
+class NotificationHub:
+    """Per-process fan-out: one LISTEN connection shared by every open stream"""
+
+    def __init__(self, service: str, dsn: str, pool, queue_size: int = NOTIFICATION_QUEUE_SIZE):
+        self.service = service
+        self.dsn = dsn
+        self.pool = pool
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._pending: List[dict] = []
+        self._pending_ready = asyncio.Event()
+        self._listener: Optional[asyncpg.Connection] = None
+        self._listener_lost = asyncio.Event()
+        self._tasks = []
+
+    async def start(self):
+        await self._listen()
+        self._tasks = [
+            asyncio.create_task(self._dispatch_loop()),
+            asyncio.create_task(self._supervise_loop())
+        ]
+        logger.info(f"Notification hub listening on '{NOTIFICATION_CHANNEL}'")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._listener and not self._listener.is_closed():
+            await self._listener.close()
+
+    async def _listen(self):
+        self._listener = await asyncpg.connect(self.dsn, statement_cache_size=0)
+        await self._listener.add_listener(NOTIFICATION_CHANNEL, self._on_notify)
+        self._listener.add_termination_listener(self._on_listener_terminated)
+
+    def _on_listener_terminated(self, connection):
+        # Events are missed until LISTEN is back, so streams catch up from their cursor
+        if connection is self._listener:
+            self._mark_all_lagging()
+            self._listener_lost.set()
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed notification payload: {payload[:200]}")
+            return
+        # Only events for users with an open stream in this process cost a query;
+        # broadcasts are matched against those users when dispatched
+        if event.get('user_id') in self._subscribers or (event.get('broadcast_id') and self._subscribers):
+            self._pending.append(event)
+            self._pending_ready.set()
+
+    async def _dispatch_loop(self):
+        """Load pending notifications in batches and offer them to their users' streams"""
+        while True:
+            await self._pending_ready.wait()
+            self._pending_ready.clear()
+            events, self._pending = self._pending, []
+            if not events:
+                continue
+            notification_ids = [event['id'] for event in events if event.get('id')]
+            broadcast_ids = [event['broadcast_id'] for event in events if event.get('broadcast_id')]
+            watermarks = {event.get('id') or event.get('broadcast_id'): event.get('watermark', 0) for event in events}
+            try:
+                async with self.pool.acquire() as conn:
+                    rows = await conn.fetch(f"""
+                        SELECT user_id, {NOTIFICATION_COLUMNS}
+                        FROM notifications
+                        WHERE id = ANY($1::uuid[])
+                        ORDER BY seq
+                    """, notification_ids) if notification_ids else []
+                    if broadcast_ids:
+                        rows += await conn.fetch(f"""
+                            SELECT recipient.id as user_id, b.seq, b.id, b.type, b.title, b.message, b.data,
+                                   false as is_read, b.created_at, true as broadcast
+                            FROM notification_broadcasts b
+                            CROSS JOIN LATERAL (
+                                SELECT u.id {AUDIENCE_USERS.format(**BROADCAST_AUDIENCE)} AND u.id = ANY($2::uuid[])
+                            ) recipient
+                            WHERE b.id = ANY($1::uuid[])
+                            ORDER BY b.seq
+                        """, broadcast_ids, list(self._subscribers))
+            except Exception as e:
+                # The streams catch up from their cursor instead
+                logger.error(f"Failed to load pushed notifications: {e}")
+                self._mark_all_lagging()
+                continue
+
+            for row in sorted(rows, key=lambda row: row['seq']):
+                notification = serialize_notification(row)
+                for subscription in self._subscribers.get(str(row['user_id']), ()):
+                    subscription.offer(notification, watermarks.get(notification['id'], 0))
+                    NOTIFICATION_PUSHED.labels(self.service).inc()
+
+    async def _supervise_loop(self):
+        """Re-establish LISTEN as soon as the connection drops; events sent meanwhile are replayed"""
+        while True:
+            try:
+                await asyncio.wait_for(self._listener_lost.wait(), NOTIFICATION_RECONNECT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            if self._listener and not self._listener.is_closed():
+                continue
+            self._listener_lost.clear()
+            try:
+                await self._listen()
+                logger.info("Notification hub reconnected")
+                self._mark_all_lagging()
+            except Exception as e:
+                logger.warning(f"Notification hub reconnect failed: {e}")
+
+    def _mark_all_lagging(self):
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.lagging = True
+
+    def subscribe(self, user_id: str, last_seq: int = 0) -> Subscription:
+        """Open a stream; with last_seq set, everything after it is replayed first"""
+        subscription = Subscription(self, str(user_id), last_seq)
+        self._subscribers.setdefault(subscription.user_id, set()).add(subscription)
+        NOTIFICATION_SUBSCRIBERS.labels(self.service).inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions and subscription in subscriptions:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+            NOTIFICATION_SUBSCRIBERS.labels(self.service).dec()
+
+    async def fetch_since(self, user_id: str, seq: int, limit: int = NOTIFICATION_RESUME_LIMIT) -> Tuple[List[dict], int]:
+        """A user's notifications and broadcasts after a sequence number, oldest first, and the watermark they were read at"""
+        # The watermark is read in the same snapshot, so every committed row up to it is visible here
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(f"""
+                SELECT w.watermark, items.*
+                FROM (SELECT notification_seq_watermark() as watermark) w
+                LEFT JOIN LATERAL (
+                    (
+                        SELECT {NOTIFICATION_COLUMNS}
+                        FROM notifications
+                        WHERE user_id = $1 AND seq > $2
+                        ORDER BY seq
+                        LIMIT $3
+                    )
+                    UNION ALL
+                    (
+                        SELECT {BROADCAST_COLUMNS}
+                        {USER_BROADCASTS}
+                          AND b.seq > $2
+                        ORDER BY b.seq
+                        LIMIT $3
+                    )
+                ) items ON true
+                ORDER BY items.seq
+                LIMIT $3
+            """, user_id, seq, limit)
+        return [serialize_notification(row) for row in rows if row['id'] is not None], rows[0]['watermark']
+
+def parse_last_event_id(value: Optional[str]) -> int:
+    """Cursor a reconnecting client last saw (0 for a fresh stream)"""
+    try:
+        return max(int(value), 0) if value else 0
+    except ValueError:
+        return 0
+
+def sse_event(notification: dict) -> str:
+    return f"id: {notification['cursor']}\nevent: notification\ndata: {json.dumps(notification)}\n\n"
@@ -0,0 +1,153 @@
+"""
+PractiCheck Pagination
+Keyset (cursor) pagination, composable SQL filters and a cached row-count
+estimator for list endpoints
+"""
+
+import base64
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Configuration
+LISTING_DEFAULT_LIMIT = int(os.getenv("LISTING_DEFAULT_LIMIT", "100"))
+LISTING_MAX_LIMIT = int(os.getenv("LISTING_MAX_LIMIT", "500"))
+LISTING_COUNT_CACHE_SECONDS = float(os.getenv("LISTING_COUNT_CACHE_SECONDS", "60"))
+# Below this many estimated rows an exact COUNT(*) is cheap enough to run
+LISTING_EXACT_COUNT_THRESHOLD = int(os.getenv("LISTING_EXACT_COUNT_THRESHOLD", "20000"))
+
+class SortKey(NamedTuple):
+    """A sortable column: a non-null SQL expression and the type its cursor value is cast back to"""
+    expression: str
+    sql_type: str
+
+class Sort(NamedTuple):
+    name: str
+    key: SortKey
+    descending: bool
+
+def parse_sort(sort: Optional[str], keys: Dict[str, SortKey], default: str) -> Sort:
+    """Parse `name` (ascending) or `-name` (descending), raising ValueError for unknown keys"""
+    sort = sort or default
+    descending = sort.startswith("-")
+    name = sort.lstrip("-")
+    if name not in keys:
+        raise ValueError(f"Unknown sort key '{name}'; expected one of {', '.join(keys)}")
+    return Sort(name, keys[name], descending)
+
+def encode_cursor(sort: Sort, value: Any, row_id: Any) -> str:
+    """Opaque cursor naming the last row of a page"""
+    value = value.isoformat() if hasattr(value, "isoformat") else str(value)
+    raw = json.dumps([sort.name, sort.descending, value, str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort: Sort) -> Tuple[str, str]:
+    """Last (sort value, id) of the previous page, raising ValueError if the cursor is invalid for this sort"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        name, descending, value, row_id = json.loads(raw)
+        row_id = str(uuid.UUID(row_id))
+    except (ValueError, TypeError, AttributeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if name != sort.name or descending != sort.descending:
+        raise ValueError("Cursor does not match the requested sort order")
+    return value, row_id
+
+def clamp_limit(limit: Optional[int]) -> int:
+    return max(1, min(limit or LISTING_DEFAULT_LIMIT, LISTING_MAX_LIMIT))
+
+class QueryFilters:
+    """WHERE conditions with positional parameters numbered as they are added
+
+    Conditions use `{}` for each value, e.g. `add("t.status = ANY({})", statuses)`.
+    """
+
+    def __init__(self):
+        self.conditions: List[str] = []
+        self.args: List[Any] = []
+
+    def add(self, condition: str, *values):
+        placeholders = [f"${len(self.args) + index + 1}" for index in range(len(values))]
+        self.conditions.append(condition.format(*placeholders))
+        self.args.extend(values)
+
+    def copy(self) -> "QueryFilters":
+        filters = QueryFilters()
+        filters.conditions = list(self.conditions)
+        filters.args = list(self.args)
+        return filters
+
+    @property
+    def where(self) -> str:
+        return f"WHERE {' AND '.join(self.conditions)}" if self.conditions else ""
+
+    def next_param(self) -> str:
+        return f"${len(self.args) + 1}"
+
+def add_keyset_condition(filters: QueryFilters, sort: Sort, cursor: str, id_expression: str):
+    """Restrict to rows after the cursor; (sort value, id) row comparison keeps ties stable"""
+    value, row_id = decode_cursor(cursor, sort)
+    operator = "<" if sort.descending else ">"
+    filters.add(
+        f"({sort.key.expression}, {id_expression}) {operator} ({{}}::text::{sort.key.sql_type}, {{}}::text::uuid)",
+        value, row_id
+    )
+
+def order_by(sort: Sort, id_expression: str) -> str:
+    direction = "DESC" if sort.descending else "ASC"
+    return f"ORDER BY {sort.key.expression} {direction}, {id_expression} {direction}"
+
+class CountEstimator:
+    """Total row counts for listings, cached per filter set
+
+    Small results are counted exactly; large ones use the planner's estimate
+    so a count never costs more than the page it accompanies.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = LISTING_COUNT_CACHE_SECONDS,
+        exact_threshold: int = LISTING_EXACT_COUNT_THRESHOLD,
+        max_entries: int = 256
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.exact_threshold = exact_threshold
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[tuple, Tuple[float, int, bool]]" = OrderedDict()
+
+    def invalidate(self):
+        self._cache.clear()
+
+    async def count(self, conn, from_sql: str, filters: QueryFilters) -> Tuple[int, bool]:
+        """(total, is_estimate) for `SELECT ... {from_sql} {filters.where}`"""
+        key = (from_sql, filters.where, tuple(str(arg) for arg in filters.args))
+        cached = self._cache.get(key)
+        now = time.monotonic()
+        if cached and now - cached[0] < self.ttl_seconds:
+            self._cache.move_to_end(key)
+            return cached[1], cached[2]
+
+        query = f"SELECT 1 {from_sql} {filters.where}"
+        plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *filters.args)
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+
+        if estimate < self.exact_threshold:
+            total, is_estimate = await conn.fetchval(f"SELECT COUNT(*) FROM ({query}) counted", *filters.args), False
+        else:
+            total, is_estimate = estimate, True
+
+        self._cache[key] = (now, total, is_estimate)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return total, is_estimate
+
+def set_page_headers(response, total: int, is_estimate: bool, next_cursor: Optional[str]):
+    """Pagination metadata travels in headers so list bodies keep their shape"""
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["X-Total-Count-Estimated"] = "true" if is_estimate else "false"
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
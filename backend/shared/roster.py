@@ -0,0 +1,383 @@
+"""
+PractiCheck Roster Import
+Streaming CSV/XLSX student roster parsing, validation and set-based merge via a COPY staging table
+"""
+
+import asyncio
+import codecs
+import csv
+import os
+import re
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Configuration
+ROSTER_CHUNK_SIZE = int(os.getenv("ROSTER_CHUNK_SIZE", "5000"))
+ROSTER_MAX_ROWS = int(os.getenv("ROSTER_MAX_ROWS", "100000"))
+MAX_REPORTED_ERRORS = 1000
+
+REQUIRED_COLUMNS = ("student_id", "name", "email", "course_code")
+OPTIONAL_COLUMNS = ("year_of_study", "phone")
+
+# Accepted header spellings mapped to canonical column names
+HEADER_ALIASES = {
+    "registration_number": "student_id",
+    "reg_no": "student_id",
+    "admission_number": "student_id",
+    "full_name": "name",
+    "student_name": "name",
+    "email_address": "email",
+    "course": "course_code",
+    "program_code": "course_code",
+    "year": "year_of_study",
+    "phone_number": "phone",
+}
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+STAGING_COLUMNS = [
+    "line_number", "student_id", "name", "email", "course_id", "faculty_id",
+    "faculty_name", "program", "year_of_study", "phone"
+]
+
+class RosterFormatError(ValueError):
+    """Raised when a roster file cannot be read at all"""
+
+def normalize_header(value) -> str:
+    """Canonical column name for a header cell"""
+    name = re.sub(r"[^a-z0-9]+", "_", str(value or "").strip().lower()).strip("_")
+    return HEADER_ALIASES.get(name, name)
+
+def normalize_cell(value) -> str:
+    """String form of a cell, turning spreadsheet numbers like 1234.0 into 1234"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+def _check_headers(headers: List[str]):
+    missing = [column for column in REQUIRED_COLUMNS if column not in headers]
+    if missing:
+        raise RosterFormatError(f"Missing required columns: {', '.join(missing)}")
+
+def _iter_csv(file) -> Iterator[Tuple[int, dict]]:
+    reader = csv.reader(codecs.iterdecode(file, "utf-8-sig"))
+    try:
+        headers = [normalize_header(value) for value in next(reader)]
+    except StopIteration:
+        raise RosterFormatError("Roster file is empty")
+    except UnicodeDecodeError:
+        raise RosterFormatError("CSV rosters must be UTF-8 encoded")
+    _check_headers(headers)
+
+    try:
+        for line_number, values in enumerate(reader, start=2):
+            if not any(value.strip() for value in values):
+                continue
+            yield line_number, {header: normalize_cell(value) for header, value in zip(headers, values)}
+    except UnicodeDecodeError:
+        raise RosterFormatError("CSV rosters must be UTF-8 encoded")
+
+def _iter_xlsx(file) -> Iterator[Tuple[int, dict]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RosterFormatError("XLSX rosters are not supported on this server, upload a CSV file")
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise RosterFormatError("Could not read the XLSX file")
+
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        try:
+            headers = [normalize_header(value) for value in next(rows)]
+        except StopIteration:
+            raise RosterFormatError("Roster file is empty")
+        _check_headers(headers)
+
+        for line_number, values in enumerate(rows, start=2):
+            if not any(value not in (None, "") for value in values):
+                continue
+            yield line_number, {header: normalize_cell(value) for header, value in zip(headers, values)}
+    finally:
+        workbook.close()
+
+def iter_roster_rows(file, filename: str) -> Iterator[Tuple[int, dict]]:
+    """Lazily yield (line number, row) pairs from a CSV or XLSX roster"""
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension == ".csv":
+        return _iter_csv(file)
+    if extension == ".xlsx":
+        return _iter_xlsx(file)
+    raise RosterFormatError("Unsupported roster format, upload a .csv or .xlsx file")
+
+class RosterValidator:
+    """Validate roster rows against the tenant's course catalogue"""
+
+    def __init__(self, courses: Dict[str, dict]):
+        self.courses = courses
+        self.errors: List[dict] = []
+        self.error_count = 0
+        self.total_rows = 0
+
+    def add_error(self, line_number: int, message: str, field: Optional[str] = None):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": line_number, "field": field, "message": message})
+
+    def validate(self, line_number: int, row: dict) -> Optional[tuple]:
+        """Return a staging record for a valid row, recording errors otherwise"""
+        self.total_rows += 1
+        valid = True
+
+        student_id = row.get("student_id", "")
+        name = row.get("name", "")
+        email = row.get("email", "").lower()
+        course_code = row.get("course_code", "").upper()
+        phone = row.get("phone", "") or None
+        year = row.get("year_of_study", "")
+
+        for field, value, max_length in (("student_id", student_id, 100), ("name", name, 255), ("email", email, 255)):
+            if not value:
+                self.add_error(line_number, f"{field} is required", field)
+                valid = False
+            elif len(value) > max_length:
+                self.add_error(line_number, f"{field} must be at most {max_length} characters", field)
+                valid = False
+
+        if email and not EMAIL_PATTERN.match(email):
+            self.add_error(line_number, "Invalid email address", "email")
+            valid = False
+
+        course = self.courses.get(course_code)
+        if not course:
+            self.add_error(line_number, f"Unknown course code '{course_code}'" if course_code else "course_code is required", "course_code")
+            valid = False
+
+        year_of_study = None
+        if year:
+            try:
+                year_of_study = int(float(year))
+                if not 1 <= year_of_study <= 10:
+                    raise ValueError
+            except ValueError:
+                self.add_error(line_number, "year_of_study must be a whole number between 1 and 10", "year_of_study")
+                valid = False
+
+        if phone and len(phone) > 20:
+            self.add_error(line_number, "phone must be at most 20 characters", "phone")
+            valid = False
+
+        if not valid:
+            return None
+
+        return (
+            line_number, student_id, name, email, course["id"], course["faculty_id"],
+            course["faculty_name"], course["name"], year_of_study, phone
+        )
+
+def read_validated_chunk(rows: Iterator[Tuple[int, dict]], validator: RosterValidator, size: int) -> Tuple[List[tuple], bool]:
+    """Pull up to size rows from the parser and validate them (runs in a worker thread)"""
+    records = []
+    for line_number, row in rows:
+        if validator.total_rows >= ROSTER_MAX_ROWS:
+            raise RosterFormatError(f"Roster exceeds the maximum of {ROSTER_MAX_ROWS} rows")
+        record = validator.validate(line_number, row)
+        if record:
+            records.append(record)
+        if validator.total_rows % size == 0:
+            return records, False
+    return records, True
+
+async def load_course_lookup(conn, tenant_id, faculty_id=None) -> Dict[str, dict]:
+    """Active courses for a tenant (optionally one faculty) keyed by upper-case course code"""
+    courses = await conn.fetch("""
+        SELECT c.id, c.code, c.name, c.faculty_id, f.name as faculty_name
+        FROM courses c
+        JOIN faculties f ON c.faculty_id = f.id
+        WHERE c.tenant_id = $1 AND c.is_active = true
+        AND ($2::uuid IS NULL OR c.faculty_id = $2::uuid)
+    """, tenant_id, faculty_id)
+    return {course['code'].upper(): dict(course) for course in courses}
+
+async def merge_roster(conn, tenant_id, faculty_id=None) -> dict:
+    """Merge the staged roster into users, student_profiles and students"""
+    # Keep the first occurrence of a repeated email or student ID
+    await conn.execute("""
+        WITH ranked AS (
+            SELECT line_number,
+                   ROW_NUMBER() OVER (PARTITION BY email ORDER BY line_number) AS email_rank,
+                   ROW_NUMBER() OVER (PARTITION BY student_id ORDER BY line_number) AS student_id_rank
+            FROM roster_staging
+        )
+        UPDATE roster_staging s
+        SET error = CASE WHEN r.email_rank > 1 THEN 'Duplicate email in file' ELSE 'Duplicate student ID in file' END
+        FROM ranked r
+        WHERE s.line_number = r.line_number AND (r.email_rank > 1 OR r.student_id_rank > 1)
+    """)
+
+    # Resolve existing accounts by email
+    await conn.execute("""
+        UPDATE roster_staging s
+        SET user_id = u.id,
+            error = CASE
+                WHEN u.role <> 'student' THEN 'Email belongs to an existing non-student account'
+                WHEN $2::uuid IS NOT NULL AND u.faculty_id IS NOT NULL AND u.faculty_id <> $2::uuid
+                    THEN 'Student belongs to another faculty'
+            END
+        FROM users u
+        WHERE s.error IS NULL AND u.tenant_id = $1 AND lower(u.email) = s.email
+    """, tenant_id, faculty_id)
+
+    await conn.execute("""
+        UPDATE roster_staging s
+        SET error = 'Student ID is already assigned to another student'
+        FROM student_profiles sp
+        JOIN users u ON sp.user_id = u.id
+        WHERE s.error IS NULL AND u.tenant_id = $1 AND sp.student_id = s.student_id
+        AND sp.user_id IS DISTINCT FROM s.user_id
+    """, tenant_id)
+
+    await conn.execute("""
+        UPDATE users u
+        SET name = s.name, faculty_id = s.faculty_id, updated_at = NOW()
+        FROM roster_staging s
+        WHERE s.error IS NULL AND s.user_id = u.id
+    """)
+
+    # New accounts have no password until the student completes registration
+    await conn.execute("""
+        WITH inserted AS (
+            INSERT INTO users (tenant_id, email, name, role, faculty_id, is_active)
+            SELECT $1, email, name, 'student', faculty_id, true
+            FROM roster_staging
+            WHERE error IS NULL AND user_id IS NULL
+            ON CONFLICT (tenant_id, email) DO NOTHING
+            RETURNING id, email
+        )
+        UPDATE roster_staging s
+        SET user_id = i.id, is_new = true
+        FROM inserted i
+        WHERE s.email = i.email AND s.error IS NULL AND s.user_id IS NULL
+    """, tenant_id)
+
+    await conn.execute("""
+        UPDATE roster_staging
+        SET error = 'Account was created concurrently, please re-import this row'
+        WHERE error IS NULL AND user_id IS NULL
+    """)
+
+    await conn.execute("""
+        INSERT INTO student_profiles (user_id, student_id, faculty, program, year_of_study, phone, course_id, faculty_id)
+        SELECT user_id, student_id, faculty_name, program, year_of_study, phone, course_id, faculty_id
+        FROM roster_staging
+        WHERE error IS NULL
+        ON CONFLICT (user_id) DO UPDATE SET
+            student_id = EXCLUDED.student_id,
+            faculty = EXCLUDED.faculty,
+            program = EXCLUDED.program,
+            year_of_study = COALESCE(EXCLUDED.year_of_study, student_profiles.year_of_study),
+            phone = COALESCE(EXCLUDED.phone, student_profiles.phone),
+            course_id = EXCLUDED.course_id,
+            faculty_id = EXCLUDED.faculty_id,
+            updated_at = NOW()
+    """)
+
+    await conn.execute("""
+        INSERT INTO students (tenant_id, user_id, registration_number, faculty, program, year_of_study)
+        SELECT $1, user_id, student_id, faculty_name, program, year_of_study
+        FROM roster_staging
+        WHERE error IS NULL
+        ON CONFLICT (tenant_id, registration_number) DO UPDATE SET
+            user_id = EXCLUDED.user_id,
+            faculty = EXCLUDED.faculty,
+            program = EXCLUDED.program,
+            year_of_study = COALESCE(EXCLUDED.year_of_study, students.year_of_study),
+            updated_at = NOW()
+    """, tenant_id)
+
+    counts = await conn.fetchrow("""
+        SELECT
+            COUNT(*) FILTER (WHERE error IS NULL AND is_new) as created,
+            COUNT(*) FILTER (WHERE error IS NULL AND NOT is_new) as updated,
+            COUNT(*) FILTER (WHERE error IS NOT NULL) as failed
+        FROM roster_staging
+    """)
+    errors = await conn.fetch("""
+        SELECT line_number, error
+        FROM roster_staging
+        WHERE error IS NOT NULL
+        ORDER BY line_number
+        LIMIT $1
+    """, MAX_REPORTED_ERRORS)
+
+    return {
+        "created": counts['created'],
+        "updated": counts['updated'],
+        "failed": counts['failed'],
+        "errors": [{"row": row['line_number'], "field": None, "message": row['error']} for row in errors]
+    }
+
+async def import_roster(conn, file, filename: str, tenant_id, faculty_id=None, dry_run: bool = False) -> dict:
+    """Stream a roster file into a COPY staging table and merge it in one transaction
+
+    Parsing and validation run in a worker thread one chunk at a time, so
+    memory stays bounded by the chunk size regardless of roster length. With
+    dry_run the merge is rolled back and only the report is returned.
+    """
+    start_time = time.perf_counter()
+    validator = RosterValidator(await load_course_lookup(conn, tenant_id, faculty_id))
+    rows = iter_roster_rows(file, filename)
+
+    transaction = conn.transaction()
+    await transaction.start()
+    try:
+        await conn.execute("""
+            CREATE TEMP TABLE roster_staging (
+                line_number INTEGER PRIMARY KEY,
+                student_id VARCHAR(100) NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                email VARCHAR(255) NOT NULL,
+                course_id UUID NOT NULL,
+                faculty_id UUID NOT NULL,
+                faculty_name VARCHAR(255),
+                program VARCHAR(255),
+                year_of_study INTEGER,
+                phone VARCHAR(20),
+                user_id UUID,
+                is_new BOOLEAN NOT NULL DEFAULT false,
+                error TEXT
+            ) ON COMMIT DROP
+        """)
+
+        finished = False
+        while not finished:
+            records, finished = await asyncio.to_thread(read_validated_chunk, rows, validator, ROSTER_CHUNK_SIZE)
+            if records:
+                await conn.copy_records_to_table("roster_staging", records=records, columns=STAGING_COLUMNS)
+
+        await conn.execute("ANALYZE roster_staging")
+        merged = await merge_roster(conn, tenant_id, faculty_id)
+
+        if dry_run:
+            await transaction.rollback()
+        else:
+            await transaction.commit()
+    except BaseException:
+        await transaction.rollback()
+        raise
+
+    errors = sorted(validator.errors + merged["errors"], key=lambda error: error["row"])
+    return {
+        "total_rows": validator.total_rows,
+        "created": merged["created"],
+        "updated": merged["updated"],
+        "failed": validator.total_rows - merged["created"] - merged["updated"],
+        "errors": errors[:MAX_REPORTED_ERRORS],
+        "errors_truncated": validator.error_count + merged["failed"] > MAX_REPORTED_ERRORS,
+        "dry_run": dry_run,
+        "duration_ms": round((time.perf_counter() - start_time) * 1000)
+    }
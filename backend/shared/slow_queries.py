@@ -0,0 +1,191 @@
+"""
+PractiCheck Slow Query Log
+Opt-in ring buffer of slow statements with rate-limited EXPLAIN (ANALYZE, BUFFERS) samples
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Configuration (the log is disabled unless SLOW_QUERY_LOG_MS is set)
+SLOW_QUERY_LOG_MS = float(os.getenv("SLOW_QUERY_LOG_MS", "0"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "True").lower() == "true"
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "300"))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "5000"))
+
+MAX_QUERY_TEXT_LENGTH = 4000
+MAX_CACHED_PLANS = 100
+
+# Set while an EXPLAIN sample runs so its own statements are not recorded
+explaining = contextvars.ContextVar("slow_query_explaining", default=False)
+
+def describe_parameters(args) -> List[str]:
+    """Describe query parameters by type and size without keeping their values"""
+    shape = []
+    for value in args:
+        if value is None:
+            shape.append("null")
+        elif isinstance(value, (list, tuple)):
+            shape.append(f"{type(value).__name__}[{len(value)}]")
+        elif isinstance(value, (str, bytes)):
+            shape.append(f"{type(value).__name__}({len(value)})")
+        else:
+            shape.append(type(value).__name__)
+    return shape
+
+# Functions whose effects outlive the rolled-back EXPLAIN transaction (session
+# advisory locks, sequence increments, notifications, other backends)
+_SIDE_EFFECT_FUNCTIONS = re.compile(
+    r"\b(?:nextval|setval|pg_notify|pg_(?:try_)?advisory_(?:xact_)?lock(?:_shared)?|pg_advisory_unlock(?:_shared|_all)?"
+    r"|pg_cancel_backend|pg_terminate_backend|set_config|lo_\w+|dblink\w*)\s*\(",
+    re.IGNORECASE
+)
+
+def is_explainable(query: str) -> bool:
+    """Only read-only statements without side-effect functions are re-executed under EXPLAIN ANALYZE"""
+    normalized = query.lstrip().upper()
+    if not normalized.startswith(("SELECT", "WITH")):
+        return False
+    if any(keyword in normalized for keyword in ("INSERT ", "UPDATE ", "DELETE ", "FOR UPDATE", "FOR SHARE")):
+        return False
+    return not _SIDE_EFFECT_FUNCTIONS.search(query)
+
+async def is_slow_query_reader(conn, token_data: dict) -> bool:
+    """Slow query logs expose SQL text and plans, so only active company-admin super admins may read them"""
+    try:
+        user_id = uuid.UUID(str(token_data.get("user_id")))
+    except ValueError:
+        return False
+    return bool(await conn.fetchval(
+        "SELECT 1 FROM admin_users WHERE id = $1 AND role = 'super_admin' AND is_active = true", user_id
+    ))
+
+class SlowQueryLog:
+    """Bounded in-memory log of statements slower than a threshold"""
+
+    def __init__(self, threshold_ms: float, size: int):
+        self.threshold_ms = threshold_ms
+        self.entries = deque(maxlen=size)
+        self.plans: "OrderedDict[str, dict]" = OrderedDict()
+        self.pool = None
+        self._explain_running = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def attach_pool(self, pool):
+        """Pool used to run EXPLAIN samples on a separate connection"""
+        self.pool = pool
+
+    def record(self, service: str, fingerprint: str, query: str, args, seconds: float, rows: int, request: Optional[str]):
+        """Add a statement to the log if it crossed the threshold"""
+        duration_ms = seconds * 1000
+        if not self.enabled or duration_ms < self.threshold_ms or explaining.get():
+            return
+
+        self.entries.append({
+            "service": service,
+            "statement": fingerprint,
+            "query": query.strip()[:MAX_QUERY_TEXT_LENGTH],
+            "parameters": describe_parameters(args),
+            "durationMs": round(duration_ms, 2),
+            "rows": rows,
+            "request": request,
+            "recordedAt": datetime.now(timezone.utc).isoformat()
+        })
+        logger.warning(f"Slow query {fingerprint} took {duration_ms:.1f}ms ({rows} rows)")
+
+        if self._should_explain(fingerprint, query):
+            self._explain_running = True
+            asyncio.get_running_loop().create_task(self._capture_plan(fingerprint, query, args))
+
+    def _should_explain(self, fingerprint: str, query: str) -> bool:
+        if not SLOW_QUERY_EXPLAIN or self.pool is None or self._explain_running:
+            return False
+        if not is_explainable(query):
+            return False
+        previous = self.plans.get(fingerprint)
+        return previous is None or time.monotonic() - previous["capturedMonotonic"] >= SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS
+
+    async def _capture_plan(self, fingerprint: str, query: str, args):
+        """Run EXPLAIN (ANALYZE, BUFFERS) in a rolled-back transaction with a statement timeout"""
+        explaining.set(True)
+        try:
+            async with self.pool.acquire() as conn:
+                transaction = conn.transaction(readonly=True)
+                await transaction.start()
+                try:
+                    await conn.execute(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+                    rows = await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {query}", *args)
+                finally:
+                    await transaction.rollback()
+
+            self.plans[fingerprint] = {
+                "plan": "\n".join(row[0] for row in rows),
+                "capturedAt": datetime.now(timezone.utc).isoformat(),
+                "capturedMonotonic": time.monotonic()
+            }
+            self.plans.move_to_end(fingerprint)
+            while len(self.plans) > MAX_CACHED_PLANS:
+                self.plans.popitem(last=False)
+        except Exception as e:
+            logger.warning(f"Failed to capture plan for slow query {fingerprint}: {e}")
+        finally:
+            self._explain_running = False
+
+    def snapshot(self, limit: int = 50) -> List[dict]:
+        """Most recent slow queries first, each with the latest plan sample for its statement"""
+        results = []
+        for entry in list(reversed(self.entries))[:limit]:
+            plan = self.plans.get(entry["statement"])
+            results.append({
+                **entry,
+                "plan": plan["plan"] if plan else None,
+                "planCapturedAt": plan["capturedAt"] if plan else None
+            })
+        return results
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_LOG_MS, SLOW_QUERY_LOG_SIZE)
+
+def slow_queries_response(limit: int = 50) -> dict:
+    """Payload for a service's slow query endpoint"""
+    return {
+        "enabled": slow_query_log.enabled,
+        "thresholdMs": slow_query_log.threshold_ms,
+        "queries": slow_query_log.snapshot(limit)
+    }
+
+async def collect_slow_queries(targets: List[str], authorization: str, limit: int = 50, timeout: float = 2.0) -> List[dict]:
+    """Fetch slow query logs from several services with the caller's token and merge them, slowest first"""
+    async def fetch(client: httpx.AsyncClient, target: str) -> List[dict]:
+        try:
+            response = await client.get(
+                f"{target.rstrip('/')}/metrics/slow-queries",
+                params={"limit": limit},
+                headers={"Authorization": authorization}
+            )
+            response.raise_for_status()
+            return response.json().get("queries", [])
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"Failed to fetch slow queries from {target}: {e}")
+            return []
+
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        results = await asyncio.gather(*(fetch(client, target) for target in targets))
+
+    merged = [entry for entries in results for entry in entries]
+    merged.sort(key=lambda entry: entry["durationMs"], reverse=True)
+    return merged[:limit]
@@ -0,0 +1,91 @@
+"""
+PractiCheck Templates
+Email and document templates shared by all services, compiled once and cached
+"""
+
+import time
+from pathlib import Path
+from typing import Iterable, List, NamedTuple
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+from prometheus_client import Histogram
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / "templates"
+
+TEMPLATE_RENDER_SECONDS = Histogram(
+    "practicheck_template_render_seconds",
+    "Time spent rendering one email or document template",
+    ["template"],
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+)
+
+# Email subjects are one-liners, so they live here rather than in their own files
+EMAIL_SUBJECTS = {
+    "university_admin_welcome": "Welcome to PractiCheck - {{ university_name }} Admin Access",
+    "faculty_admin_welcome": "Faculty Admin Access - {{ faculty_name }}",
+    "lecturer_welcome": "Lecturer Account Created - {{ faculty_name }}",
+    "student_password_setup": "Set up your PractiCheck student password",
+    "supervisor_email_verification": "Verify your PractiCheck supervisor email address",
+    "invoice": "Invoice {{ invoice_number }} - PractiCheck Services",
+    "payment_reminder": "Payment Reminder - {{ invoices | length }} Overdue Invoice{{ 's' if invoices | length != 1 }} - PractiCheck Services",
+}
+
+# HTML is escaped, plain text is not; missing variables are errors rather than blanks
+environment = Environment(
+    loader=FileSystemLoader(str(TEMPLATE_DIR)),
+    autoescape=select_autoescape(["html"]),
+    undefined=StrictUndefined,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    keep_trailing_newline=True,
+    auto_reload=False,
+    cache_size=-1
+)
+
+# Subjects are plain text headers, so they must not be HTML-escaped
+subject_environment = Environment(autoescape=False, undefined=StrictUndefined)
+
+class RenderedEmail(NamedTuple):
+    subject: str
+    body: str
+    html_body: str
+
+_subjects = {}
+
+def preload_templates() -> int:
+    """Compile every template up front so no request pays the compile cost"""
+    for name in environment.list_templates():
+        environment.get_template(name)
+    for name, source in EMAIL_SUBJECTS.items():
+        _subjects[name] = subject_environment.from_string(source)
+    return len(environment.list_templates())
+
+def _subject(name: str):
+    if name not in _subjects:
+        _subjects[name] = subject_environment.from_string(EMAIL_SUBJECTS[name])
+    return _subjects[name]
+
+def render_template(name: str, /, **context) -> str:
+    """Render a document template such as documents/invoice_print.html"""
+    start_time = time.perf_counter()
+    rendered = environment.get_template(name).render(**context)
+    TEMPLATE_RENDER_SECONDS.labels(name).observe(time.perf_counter() - start_time)
+    return rendered
+
+def render_email(name: str, /, **context) -> RenderedEmail:
+    """Render the subject, plain text and HTML parts of an email"""
+    return render_emails(name, [context])[0]
+
+def render_emails(name: str, contexts: Iterable[dict]) -> List[RenderedEmail]:
+    """Render one email per context, looking the compiled templates up only once"""
+    subject = _subject(name)
+    text = environment.get_template(f"emails/{name}.txt")
+    html = environment.get_template(f"emails/{name}.html")
+    observe = TEMPLATE_RENDER_SECONDS.labels(f"emails/{name}").observe
+
+    rendered = []
+    for context in contexts:
+        start_time = time.perf_counter()
+        rendered.append(RenderedEmail(subject.render(context).strip(), text.render(context), html.render(context)))
+        observe(time.perf_counter() - start_time)
+    return rendered
@@ -0,0 +1,42 @@
+"""
+Invoice numbers under concurrent allocation: every number of the year is
+handed out exactly once, with no gaps, including when the year's counter
+row does not exist yet
+"""
+
+import asyncio
+import random
+
+import pytest
+
+from conftest import load_service
+
+company_admin = load_service("company-admin")
+
+ALLOCATIONS = 200
+
+@pytest.mark.asyncio
+async def test_concurrent_allocations_are_gap_free_and_unique(db_pool):
+    company_admin.db_pool = db_pool
+    # A year no real invoice uses, so the first allocations race to create its counter
+    year = await db_pool.fetchval("""
+        SELECT COALESCE(MAX(year), 2999) + 1 FROM invoice_number_counters WHERE year > 2999
+    """)
+    rng = random.Random(36)
+    counts = [rng.randint(1, 20) for _ in range(ALLOCATIONS)]
+    try:
+        blocks = await asyncio.gather(*(company_admin.allocate_invoice_numbers(count, year) for count in counts))
+        last_value = await db_pool.fetchval("SELECT last_value FROM invoice_number_counters WHERE year = $1", year)
+    finally:
+        await db_pool.execute("DELETE FROM invoice_number_counters WHERE year = $1", year)
+
+    for block, count in zip(blocks, counts):
+        assert len(block) == count
+        values = [int(number.rsplit("-", 1)[1]) for number in block]
+        assert values == list(range(values[0], values[0] + count)), "a block must be contiguous"
+
+    numbers = [number for block in blocks for number in block]
+    assert len(numbers) == len(set(numbers)), "an invoice number was handed out twice"
+    assert all(number.startswith(f"INV-{year}-") for number in numbers)
+    assert sorted(int(number.rsplit("-", 1)[1]) for number in numbers) == list(range(1, sum(counts) + 1))
+    assert last_value == sum(counts)
@@ -0,0 +1,129 @@
+"""
+Lecturer capacity under concurrent single, bulk and auto assignment: the
+lecturer's current_students must always equal their distinct active students
+and never exceed max_students
+"""
+
+import asyncio
+import random
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import load_service
+
+faculty_admin = load_service("faculty-admin")
+
+MAX_STUDENTS = 8
+STUDENTS = 40
+ROUNDS = 3
+
+async def seed(conn, tenant_id):
+    faculty_id = await conn.fetchval("""
+        INSERT INTO faculties (tenant_id, name, code) VALUES ($1, 'Engineering', 'ENG') RETURNING id
+    """, tenant_id)
+    admin_id = await conn.fetchval("""
+        INSERT INTO users (tenant_id, faculty_id, email, name, role)
+        VALUES ($1, $2, 'admin@capacity.invalid', 'Faculty Admin', 'faculty_admin') RETURNING id
+    """, tenant_id, faculty_id)
+    lecturer_id = await conn.fetchval("""
+        INSERT INTO users (tenant_id, faculty_id, email, name, role)
+        VALUES ($1, $2, 'lecturer@capacity.invalid', 'Lecturer', 'lecturer') RETURNING id
+    """, tenant_id, faculty_id)
+    await conn.execute("""
+        INSERT INTO lecturer_profiles (user_id, staff_id, max_students, current_students) VALUES ($1, 'CAP-1', $2, 0)
+    """, lecturer_id, MAX_STUDENTS)
+    await conn.execute("""
+        INSERT INTO users (tenant_id, faculty_id, email, name, role)
+        SELECT $1, $2, 'student' || n || '@capacity.invalid', 'Student ' || n, 'student'
+        FROM generate_series(1, $3) n
+    """, tenant_id, faculty_id, STUDENTS)
+    current_user = {"id": admin_id, "tenant_id": tenant_id, "faculty_id": faculty_id}
+    return current_user, str(lecturer_id)
+
+async def add_requests(conn, tenant_id, faculty_id) -> list:
+    """One pending request per student, and a second one for every fourth student"""
+    rows = await conn.fetch("""
+        INSERT INTO assessment_requests (tenant_id, student_id, faculty_id, assessment_type, status)
+        SELECT $1, u.id, $2, 'workplace_visit', 'pending'
+        FROM users u
+        CROSS JOIN generate_series(1, 2) copy
+        WHERE u.tenant_id = $1 AND u.role = 'student'
+          AND (copy = 1 OR right(split_part(u.email, '@', 1), 1) IN ('0', '4', '8'))
+        RETURNING id
+    """, tenant_id, faculty_id)
+    return [str(row['id']) for row in rows]
+
+async def attempt(call):
+    try:
+        await call
+    except HTTPException as e:
+        # Full lecturer, or a request another call assigned first
+        assert e.status_code in (400, 404), e.detail
+
+async def assert_consistent(conn, lecturer_id):
+    row = await conn.fetchrow("""
+        SELECT lp.current_students, lp.max_students,
+               (SELECT COUNT(DISTINCT student_id) FROM student_lecturer_assignments
+                WHERE lecturer_id = lp.user_id AND status = 'active') as active_students
+        FROM lecturer_profiles lp
+        WHERE lp.user_id = $1
+    """, lecturer_id)
+    assert row['current_students'] == row['active_students'], dict(row)
+    assert row['active_students'] <= row['max_students'], dict(row)
+    return row['active_students']
+
+@pytest.mark.asyncio
+async def test_concurrent_assignments_keep_capacity_consistent(db_pool, tenant_id):
+    faculty_admin.db_pool = db_pool
+    async with db_pool.acquire() as conn:
+        current_user, lecturer_id = await seed(conn, tenant_id)
+
+    rng = random.Random(46)
+    for _ in range(ROUNDS):
+        async with db_pool.acquire() as conn:
+            request_ids = await add_requests(conn, tenant_id, current_user['faculty_id'])
+        rng.shuffle(request_ids)
+
+        calls = [
+            faculty_admin.assign_lecturer_to_assessment(
+                request_id, faculty_admin.AssignLecturerRequest(lecturer_id=lecturer_id), current_user
+            )
+            for request_id in request_ids[:15]
+        ]
+        calls += [
+            faculty_admin.bulk_assessment_request_action(
+                faculty_admin.BulkAssessmentActionRequest(
+                    action="assign", lecturer_id=lecturer_id, request_ids=rng.sample(request_ids, 6)
+                ),
+                current_user
+            )
+            for _ in range(6)
+        ]
+        calls += [
+            faculty_admin.auto_assign_assessment_requests(
+                faculty_admin.AutoAssignRequest(request_ids=rng.sample(request_ids, 10)), current_user
+            )
+            for _ in range(3)
+        ]
+        rng.shuffle(calls)
+        await asyncio.gather(*(attempt(call) for call in calls))
+
+        async with db_pool.acquire() as conn:
+            assert await assert_consistent(conn, lecturer_id) == MAX_STUDENTS
+            assigned = [str(row['id']) for row in await conn.fetch("""
+                SELECT id FROM assessment_requests WHERE assigned_lecturer_id = $1 AND status = 'assigned'
+            """, lecturer_id)]
+
+        # Cancelling frees capacity only for students left with no assigned request
+        rng.shuffle(assigned)
+        cancels = [
+            faculty_admin.bulk_assessment_request_action(
+                faculty_admin.BulkAssessmentActionRequest(action="cancel", request_ids=batch), current_user
+            )
+            for batch in (assigned[:3], assigned[2:6], assigned[5:])
+        ]
+        await asyncio.gather(*(attempt(call) for call in cancels))
+
+        async with db_pool.acquire() as conn:
+            assert await assert_consistent(conn, lecturer_id) == 0
@@ -0,0 +1,100 @@
+'use client';
+
+import React, { useEffect, useState } from 'react';
+import { BriefcaseIcon, CheckCircleIcon, ExclamationTriangleIcon } from '@heroicons/react/24/outline';
+import { Logo } from '../../../../components/Logo';
+import Link from 'next/link';
+
+export default function SupervisorVerifyEmailPage() {
+  const [status, setStatus] = useState<'verifying' | 'verified' | 'failed'>('verifying');
+  const [error, setError] = useState('');
+
+  useEffect(() => {
+    const token = new URLSearchParams(window.location.search).get('token');
+    if (!token) {
+      setStatus('failed');
+      setError('This verification link is incomplete.');
+      return;
+    }
+
+    const verify = async () => {
+      try {
+        const response = await fetch('/api/auth/supervisor/verify-email', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ token })
+        });
+
+        if (response.ok) {
+          const user = localStorage.getItem('user');
+          if (user) {
+            localStorage.setItem('user', JSON.stringify({ ...JSON.parse(user), email_verified: true }));
+          }
+          setStatus('verified');
+        } else {
+          const errorData = await response.json();
+          setStatus('failed');
+          setError(errorData.detail || 'Verification failed');
+        }
+      } catch (error) {
+        setStatus('failed');
+        setError('Network error. Please try again.');
+      }
+    };
+    verify();
+  }, []);
+
+  return (
+    <div className="min-h-screen bg-gradient-to-br from-purple-50 to-violet-100">
+      <div className="flex flex-col justify-center py-12 sm:px-6 lg:px-8">
+        <div className="sm:mx-auto sm:w-full sm:max-w-md">
+          <div className="flex justify-center mb-6">
+            <Logo size="lg" />
+          </div>
+          <div className="flex items-center justify-center mb-6">
+            <div className="inline-flex items-center justify-center w-16 h-16 rounded-full bg-purple-500 text-white">
+              <BriefcaseIcon className="h-8 w-8" />
+            </div>
+          </div>
+          <h2 className="text-center text-3xl font-bold tracking-tight text-gray-900">
+            Verify Supervisor Email
+          </h2>
+        </div>
+
+        <div className="mt-8 sm:mx-auto sm:w-full sm:max-w-md">
+          <div className="bg-white py-8 px-4 shadow-xl rounded-lg sm:px-10 text-center">
+            {status === 'verifying' && (
+              <p className="text-sm text-gray-600">Confirming your email address...</p>
+            )}
+            {status === 'verified' && (
+              <>
+                <CheckCircleIcon className="h-12 w-12 text-green-500 mx-auto mb-4" />
+                <p className="text-sm text-gray-700 mb-6">
+                  Your email address is verified. You can now review your students&apos; logbooks.
+                </p>
+                <Link
+                  href="/supervisor/dashboard"
+                  className="inline-flex justify-center py-2 px-4 rounded-md text-sm font-medium text-white bg-purple-600 hover:bg-purple-700"
+                >
+                  Go to Dashboard
+                </Link>
+              </>
+            )}
+            {status === 'failed' && (
+              <>
+                <ExclamationTriangleIcon className="h-12 w-12 text-red-500 mx-auto mb-4" />
+                <p className="text-sm text-red-700 mb-6">{error}</p>
+                <Link
+                  href="/auth/supervisor/login"
+                  className="text-sm font-medium text-purple-600 hover:text-purple-700"
+                >
+                  Sign in to request a new link
+                </Link>
+              </>
+            )}
+          </div>
+        </div>
+      </div>
+    </div>
+  );
+}
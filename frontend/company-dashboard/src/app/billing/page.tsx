@@ -16,6 +16,7 @@ import {
 import { LoadingSpinner, LoadingOverlay } from '../../components/LoadingSpinner';
 import { useAuth } from '../../lib/auth';
 import { apiRequest } from '../../lib/auth';
+import { fetchAllPages } from '../../lib/pagination';
 import Link from 'next/link';
 
 interface BillingUniversity {
@@ -46,7 +47,7 @@ export default function BillingPage() {
   const loadBillingData = async () => {
     try {
       setLoading(true);
-      const data = await apiRequest('/api/admin/billing/universities');
+      const data = await fetchAllPages('/api/admin/billing/universities');
       setUniversities(data);
     } catch (error) {
       console.error('Error loading billing data:', error);
@@ -36,6 +36,7 @@ import { NotificationsModal } from '../../components/NotificationsModal';
 import { SessionTimeoutWarning } from '../../components/SessionTimeoutWarning';
 import { apiRequest } from '../../lib/auth';
 import { useAuth } from '../../lib/auth';
+import { fetchAllPages } from '../../lib/pagination';
 import Link from 'next/link';
 
 // Enhanced mock data
@@ -492,7 +493,7 @@ export default function ManagementDashboard() {
       try {
         const [statsData, universitiesData, alertsData, metricsData] = await Promise.all([
           apiRequest('/api/admin/dashboard/stats'),
-          apiRequest('/api/admin/dashboard/universities'),
+          fetchAllPages('/api/admin/dashboard/universities'),
           apiRequest('/api/admin/dashboard/alerts'),
           apiRequest('/api/admin/dashboard/metrics')
         ]);
@@ -520,7 +521,7 @@ export default function ManagementDashboard() {
         console.error('Error loading dashboard data:', error);
         // Fallback to mock data on error, but with proper UUID format
         try {
-          const fallbackUniversities = await apiRequest('/api/admin/dashboard/universities');
+          const fallbackUniversities = await fetchAllPages('/api/admin/dashboard/universities');
           setUniversities(fallbackUniversities);
         } catch (uniError) {
           console.error('Error loading universities:', uniError);
@@ -543,7 +544,7 @@ export default function ManagementDashboard() {
     try {
       const [statsData, universitiesData, alertsData, metricsData] = await Promise.all([
         apiRequest('/api/admin/dashboard/stats'),
-        apiRequest('/api/admin/dashboard/universities'),
+        fetchAllPages('/api/admin/dashboard/universities'),
         apiRequest('/api/admin/dashboard/alerts'),
         apiRequest('/api/admin/dashboard/metrics')
       ]);
@@ -609,7 +610,7 @@ export default function ManagementDashboard() {
           });
           
           // Refresh universities list
-          const updatedUniversities = await apiRequest('/api/admin/dashboard/universities');
+          const updatedUniversities = await fetchAllPages('/api/admin/dashboard/universities');
           setUniversities(updatedUniversities);
           
           // Show success message
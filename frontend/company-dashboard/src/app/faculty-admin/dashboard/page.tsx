@@ -80,6 +80,7 @@ export default function FacultyAdminDashboard() {
   const [courses, setCourses] = useState<Course[]>([]);
   const [lecturers, setLecturers] = useState<Lecturer[]>([]);
   const [assessmentRequests, setAssessmentRequests] = useState<AssessmentRequest[]>([]);
+  const [pendingAssessmentCount, setPendingAssessmentCount] = useState(0);
   const [showCreateCourseModal, setShowCreateCourseModal] = useState(false);
   const [showCreateLecturerModal, setShowCreateLecturerModal] = useState(false);
   const [createCourseLoading, setCreateCourseLoading] = useState(false);
@@ -139,8 +140,8 @@ export default function FacultyAdminDashboard() {
         setLecturers(lecturersData);
       }
 
-      // Fetch assessment requests
-      const assessmentsResponse = await fetch('http://localhost:8004/assessment-requests', {
+      // Fetch assessment requests (all statuses, so history is listed too)
+      const assessmentsResponse = await fetch('http://localhost:8004/assessment-requests?status=all', {
         headers: {
           'Authorization': `Bearer ${token}`,
           'Content-Type': 'application/json'
@@ -151,6 +152,18 @@ export default function FacultyAdminDashboard() {
         const assessmentsData = await assessmentsResponse.json();
         setAssessmentRequests(assessmentsData);
       }
+
+      // The list is one page, so the pending badge uses the server's total
+      const pendingResponse = await fetch('http://localhost:8004/assessment-requests?status=pending&limit=1', {
+        headers: {
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json'
+        }
+      });
+
+      if (pendingResponse.ok) {
+        setPendingAssessmentCount(Number(pendingResponse.headers.get('X-Total-Count') || 0));
+      }
     } catch (error) {
       console.error('Error fetching dashboard data:', error);
     }
@@ -384,7 +397,7 @@ export default function FacultyAdminDashboard() {
               <div className="p-6 border-b border-gray-200 flex justify-between items-center">
                 <h3 className="text-lg font-medium text-gray-900">Assessment Requests</h3>
                 <span className="bg-red-100 text-red-800 text-xs px-2 py-1 rounded-full">
-                  {assessmentRequests.filter(req => req.status === 'pending').length} pending
+                  {pendingAssessmentCount} pending
                 </span>
               </div>
               <div className="p-6">
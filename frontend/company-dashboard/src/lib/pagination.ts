@@ -0,0 +1,35 @@
+// Company-admin listings are keyset-paginated: each page carries the cursor of
+// the next one in the X-Next-Cursor header and the body stays a plain array.
+
+const API_BASE_URL = 'http://localhost:8000';
+const PAGE_SIZE = 500;
+
+export async function fetchAllPages<T = any>(path: string): Promise<T[]> {
+  const token = localStorage.getItem('access_token');
+  const items: T[] = [];
+  let cursor: string | null = null;
+
+  do {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (cursor) {
+      params.set('cursor', cursor);
+    }
+    const separator = path.includes('?') ? '&' : '?';
+    const response = await fetch(`${API_BASE_URL}${path}${separator}${params}`, {
+      headers: {
+        'Content-Type': 'application/json',
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      },
+    });
+
+    if (!response.ok) {
+      const data = await response.json().catch(() => ({}));
+      throw new Error(data.detail || `Request failed with status ${response.status}`);
+    }
+
+    items.push(...(await response.json()));
+    cursor = response.headers.get('X-Next-Cursor');
+  } while (cursor);
+
+  return items;
+}